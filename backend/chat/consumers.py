@@ -1,23 +1,30 @@
 import json
+import msgpack
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
 from django.contrib.auth import get_user_model
+from marketplace.renderers import msgpack_dumps
 from .models import ChatRoom, Message
 
 User = get_user_model()
 
 
 class ChatConsumer(AsyncWebsocketConsumer):
+    # Clients that offer this websocket subprotocol exchange binary MessagePack frames
+    # (timestamps as epoch milliseconds) instead of JSON text frames
+    msgpack_subprotocol = 'msgpack'
+
     async def connect(self):
         self.room_id = self.scope['url_route']['kwargs']['room_id']
         self.room_group_name = f'chat_{self.room_id}'
+        self.use_msgpack = self.msgpack_subprotocol in self.scope.get('subprotocols', [])
 
         await self.channel_layer.group_add(
             self.room_group_name,
             self.channel_name
         )
 
-        await self.accept()
+        await self.accept(subprotocol=self.msgpack_subprotocol if self.use_msgpack else None)
 
     async def disconnect(self, close_code):
         await self.channel_layer.group_discard(
@@ -25,8 +32,11 @@ class ChatConsumer(AsyncWebsocketConsumer):
             self.channel_name
         )
 
-    async def receive(self, text_data):
-        text_data_json = json.loads(text_data)
+    async def receive(self, text_data=None, bytes_data=None):
+        if bytes_data is not None:
+            text_data_json = msgpack.unpackb(bytes_data, raw=False)
+        else:
+            text_data_json = json.loads(text_data)
         message_content = text_data_json['message']
         user_id = self.scope['user'].id
 
@@ -46,7 +56,10 @@ class ChatConsumer(AsyncWebsocketConsumer):
         )
 
     async def chat_message(self, event):
-        await self.send(text_data=json.dumps(event['message']))
+        if self.use_msgpack:
+            await self.send(bytes_data=msgpack_dumps(event['message']))
+        else:
+            await self.send(text_data=json.dumps(event['message']))
 
     @database_sync_to_async
     def save_message(self, user_id, content):
@@ -0,0 +1,40 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from listings.counters import adjust_counter
+from listings.models import Listing
+from .models import ChatRoom, Message
+
+
+@receiver(post_save, sender=Message)
+def touch_chat_room(sender, instance, created, **kwargs):
+    """A new message changes the room's last_message/unread_count, so move updated_at"""
+    if created:
+        ChatRoom.objects.filter(pk=instance.chat_room_id).update(updated_at=instance.created_at)
+
+
+@receiver(post_save, sender=ChatRoom)
+def count_chat_room(sender, instance, created, **kwargs):
+    if created:
+        adjust_counter(Listing.objects.filter(pk=instance.listing_id), 'chat_room_count', 1)
+
+
+@receiver(post_delete, sender=ChatRoom)
+def uncount_chat_room(sender, instance, **kwargs):
+    adjust_counter(Listing.objects.filter(pk=instance.listing_id), 'chat_room_count', -1)
+
+
+def unread_for_seller(message):
+    """The listings whose unread_message_count covers `message`: a buyer's unread message"""
+    return Listing.objects.filter(chat_rooms=message.chat_room_id).exclude(seller_id=message.sender_id)
+
+
+@receiver(post_save, sender=Message)
+def count_unread_message(sender, instance, created, **kwargs):
+    if created and not instance.is_read:
+        adjust_counter(unread_for_seller(instance), 'unread_message_count', 1)
+
+
+@receiver(post_delete, sender=Message)
+def uncount_unread_message(sender, instance, **kwargs):
+    if not instance.is_read:
+        adjust_counter(unread_for_seller(instance), 'unread_message_count', -1)
@@ -3,6 +3,12 @@ from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from django.db import models
+from django.db.models import Count, Max
+from django.utils import timezone
+from marketplace.conditional import make_etag, not_modified_response, set_validators
+from marketplace.pagination import KeysetPagination
+from listings.counters import adjust_counter
+from listings.models import Listing
 from .models import ChatRoom, Message
 from .serializers import ChatRoomSerializer, ChatRoomDetailSerializer, MessageSerializer
 
@@ -17,6 +23,25 @@ class ChatRoomViewSet(viewsets.ModelViewSet):
             models.Q(buyer=user) | models.Q(seller=user)
         ).select_related('listing', 'buyer', 'seller').prefetch_related('messages')
 
+    def list(self, request, *args, **kwargs):
+        # One aggregate over the user's rooms: any new message, read receipt or edit of
+        # a room's listing moves one of these values. ETag only: a room going away moves
+        # just the count, which a Last-Modified date wouldn't show
+        state = ChatRoom.objects.filter(
+            models.Q(buyer=request.user) | models.Q(seller=request.user)
+        ).aggregate(
+            last_updated=Max('updated_at'), listing_updated=Max('listing__updated_at'), rooms=Count('id')
+        )
+        etag = make_etag(
+            request, 'chat-rooms', request.user.id, state['rooms'],
+            state['last_updated'] and state['last_updated'].isoformat(),
+            state['listing_updated'] and state['listing_updated'].isoformat(),
+        )
+        not_modified = not_modified_response(request, etag=etag)
+        if not_modified is not None:
+            return not_modified
+        return set_validators(super().list(request, *args, **kwargs), etag=etag)
+
     def get_serializer_class(self):
         if self.action == 'retrieve':
             return ChatRoomDetailSerializer
@@ -39,12 +64,28 @@ class ChatRoomViewSet(viewsets.ModelViewSet):
         serializer = MessageSerializer(message)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    @action(detail=True, methods=['get'], permission_classes=[IsAuthenticated])
+    def messages(self, request, pk=None):
+        """Message history, newest first, paginated with a cursor for scrolling back"""
+        chat_room = self.get_object()
+        messages = Message.objects.filter(chat_room=chat_room).select_related('sender').order_by('-created_at')
+        paginator = KeysetPagination()
+        page = paginator.paginate_queryset(messages, request, view=self)
+        serializer = MessageSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
     def mark_read(self, request, pk=None):
         chat_room = self.get_object()
-        Message.objects.filter(
-            chat_room=chat_room
+        updated = Message.objects.filter(
+            chat_room=chat_room, is_read=False
         ).exclude(sender=request.user).update(is_read=True)
+        if updated:
+            # Unread counts changed; invalidates chat room ETags
+            ChatRoom.objects.filter(pk=chat_room.pk).update(updated_at=timezone.now())
+            if request.user.id == chat_room.seller_id:
+                # The buyer's messages no longer count on the seller's dashboard
+                adjust_counter(Listing.objects.filter(pk=chat_room.listing_id), 'unread_message_count', -updated)
         return Response({'message': 'Messages marked as read'}, status=status.HTTP_200_OK)
 
     @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated])
@@ -53,7 +94,6 @@ class ChatRoomViewSet(viewsets.ModelViewSet):
         if not listing_id:
             return Response({'error': 'listing_id is required'}, status=status.HTTP_400_BAD_REQUEST)
         
-        from listings.models import Listing
         try:
             listing = Listing.objects.get(id=listing_id)
         except Listing.DoesNotExist:
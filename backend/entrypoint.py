@@ -59,20 +59,13 @@ def main():
         print("Starting Gunicorn server...", flush=True)
         print("=" * 50, flush=True)
         print(f"Binding to: 0.0.0.0:{port}", flush=True)
+        # wsgi: sync workers; asgi: uvicorn workers serving /api and /ws (gunicorn.conf.py)
+        print(f"SERVER_MODE: {os.getenv('SERVER_MODE', 'wsgi')}", flush=True)
         print("", flush=True)
         
         # Start gunicorn
         # Use exec to replace this process
-        os.execvp('gunicorn', [
-            'gunicorn',
-            '--bind', f'0.0.0.0:{port}',
-            '--workers', '2',
-            '--timeout', '120',
-            '--access-logfile', '-',
-            '--error-logfile', '-',
-            '--log-level', 'info',
-            'marketplace.wsgi:application'
-        ])
+        os.execvp('gunicorn', ['gunicorn', '--config', 'gunicorn.conf.py'])
     except Exception as e:
         print(f"FATAL ERROR in entrypoint: {e}", flush=True, file=sys.stderr)
         import traceback
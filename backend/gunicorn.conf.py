@@ -0,0 +1,90 @@
+"""
+Gunicorn settings shared by every way the web server is started (entrypoint.py,
+start.sh, Procfile, docker-compose.yml): `gunicorn --config gunicorn.conf.py`.
+
+SERVER_MODE=wsgi (the default) serves marketplace.wsgi from sync workers, HTTP only.
+SERVER_MODE=asgi serves marketplace.asgi from uvicorn workers: the HTTP API and the
+chat websockets (/ws/chat/) from the same processes. It stays opt-in while sync views
+under ASGI are about 3x slower (`manage.py bench_web_server`: 324 against 950 req/s,
+p99 753 against 206 ms on one core); turn it on where the chat needs websockets.
+
+Graceful reload (e.g. after a deploy without a container restart):
+
+    kill -HUP <gunicorn master pid>
+
+starts workers with the new code, then gives the old ones graceful_timeout seconds to
+finish their requests. Websockets still open at that point are closed and the app
+reconnects.
+
+Each worker has its own database connection pool (DATABASE_POOL_MAX_SIZE), so
+PostgreSQL needs about workers x pool size connections per web container. Worker
+counts follow the CPUs the container may use (its affinity and cgroup quota, not the
+host's cores) and are capped at MAX_DEFAULT_WORKERS unless WEB_CONCURRENCY is set.
+"""
+import math
+import os
+
+SERVER_MODE = os.getenv('SERVER_MODE', 'wsgi')
+if SERVER_MODE not in ('asgi', 'wsgi'):
+    raise ValueError(f'SERVER_MODE must be asgi or wsgi, not {SERVER_MODE!r}')
+
+MAX_DEFAULT_WORKERS = 8
+
+
+def cgroup_cpu_quota():
+    """CPUs allowed by the cgroup CPU quota (v2, else v1), or None when unlimited"""
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()
+        return None if quota == 'max' else int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+    try:
+        with open('/sys/fs/cgroup/cpu/cpu.cfs_quota_us') as f:
+            quota = int(f.read())
+        with open('/sys/fs/cgroup/cpu/cpu.cfs_period_us') as f:
+            period = int(f.read())
+    except (OSError, ValueError):
+        return None
+    return quota / period if quota > 0 else None
+
+
+def available_cpus():
+    """CPUs this process may run on, within the container's quota"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:  # not Linux
+        cpus = os.cpu_count() or 1
+    quota = cgroup_cpu_quota()
+    if quota is not None:
+        cpus = min(cpus, max(1, math.ceil(quota)))
+    return cpus
+
+
+cores = available_cpus()
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+if SERVER_MODE == 'asgi':
+    wsgi_app = 'marketplace.asgi:application'
+    worker_class = 'marketplace.workers.UvicornWorker'
+    # An event loop per core handles many connections; sync views run in its threads
+    default_workers = min(max(2, cores), MAX_DEFAULT_WORKERS)
+else:
+    wsgi_app = 'marketplace.wsgi:application'
+    worker_class = 'sync'
+    # One request at a time per worker
+    default_workers = min(cores * 2 + 1, MAX_DEFAULT_WORKERS)
+workers = int(os.getenv('WEB_CONCURRENCY') or default_workers)
+
+# Longer than the proxy's idle timeout (nginx upstream keepalive_timeout is 60s),
+# so the server never closes a connection the proxy is about to reuse. Sync
+# workers don't keep connections alive.
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 75))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 120))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+
+# Empty GUNICORN_ACCESS_LOG turns the access log off (bench_web_server does)
+accesslog = os.getenv('GUNICORN_ACCESS_LOG', '-') or None
+errorlog = '-'
+loglevel = os.getenv('GUNICORN_LOG_LEVEL', 'info')
+capture_output = True
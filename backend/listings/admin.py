@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Category, Listing, ListingImage, Favorite
+from .models import Category, Listing, ListingImage, Favorite, Place
 
 
 @admin.register(Category)
@@ -20,7 +20,7 @@ class ListingAdmin(admin.ModelAdmin):
     search_fields = ('title', 'description', 'seller__username', 'location')
     list_editable = ('status',)
     inlines = [ListingImageInline]
-    readonly_fields = ('created_at', 'updated_at')
+    readonly_fields = ('created_at', 'updated_at', 'place', 'latitude', 'longitude')
 
 
 @admin.register(Favorite)
@@ -29,3 +29,9 @@ class FavoriteAdmin(admin.ModelAdmin):
     list_filter = ('created_at',)
 
 
+
+
+@admin.register(Place)
+class PlaceAdmin(admin.ModelAdmin):
+    list_display = ('name', 'state', 'country', 'latitude', 'longitude')
+    search_fields = ('name', 'key')
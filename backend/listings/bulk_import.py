@@ -0,0 +1,246 @@
+"""
+Bulk listing import for high-volume sellers (`POST /api/listings/import/` and
+`manage.py import_listings`).
+
+Rows arrive as NDJSON (one JSON object per line) or CSV with a header row, and are
+read and validated one at a time, so a large upload is never held in memory. Valid
+rows are written in chunks: one transaction per chunk with a bulk_create for the
+listings and one for their images. A row that fails validation is reported with
+its line number and skipped; the rest of the batch carries on.
+
+bulk_create skips model signals, so the importer does their work itself: rows are
+geocoded up front, and once a chunk commits the listing caches are invalidated and
+image variants and similar listings are queued as a batch.
+"""
+import csv
+import json
+import logging
+
+from django.db import DatabaseError, transaction
+from rest_framework import serializers
+
+from marketplace.cache import bump_version
+
+from .geo import geocode
+from .models import Listing, ListingImage, Place
+from .registry import category_registry
+from .storage import store_image
+from .tasks import generate_image_variants_batch, update_similar_listings_batch
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 500
+# CSV rows carry their images in one column, separated by this
+CSV_IMAGE_SEPARATOR = '|'
+
+FORMAT_NDJSON = 'ndjson'
+FORMAT_CSV = 'csv'
+CONTENT_TYPE_FORMATS = {
+    'application/x-ndjson': FORMAT_NDJSON,
+    'application/jsonl': FORMAT_NDJSON,
+    'application/json-lines': FORMAT_NDJSON,
+    'text/csv': FORMAT_CSV,
+}
+
+
+class ImportRowSerializer(serializers.Serializer):
+    """The fields ListingCreateSerializer accepts, validated without touching the database"""
+    title = serializers.CharField(max_length=255)
+    description = serializers.CharField()
+    price = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0.01)
+    category_id = serializers.IntegerField()
+    location = serializers.CharField(max_length=255)
+    condition = serializers.ChoiceField(choices=Listing.CONDITION_CHOICES, required=False, default='good')
+    images = serializers.ListField(child=serializers.CharField(), required=False, default=list)
+
+    def validate_category_id(self, value):
+        if category_registry.get(value) is None:
+            raise serializers.ValidationError(f'Invalid category ID: {value}')
+        return value
+
+
+def format_for_content_type(content_type):
+    """The import format for a request's Content-Type, or None if unsupported"""
+    media_type = (content_type or '').split(';')[0].strip().lower()
+    return CONTENT_TYPE_FORMATS.get(media_type)
+
+
+def _decode(lines):
+    for line in lines:
+        yield line.decode('utf-8-sig') if isinstance(line, bytes) else line
+
+
+def read_ndjson(lines):
+    """(line number, row or error message) for each non-blank line"""
+    for line_number, line in enumerate(_decode(lines), start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_number, f'Invalid JSON: {e}'
+            continue
+        if not isinstance(row, dict):
+            yield line_number, 'Each line must be a JSON object'
+            continue
+        yield line_number, row
+
+
+def read_csv(lines):
+    """
+    (line number, row or error message) for each CSV record after the header. Empty
+    cells are dropped, so optional columns fall back to their defaults, and the
+    `images` column is split on CSV_IMAGE_SEPARATOR.
+    """
+    reader = csv.DictReader(_decode(lines))
+    for row in reader:
+        if None in row:
+            yield reader.line_num, 'Row has more cells than the header'
+            continue
+        row = {key: value for key, value in row.items() if key and value not in (None, '')}
+        if not row:
+            continue
+        if 'images' in row:
+            row['images'] = [url.strip() for url in row['images'].split(CSV_IMAGE_SEPARATOR) if url.strip()]
+        yield reader.line_num, row
+
+
+READERS = {FORMAT_NDJSON: read_ndjson, FORMAT_CSV: read_csv}
+
+
+class ImportResult:
+    def __init__(self):
+        self.created_ids = []
+        self.errors = []
+
+    def add_error(self, line_number, errors):
+        self.errors.append({'row': line_number, 'errors': errors})
+
+    def as_dict(self, max_errors=None):
+        errors = self.errors if max_errors is None else self.errors[:max_errors]
+        return {
+            'created': len(self.created_ids),
+            'failed': len(self.errors),
+            'ids': self.created_ids,
+            'errors': errors,
+            'errors_truncated': len(errors) < len(self.errors),
+        }
+
+
+class ListingImporter:
+    """
+    Validates and writes rows for one seller. Listings are created approved, as
+    ListingCreateSerializer creates them.
+    """
+
+    def __init__(self, seller, chunk_size=DEFAULT_CHUNK_SIZE, max_rows=None):
+        self.seller = seller
+        self.chunk_size = chunk_size
+        self.max_rows = max_rows
+        self.places = {}
+        # One instance for every row: a new serializer deep-copies its fields, which
+        # would cost more than the validation itself
+        self.serializer = ImportRowSerializer()
+
+    def run(self, lines, import_format):
+        result = ImportResult()
+        chunk = []
+        seen = 0
+        for line_number, row in READERS[import_format](lines):
+            seen += 1
+            if self.max_rows is not None and seen > self.max_rows:
+                result.add_error(line_number, {'non_field_errors': [f'Imports are limited to {self.max_rows} rows']})
+                break
+            prepared = self.prepare(line_number, row, result)
+            if prepared is not None:
+                chunk.append(prepared)
+            if len(chunk) >= self.chunk_size:
+                self.write_chunk(chunk, result)
+                chunk = []
+        if chunk:
+            self.write_chunk(chunk, result)
+        return result
+
+    def prepare(self, line_number, row, result):
+        """(line number, unsaved Listing, image URLs), or None after recording the row's errors"""
+        if isinstance(row, str):
+            result.add_error(line_number, {'non_field_errors': [row]})
+            return None
+        try:
+            data = self.serializer.run_validation(row)
+        except serializers.ValidationError as e:
+            result.add_error(line_number, serializers.as_serializer_error(e))
+            return None
+        try:
+            # Base64 data URIs go to the blob store, as in ListingCreateSerializer
+            image_urls = [store_image(image) for image in data['images'] if image]
+        except ValueError as e:
+            result.add_error(line_number, {'images': [str(e)]})
+            return None
+
+        listing = Listing(
+            title=data['title'],
+            description=data['description'],
+            price=data['price'],
+            category_id=data['category_id'],
+            location=data['location'],
+            condition=data['condition'],
+            seller=self.seller,
+            status='approved',
+        )
+        self.geocode(listing)
+        return line_number, listing, image_urls
+
+    def geocode(self, listing):
+        # What the pre_save geocode_listing signal would do, with Places looked up
+        # once per import
+        entry = geocode(listing.location)
+        if entry is None:
+            return
+        place = self.places.get(entry['key'])
+        if place is None:
+            place, _ = Place.objects.get_or_create(
+                key=entry['key'],
+                defaults={field: entry[field] for field in ('name', 'state', 'country', 'latitude', 'longitude')},
+            )
+            self.places[entry['key']] = place
+        listing.place = place
+        listing.latitude, listing.longitude = entry['latitude'], entry['longitude']
+
+    def write_chunk(self, chunk, result):
+        try:
+            with transaction.atomic():
+                listing_ids, image_ids = self.insert(chunk)
+        except DatabaseError:
+            # Find the offending rows one at a time so the rest still go in
+            logger.warning('Bulk import chunk failed; retrying %d rows individually', len(chunk), exc_info=True)
+            listing_ids, image_ids = [], []
+            for entry in chunk:
+                try:
+                    with transaction.atomic():
+                        created, images = self.insert([entry])
+                except DatabaseError as e:
+                    result.add_error(entry[0], {'non_field_errors': [str(e)]})
+                    continue
+                listing_ids += created
+                image_ids += images
+        if not listing_ids:
+            return
+        result.created_ids.extend(listing_ids)
+        transaction.on_commit(lambda: self.after_commit(listing_ids, image_ids))
+
+    def insert(self, chunk):
+        listings = Listing.objects.bulk_create([listing for _, listing, _ in chunk])
+        images = ListingImage.objects.bulk_create([
+            ListingImage(listing=listing, image=url, is_primary=index == 0)
+            for _, listing, image_urls in chunk
+            for index, url in enumerate(image_urls)
+        ])
+        return [listing.pk for listing in listings], [image.pk for image in images]
+
+    def after_commit(self, listing_ids, image_ids):
+        # The work of the post_save signals bulk_create skipped
+        bump_version('listings')
+        if image_ids:
+            generate_image_variants_batch.delay(image_ids)
+        update_similar_listings_batch.delay(listing_ids)
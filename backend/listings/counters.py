@@ -0,0 +1,48 @@
+"""
+Denormalized per-listing counters shown on the seller dashboard (`my_listings`).
+
+favorite_count, chat_room_count and unread_message_count (messages from buyers the
+seller hasn't read) are kept up to date on write by signals on Favorite, ChatRoom
+and Message, and by ChatRoomViewSet.mark_read, each as a single
+`UPDATE ... SET n = n + delta` so concurrent writers never lose an increment.
+`manage.py recount_listing_counters` recomputes them from scratch, e.g. after
+bulk deletes that bypassed the signals.
+"""
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Favorite, Listing
+
+# Summed into the dashboard's totals row
+COUNTER_FIELDS = ('favorite_count', 'chat_room_count', 'unread_message_count', 'view_count')
+
+
+def adjust_counter(listings, field, delta):
+    """Add `delta` to `field` on the `listings` queryset, never going below zero"""
+    if delta == 0:
+        return 0
+    if delta > 0:
+        return listings.update(**{field: F(field) + delta})
+    return listings.update(**{field: Greatest(F(field) + delta, Value(0))})
+
+
+def _count_subquery(queryset, listing_field='listing_id'):
+    counts = queryset.order_by().values(listing_field).annotate(n=Count('pk')).values('n')[:1]
+    return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+
+def recount_listing_counters(listings=None):
+    """Recompute the counters of `listings` (default: all) from the source rows"""
+    from chat.models import ChatRoom, Message
+
+    if listings is None:
+        listings = Listing.objects.all()
+    return listings.update(
+        favorite_count=_count_subquery(Favorite.objects.filter(listing_id=OuterRef('pk'))),
+        chat_room_count=_count_subquery(ChatRoom.objects.filter(listing_id=OuterRef('pk'))),
+        unread_message_count=_count_subquery(
+            Message.objects.filter(chat_room__listing_id=OuterRef('pk'), is_read=False)
+            .exclude(sender_id=F('chat_room__seller_id')),
+            'chat_room__listing_id',
+        ),
+    )
@@ -0,0 +1,127 @@
+"""
+Facet counts for the listing filter sheet: how many of the current results fall in
+each category, condition and price bucket.
+
+All three are counted in one grouped query over the filtered listings: a
+``GROUP BY GROUPING SETS`` on PostgreSQL, elsewhere a single GROUP BY over
+(category, condition, price bucket) rolled up in Python. Results are cached per
+normalized filter parameters under the 'listings' version, so any listing change
+retires them.
+"""
+import hashlib
+from collections import Counter
+
+from django.db import connections
+from django.db.models import Case, Count, IntegerField, Value, When
+
+from marketplace.cache import cached_value, get_version, normalize_query_params
+
+from .models import Listing
+from .registry import category_registry
+
+FACETS_CACHE_TIMEOUT = 300
+
+# Upper bounds of the price buckets; the last bucket is open-ended
+PRICE_BUCKET_EDGES = (1000, 5000, 10000, 25000, 50000, 100000)
+
+# Query parameters that page, order or shape results without changing which
+# listings match, so they don't change the facet counts either
+NON_FILTER_PARAMS = frozenset({
+    'cursor', 'page', 'page_size', 'with_count', 'ordering', 'view', 'size', 'image_format', 'facets',
+})
+
+
+def price_bucket_expression():
+    return Case(
+        *[When(price__lt=edge, then=Value(index)) for index, edge in enumerate(PRICE_BUCKET_EDGES)],
+        default=Value(len(PRICE_BUCKET_EDGES)),
+        output_field=IntegerField(),
+    )
+
+
+def _grouping_sets_counts(queryset):
+    """(category, condition, price bucket) Counters from one GROUPING SETS query (PostgreSQL)"""
+    connection = connections[queryset.db]
+    rows = queryset.order_by().values('category_id', 'condition').annotate(price_bucket=price_bucket_expression())
+    inner_sql, params = rows.query.get_compiler(using=queryset.db).as_sql()
+    category, condition, bucket = (connection.ops.quote_name(name) for name in ('category_id', 'condition', 'price_bucket'))
+    sql = (
+        f'SELECT {category}, {condition}, {bucket}, GROUPING({category}), GROUPING({condition}), COUNT(*) '
+        f'FROM ({inner_sql}) AS facet_rows '
+        f'GROUP BY GROUPING SETS (({category}), ({condition}), ({bucket}))'
+    )
+    categories, conditions, buckets = Counter(), Counter(), Counter()
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        for category_id, condition_code, price_bucket, category_rolled_up, condition_rolled_up, count in cursor.fetchall():
+            # GROUPING(x) is 1 when x is not part of the row's grouping set
+            if not category_rolled_up:
+                categories[category_id] += count
+            elif not condition_rolled_up:
+                conditions[condition_code] += count
+            else:
+                buckets[price_bucket] += count
+    return categories, conditions, buckets
+
+
+def _group_by_counts(queryset):
+    """The same Counters from one GROUP BY over all three columns, rolled up here"""
+    rows = (
+        queryset.order_by()
+        .annotate(price_bucket=price_bucket_expression())
+        .values('category_id', 'condition', 'price_bucket')
+        .annotate(count=Count('pk'))
+    )
+    categories, conditions, buckets = Counter(), Counter(), Counter()
+    for row in rows:
+        categories[row['category_id']] += row['count']
+        conditions[row['condition']] += row['count']
+        buckets[row['price_bucket']] += row['count']
+    return categories, conditions, buckets
+
+
+def compute_facets(queryset):
+    """Facet counts for the listings in `queryset`"""
+    queryset = queryset.select_related(None).prefetch_related(None)
+    if connections[queryset.db].vendor == 'postgresql':
+        categories, conditions, buckets = _grouping_sets_counts(queryset)
+    else:
+        categories, conditions, buckets = _group_by_counts(queryset)
+
+    category_facets = []
+    for category_id, count in categories.most_common():
+        category = category_registry.serialize(category_id)
+        if category is not None:
+            category_facets.append({'id': category['id'], 'name': category['name'], 'slug': category['slug'], 'count': count})
+
+    lower_bounds = (0, *PRICE_BUCKET_EDGES)
+    upper_bounds = (*PRICE_BUCKET_EDGES, None)
+    return {
+        'category': category_facets,
+        'condition': [
+            {'value': code, 'label': label, 'count': conditions[code]}
+            for code, label in Listing.CONDITION_CHOICES if conditions[code]
+        ],
+        'price': [
+            {'min': lower, 'max': upper, 'count': buckets[index]}
+            for index, (lower, upper) in enumerate(zip(lower_bounds, upper_bounds))
+        ],
+    }
+
+
+def facets_cache_key(request, scope):
+    """
+    Cache key for the facets of a request: its filter parameters only (see
+    NON_FILTER_PARAMS), plus `scope`, which identifies the listings the user may see.
+    """
+    params = request.query_params.copy()
+    for name in NON_FILTER_PARAMS:
+        params.pop(name, None)
+    raw = '|'.join([str(get_version('listings')), str(scope), normalize_query_params(params)])
+    return f'facets:{hashlib.sha256(raw.encode()).hexdigest()}'
+
+
+def cached_facets(request, scope, queryset):
+    return cached_value(
+        'facets', facets_cache_key(request, scope), lambda: compute_facets(queryset), FACETS_CACHE_TIMEOUT,
+    )
@@ -0,0 +1,190 @@
+"""
+Read-only fast path for the hot listing list endpoints (list, favourites, similar).
+
+Instead of loading model instances and running ListingCardSerializer /
+ListingSerializer field by field, rows are projected with values(), images are
+fetched for the whole page in one query into a `{listing_id: [image, ...]}` map, and
+plain dicts are built directly. Value formatting reuses the serializers' own field
+instances (Decimal quantizing, datetime formatting), bound once per process, so the
+output is identical to the serializers'; `manage.py bench_listing_serialization`
+checks that against the serializers and times both.
+"""
+import functools
+import re
+
+from django.conf import settings
+
+from users.serializers import UserSerializer
+
+from .images import VARIANT_SIZES, pick_variant
+from .models import ListingImage
+from .registry import category_registry
+from .serializers import ListingSerializer
+
+# Listing columns loaded for each view; seller columns come through the join
+CARD_COLUMNS = (
+    'id', 'title', 'price', 'location', 'condition', 'is_featured', 'created_at',
+    'seller_id', 'seller__username',
+)
+FULL_COLUMNS = (
+    'id', 'title', 'description', 'price', 'category_id', 'location', 'latitude', 'longitude',
+    'status', 'condition', 'is_featured', 'created_at', 'updated_at',
+    'seller_id', 'seller__username', 'seller__email', 'seller__phone_number',
+    'seller__profile_picture', 'seller__location', 'seller__created_at',
+)
+
+# Site-relative URLs that request.build_absolute_uri() would return unchanged apart
+# from the scheme and host prefix
+_PLAIN_PATH_RE = re.compile(r'^/(?!/)[A-Za-z0-9/_.\-]*$')
+
+
+def fast_path_enabled():
+    return getattr(settings, 'LISTING_FAST_PATH', True)
+
+
+@functools.lru_cache(maxsize=None)
+def field_formatters():
+    """
+    Bound to_representation of the serializers' own price, datetime and float fields,
+    built once per process: (price, datetime, float, user datetime).
+    """
+    listing_fields = ListingSerializer().fields
+    return (
+        listing_fields['price'].to_representation,
+        listing_fields['created_at'].to_representation,
+        listing_fields['latitude'].to_representation,
+        UserSerializer().fields['created_at'].to_representation,
+    )
+
+
+class ListingRowBuilder:
+    """
+    Builds ListingCardSerializer (`full=False`) or ListingSerializer (`full=True`)
+    output for values() rows of `columns()`. One builder serves one request.
+    """
+
+    def __init__(self, request, full=False):
+        self.request = request
+        self.full = full
+        self.format_price, self.format_datetime, self.format_float, self.format_user_datetime = field_formatters()
+
+        query_params = request.query_params if request else {}
+        self.size = query_params.get('size', None if full else 'card')
+        self.image_format = query_params.get('image_format')
+        self.host_prefix = request.build_absolute_uri('/')[:-1] if request else None
+        self.authenticated = bool(request and request.user.is_authenticated)
+
+    def columns(self, annotations=()):
+        """values() arguments: the view's columns plus any annotations present"""
+        return (*(FULL_COLUMNS if self.full else CARD_COLUMNS), *annotations)
+
+    def image_url(self, original, variants):
+        """ListingImageSerializer / get_thumbnail URL for an image's column values"""
+        url = pick_variant(original, variants, self.size, self.image_format) if self.size in VARIANT_SIZES else original
+        if self.request is None or not url.startswith('/'):
+            return url
+        if _PLAIN_PATH_RE.match(url):
+            return self.host_prefix + url
+        return self.request.build_absolute_uri(url)
+
+    def image_rows(self, listing_ids):
+        images = ListingImage.objects.filter(listing_id__in=listing_ids)
+        if not self.full:
+            images = images.filter(is_primary=True)
+        return images.values('id', 'listing_id', 'image', 'variants', 'is_primary')
+
+    def image_map(self, listing_ids):
+        """`{listing_id: [image row, ...]}` for a page, in ListingImage's default order"""
+        images_by_listing = {}
+        for image in self.image_rows(listing_ids):
+            images_by_listing.setdefault(image['listing_id'], []).append(image)
+        return images_by_listing
+
+    async def aimage_map(self, listing_ids):
+        images_by_listing = {}
+        async for image in self.image_rows(listing_ids).aiterator():
+            images_by_listing.setdefault(image['listing_id'], []).append(image)
+        return images_by_listing
+
+    def build(self, rows, favorite_ids=None):
+        """
+        Serialized dicts for `rows`. `is_favorited` comes from the row's annotation,
+        else from `favorite_ids`, like FavoriteStateMixin.
+        """
+        rows = list(rows)
+        return self.build_rows(rows, self.image_map([row['id'] for row in rows]), favorite_ids)
+
+    async def abuild(self, rows, favorite_ids=None):
+        """build() for async views; the category registry is brought up to date first"""
+        rows = list(rows)
+        images = await self.aimage_map([row['id'] for row in rows])
+        if self.full:
+            await category_registry.aensure_current()
+        return self.build_rows(rows, images, favorite_ids)
+
+    def build_rows(self, rows, images, favorite_ids):
+        build_one = self.build_full if self.full else self.build_card
+        return [build_one(row, images.get(row['id'], ()), favorite_ids) for row in rows]
+
+    def is_favorited(self, row, favorite_ids):
+        if not self.authenticated:
+            return False
+        annotated = row.get('is_favorited')
+        if annotated is not None:
+            return annotated
+        return row['id'] in (favorite_ids or ())
+
+    def build_card(self, row, images, favorite_ids):
+        data = {
+            'id': row['id'],
+            'title': row['title'],
+            'price': self.format_price(row['price']),
+            'location': row['location'],
+            'condition': row['condition'],
+            'is_featured': row['is_featured'],
+            'thumbnail': self.image_url(images[0]['image'], images[0]['variants']) if images else None,
+            'seller': {'id': row['seller_id'], 'username': row['seller__username']},
+            'is_favorited': self.is_favorited(row, favorite_ids),
+            'created_at': self.format_datetime(row['created_at']),
+        }
+        return self.add_distance(data, row)
+
+    def build_full(self, row, images, favorite_ids):
+        format_datetime = self.format_datetime
+        data = {
+            'id': row['id'],
+            'title': row['title'],
+            'description': row['description'],
+            'price': self.format_price(row['price']),
+            'category': category_registry.serialize(row['category_id']),
+            'location': row['location'],
+            'latitude': None if row['latitude'] is None else self.format_float(row['latitude']),
+            'longitude': None if row['longitude'] is None else self.format_float(row['longitude']),
+            'seller': {
+                'id': row['seller_id'],
+                'username': row['seller__username'],
+                'email': row['seller__email'],
+                'phone_number': row['seller__phone_number'],
+                'profile_picture': row['seller__profile_picture'],
+                'location': row['seller__location'],
+                'created_at': self.format_user_datetime(row['seller__created_at']),
+            },
+            'status': row['status'],
+            'images': [
+                {'id': image['id'], 'image': self.image_url(image['image'], image['variants']), 'is_primary': image['is_primary']}
+                for image in images
+            ],
+            'is_favorited': self.is_favorited(row, favorite_ids),
+            'condition': row['condition'],
+            'is_featured': row['is_featured'],
+            'created_at': format_datetime(row['created_at']),
+            'updated_at': format_datetime(row['updated_at']),
+        }
+        return self.add_distance(data, row)
+
+    def add_distance(self, data, row):
+        # As DistanceMixin
+        distance = row.get('distance_km')
+        if distance is not None:
+            data['distance_km'] = round(distance, 1)
+        return data
@@ -0,0 +1,71 @@
+"""
+Delta sync of a user's favourite listing IDs (`GET /api/listings/favorites/ids/`).
+
+Clients keep the set of favourited listing IDs locally and fill in hearts from it
+instead of asking per listing. Each user's set has a version counter in the shared
+cache (marketplace/cache.py) that moves on every add or remove, and a short change
+log of `[version, listing_id, added]` entries next to it. A client sends the version
+it last saw as `?since=`; if the log still covers every change after it, the
+response only lists what was added and removed, otherwise it is the full set. The
+version doubles as the ETag, so an unchanged set is a 304.
+
+Changes are recorded by the Favorite signals once the transaction commits. Two
+changes recorded concurrently can interleave their log writes; a log whose
+versions aren't contiguous is never used for a delta, so the worst case is a full
+sync.
+"""
+from django.core.cache import cache
+
+from marketplace.cache import bump_version, get_version
+
+from .models import Favorite
+
+# Changes kept per user; a client further behind than this gets the full set
+LOG_LENGTH = 200
+LOG_TIMEOUT = 7 * 24 * 60 * 60
+
+
+def _version_name(user_id):
+    return f'favorites:{user_id}'
+
+
+def _log_key(user_id):
+    return f'favorites-log:{user_id}'
+
+
+def favorites_version(user_id):
+    return get_version(_version_name(user_id))
+
+
+def record_change(user_id, listing_id, added):
+    version = bump_version(_version_name(user_id))
+    log = cache.get(_log_key(user_id)) or []
+    log.append([version, listing_id, added])
+    cache.set(_log_key(user_id), log[-LOG_LENGTH:], timeout=LOG_TIMEOUT)
+
+
+def changes_since(user_id, since, version):
+    """(added, removed) listing IDs between versions `since` and `version`, or None if unknown"""
+    entries = [entry for entry in cache.get(_log_key(user_id)) or [] if entry[0] > since]
+    # Every version after `since` must be in the log, in order
+    if len(entries) != version - since:
+        return None
+    if any(entry[0] != since + offset for offset, entry in enumerate(entries, start=1)):
+        return None
+    state = {}
+    for _, listing_id, added in entries:
+        state[listing_id] = added
+    added = sorted(listing_id for listing_id, is_added in state.items() if is_added)
+    removed = sorted(listing_id for listing_id, is_added in state.items() if not is_added)
+    return added, removed
+
+
+def favorite_ids_payload(user_id, since=None):
+    """The response body for a client at version `since` (None for a first sync)"""
+    version = favorites_version(user_id)
+    if since is not None and 0 < since <= version:
+        delta = changes_since(user_id, since, version)
+        if delta is not None:
+            return {'version': version, 'full': False, 'added': delta[0], 'removed': delta[1]}
+    ids = sorted(Favorite.objects.filter(user_id=user_id).values_list('listing_id', flat=True))
+    return {'version': version, 'full': True, 'ids': ids}
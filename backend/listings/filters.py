@@ -0,0 +1,34 @@
+"""
+Query-string filters for ListingViewSet.
+
+The common shapes (approved listings, optionally narrowed by category / condition /
+price, newest first) are served by the partial indexes declared on Listing.Meta;
+`manage.py explain_listing_filters` shows the plan for each.
+"""
+import django_filters
+
+from .models import Listing
+
+
+class NumberInFilter(django_filters.BaseInFilter, django_filters.NumberFilter):
+    pass
+
+
+class CharInFilter(django_filters.BaseInFilter, django_filters.CharFilter):
+    pass
+
+
+class ListingFilter(django_filters.FilterSet):
+    price_min = django_filters.NumberFilter(field_name='price', lookup_expr='gte')
+    price_max = django_filters.NumberFilter(field_name='price', lookup_expr='lte')
+    # Names the app already sends for the price range
+    price__gte = django_filters.NumberFilter(field_name='price', lookup_expr='gte')
+    price__lte = django_filters.NumberFilter(field_name='price', lookup_expr='lte')
+    # ?category__in=1,4,7 and ?condition__in=new,like_new
+    category__in = NumberInFilter(field_name='category', lookup_expr='in')
+    condition__in = CharInFilter(field_name='condition', lookup_expr='in')
+    created_after = django_filters.IsoDateTimeFilter(field_name='created_at', lookup_expr='gte')
+
+    class Meta:
+        model = Listing
+        fields = ['category', 'location', 'status', 'condition', 'is_featured']
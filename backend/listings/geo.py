@@ -0,0 +1,166 @@
+"""
+"Near me" search for listings.
+
+Listings carry latitude/longitude resolved from their free-text `location` against a
+bundled gazetteer (listings/data/gazetteer.csv) of place names and aliases. New and
+edited listings are geocoded on save; existing rows are backfilled by
+`manage.py geocode_listings`.
+
+A radius query first narrows to the bounding box of the circle, which is a range scan
+on the (latitude, longitude) btree index, then computes the great-circle distance for
+the rows inside the box only, filters on the radius and sorts by it. No PostGIS needed.
+"""
+import csv
+import functools
+import math
+import re
+from pathlib import Path
+
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import ASin, Cos, Power, Radians, Sin, Sqrt
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+GAZETTEER_PATH = Path(__file__).resolve().parent / 'data' / 'gazetteer.csv'
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LATITUDE = 111.195
+DEFAULT_RADIUS_KM = 25
+MAX_RADIUS_KM = 500
+
+_SEPARATOR_RE = re.compile(r'[^\w]+', re.UNICODE)
+
+
+def normalize_place_name(name):
+    """Lower-case, punctuation-insensitive lookup key: "  Navi-Mumbai " -> "navi mumbai" """
+    return _SEPARATOR_RE.sub(' ', (name or '').lower()).strip()
+
+
+@functools.lru_cache(maxsize=None)
+def load_gazetteer():
+    """
+    `{key: entry}` for every name and alias in the gazetteer, where `entry` is a dict
+    with the canonical `key`, `name`, `state`, `country`, `latitude` and `longitude`.
+    """
+    index = {}
+    with open(GAZETTEER_PATH, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            entry = {
+                'key': normalize_place_name(row['name']),
+                'name': row['name'],
+                'state': row['state'],
+                'country': row['country'],
+                'latitude': float(row['latitude']),
+                'longitude': float(row['longitude']),
+            }
+            names = [row['name'], *filter(None, row['aliases'].split('|'))]
+            for name in names:
+                index.setdefault(normalize_place_name(name), entry)
+    return index
+
+
+def geocode(location):
+    """
+    The gazetteer entry for a free-text location, or None. Tries the whole string,
+    then each comma-separated part from the most general (last) one, so
+    "Andheri West, Mumbai" resolves to Mumbai.
+    """
+    gazetteer = load_gazetteer()
+    key = normalize_place_name(location)
+    if key in gazetteer:
+        return gazetteer[key]
+    for part in reversed((location or '').split(',')):
+        entry = gazetteer.get(normalize_place_name(part))
+        if entry is not None:
+            return entry
+    return None
+
+
+def resolve_place(location):
+    """The Place row for a free-text location (created from the gazetteer on first use), or None"""
+    from .models import Place
+
+    entry = geocode(location)
+    if entry is None:
+        return None
+    place, _ = Place.objects.get_or_create(
+        key=entry['key'],
+        defaults={field: entry[field] for field in ('name', 'state', 'country', 'latitude', 'longitude')},
+    )
+    return place
+
+
+def bounding_box(latitude, longitude, radius_km):
+    """
+    (min_lat, max_lat, min_lon, max_lon) enclosing the circle. The longitude range is
+    None when the box reaches a pole or crosses the antimeridian.
+    """
+    delta_lat = radius_km / KM_PER_DEGREE_LATITUDE
+    min_lat, max_lat = latitude - delta_lat, latitude + delta_lat
+    if min_lat <= -90 or max_lat >= 90:
+        return max(min_lat, -90), min(max_lat, 90), None, None
+    delta_lon = radius_km / (KM_PER_DEGREE_LATITUDE * math.cos(math.radians(latitude)))
+    min_lon, max_lon = longitude - delta_lon, longitude + delta_lon
+    if min_lon < -180 or max_lon > 180:
+        return min_lat, max_lat, None, None
+    return min_lat, max_lat, min_lon, max_lon
+
+
+def distance_expression(latitude, longitude):
+    """Haversine distance in km from (latitude, longitude) to each row's coordinates"""
+    def half_sine_squared(delta):
+        return Power(Sin(Radians(delta) / 2), 2)
+
+    origin_lat = Value(latitude, output_field=FloatField())
+    origin_lon = Value(longitude, output_field=FloatField())
+    a = (
+        half_sine_squared(F('latitude') - origin_lat)
+        + Cos(Radians(origin_lat)) * Cos(Radians(F('latitude'))) * half_sine_squared(F('longitude') - origin_lon)
+    )
+    return Value(2 * EARTH_RADIUS_KM, output_field=FloatField()) * ASin(Sqrt(a))
+
+
+def parse_near(value, radius=None):
+    """Validate `near=lat,lon` and `radius_km=` into floats"""
+    try:
+        latitude, longitude = (float(part) for part in value.split(','))
+    except ValueError:
+        raise ValidationError({'near': 'Expected "latitude,longitude".'})
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise ValidationError({'near': 'Coordinates out of range.'})
+    if radius in (None, ''):
+        return latitude, longitude, DEFAULT_RADIUS_KM
+    try:
+        radius = float(radius)
+    except ValueError:
+        raise ValidationError({'radius_km': 'Expected a number.'})
+    if not 0 < radius <= MAX_RADIUS_KM:
+        raise ValidationError({'radius_km': f'Must be between 0 and {MAX_RADIUS_KM}.'})
+    return latitude, longitude, radius
+
+
+def filter_near(queryset, latitude, longitude, radius_km):
+    """Listings within `radius_km`, annotated with `distance_km`"""
+    min_lat, max_lat, min_lon, max_lon = bounding_box(latitude, longitude, radius_km)
+    queryset = queryset.filter(latitude__range=(min_lat, max_lat))
+    if min_lon is not None:
+        queryset = queryset.filter(longitude__range=(min_lon, max_lon))
+    return queryset.annotate(distance_km=distance_expression(latitude, longitude)).filter(
+        distance_km__lte=radius_km
+    )
+
+
+class ListingGeoFilter(BaseFilterBackend):
+    """
+    `?near=lat,lon&radius_km=10`: listings within the radius, annotated with
+    `distance_km`. ListingOrderingFilter sorts by it unless ?ordering is given.
+    """
+    near_param = 'near'
+    radius_param = 'radius_km'
+
+    def filter_queryset(self, request, queryset, view):
+        near = request.query_params.get(self.near_param)
+        if not near:
+            return queryset
+        latitude, longitude, radius = parse_near(near, request.query_params.get(self.radius_param))
+        return filter_near(queryset, latitude, longitude, radius)
@@ -0,0 +1,98 @@
+"""
+Writing a listing's images from the list of values a client submits (blob URLs of
+images it already has, base64 data URIs for new photos, external URLs).
+
+The submitted list is diffed against the listing's current images by content:
+values that identify an existing image (by content hash, or by URL for external
+images) keep their row untouched, new values are stored and inserted with one
+bulk_create, images no longer listed are deleted with one DELETE, and `is_primary`
+(the first submitted image) is fixed up with one UPDATE. Callers run this inside
+the same transaction as the listing save, so a failure leaves the images as they
+were. Resubmitting the current images writes nothing at all.
+
+Rows have no position column: apart from the primary image they stay in upload
+order (ListingImage.Meta.ordering), whatever order they are resubmitted in.
+"""
+from django.db import transaction
+from django.db.models import Case, Value, When
+
+from marketplace.cache import bump_version
+
+from .models import ListingImage
+from .storage import content_hash, store_image
+from .tasks import generate_image_variants_batch
+
+
+def image_identity(value):
+    """What makes two image values the same image: content hash, else the URL"""
+    return content_hash(value) or value
+
+
+def existing_identities(image):
+    """Identities a client may send back for a stored image: original or any variant"""
+    identities = {image_identity(image.image)}
+    for variant in (image.variants or {}).values():
+        for url in variant.values():
+            if isinstance(url, str):
+                identities.add(image_identity(url))
+    return identities
+
+
+def sync_listing_images(listing, values, existing=None):
+    """
+    Make `listing`'s images match `values` (first one primary). Pass `existing=[]`
+    for a listing that was just created. Raises ValueError for a malformed data URI
+    before anything is written.
+    """
+    if existing is None:
+        existing = list(listing.images.all())
+    by_identity = {}
+    for image in existing:
+        for identity in existing_identities(image):
+            by_identity.setdefault(identity, image)
+
+    # (existing image or None, value) in submitted order, duplicates dropped
+    wanted = []
+    seen = set()
+    for value in values:
+        if not value:
+            continue
+        value = str(value)
+        identity = image_identity(value)
+        image = by_identity.get(identity)
+        key = image.pk if image is not None else identity
+        if key in seen:
+            continue
+        seen.add(key)
+        wanted.append((image, value))
+
+    kept_ids = {image.pk for image, _ in wanted if image is not None}
+    removed_ids = [image.pk for image in existing if image.pk not in kept_ids]
+    # Blob writes are content-addressed and idempotent, so they happen up front
+    new_images = [
+        ListingImage(listing=listing, image=store_image(value), is_primary=index == 0)
+        for index, (image, value) in enumerate(wanted) if image is None
+    ]
+    primary_id = wanted[0][0].pk if wanted and wanted[0][0] is not None else None
+    stale_primary = [
+        image.pk for image in existing
+        if image.pk in kept_ids and image.is_primary != (image.pk == primary_id)
+    ]
+    if not (removed_ids or new_images or stale_primary):
+        return False
+
+    with transaction.atomic():
+        if removed_ids:
+            ListingImage.objects.filter(pk__in=removed_ids).delete()
+        if stale_primary:
+            ListingImage.objects.filter(pk__in=stale_primary).update(
+                is_primary=Case(When(pk=primary_id, then=Value(True)), default=Value(False))
+            )
+        if new_images:
+            created = ListingImage.objects.bulk_create(new_images)
+            image_ids = [image.pk for image in created]
+            # bulk_create skips the post_save signals that queue variants and
+            # invalidate cached listing responses
+            transaction.on_commit(lambda: generate_image_variants_batch.delay(image_ids))
+            transaction.on_commit(lambda: bump_version('listings'))
+    return True
@@ -0,0 +1,95 @@
+"""
+Listing image derivatives.
+
+Each uploaded image gets resized copies for the places the app shows it (list
+cards, the detail carousel, full screen), in WebP and JPEG, with EXIF stripped.
+They are built off the request path by the `generate_image_variants` Celery task
+and recorded in `ListingImage.variants`::
+
+    {'card': {'webp': url, 'jpeg': url, 'width': 320, 'height': 240}, ...}
+"""
+import io
+import logging
+
+from django.utils import timezone
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .models import Listing
+from .storage import get_blob_store
+
+logger = logging.getLogger(__name__)
+
+# Longest edge in pixels for each variant
+VARIANT_SIZES = {
+    'card': 320,
+    'detail': 800,
+    'full': 1600,
+}
+
+VARIANT_FORMATS = {
+    'webp': ('WEBP', 'image/webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', 'image/jpeg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+DEFAULT_VARIANT_FORMAT = 'webp'
+
+
+def build_variants(data):
+    """
+    Decode image bytes and return `{size: {format: bytes, 'width': w, 'height': h}}`.
+    Orientation from EXIF is applied to the pixels; no metadata is written out.
+    """
+    with Image.open(io.BytesIO(data)) as original:
+        source = ImageOps.exif_transpose(original).convert('RGB')
+
+    variants = {}
+    for size, max_edge in VARIANT_SIZES.items():
+        resized = source.copy()
+        # thumbnail() only ever shrinks, small uploads keep their size
+        resized.thumbnail((max_edge, max_edge), Image.LANCZOS)
+        variant = {'width': resized.width, 'height': resized.height}
+        for name, (pil_format, _, options) in VARIANT_FORMATS.items():
+            buffer = io.BytesIO()
+            resized.save(buffer, pil_format, **options)
+            variant[name] = buffer.getvalue()
+        variants[size] = variant
+    return variants
+
+
+def process_image(image):
+    """Generate, store and record the variants of a ListingImage"""
+    store = get_blob_store()
+    key = store.key_for_url(image.image)
+    if key is None:
+        # External URLs and legacy base64 rows have no stored original to resize
+        return
+
+    try:
+        built = build_variants(store.read(key))
+    except (OSError, UnidentifiedImageError, Image.DecompressionBombError) as e:
+        logger.warning(f'Could not build variants for image {image.id}: {e}')
+        return
+
+    variants = {}
+    for size, variant in built.items():
+        variants[size] = {'width': variant['width'], 'height': variant['height']}
+        for name, (_, content_type, _) in VARIANT_FORMATS.items():
+            variants[size][name] = store.url(store.save(variant[name], content_type))
+
+    image.variants = variants
+    image.save(update_fields=['variants'])
+    # The listing's image URLs changed: refresh its ETag
+    Listing.objects.filter(pk=image.listing_id).update(updated_at=timezone.now())
+
+
+def variant_url(image, size, image_format=None):
+    """The URL of `image` at the requested size, or the original if there's no such variant"""
+    return pick_variant(image.image, image.variants, size, image_format)
+
+
+def pick_variant(original, variants, size, image_format=None):
+    """variant_url() for an image's raw `image` and `variants` column values"""
+    variant = (variants or {}).get(size)
+    if not variant:
+        return original
+    return variant.get(image_format) or variant.get(DEFAULT_VARIANT_FORMAT) or original
@@ -0,0 +1,239 @@
+"""
+Compare the sync and async views of the hot read endpoints (marketplace/async_api.py)
+under many slow clients. gunicorn.conf.py is started in ASGI mode twice, with
+ASYNC_READ_VIEWS=False and then True, on a free local port with the current settings
+and database. Each run gets the same number of clients, each on its own keep-alive
+connection, that send their request headers in two parts `--trickle` seconds apart,
+as clients on slow mobile links do, and wait around `--think` seconds between
+requests. So most connections are open and idle at any moment, and requests arrive
+spread out.
+
+Requests go to the listing list and detail, categories and, as the first active user
+(whose token bypasses the anonymous response cache), the listing list and unread
+notification count. The command reports requests per second, latency percentiles
+measured from the last byte sent, and the peak number of threads in the workers.
+Django gives each request its own thread for sync code, which for async views is
+their ORM and cache calls and Django's middleware.
+
+    python manage.py bench_async_reads
+    python manage.py bench_async_reads --clients 1000 --think 0.5 --duration 30
+    python manage.py bench_async_reads --workers 1 --path /api/listings/categories/
+
+The clients run in this process on the same machine, so they compete with the server
+for CPU. Compare the two runs with each other rather than reading the numbers as
+capacity.
+"""
+import asyncio
+import os
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import AccessToken
+
+from listings.models import Listing
+
+from .bench_web_server import free_port, read_response
+
+VARIANTS = ('sync', 'async')
+
+
+def default_requests():
+    """(path, authenticated) pairs covering the async endpoints"""
+    listing_ids = list(Listing.objects.filter(status='approved').order_by('-id').values_list('id', flat=True)[:20])
+    if not listing_ids:
+        raise CommandError('No approved listings to request')
+    return [
+        ('/api/listings/', False),
+        ('/api/listings/?page_size=10&view=full', False),
+        *((f'/api/listings/{listing_id}/', False) for listing_id in listing_ids[:5]),
+        ('/api/listings/categories/', False),
+        ('/api/listings/?page_size=10', True),
+        (f'/api/listings/{listing_ids[0]}/', True),
+        ('/api/notifications/unread_count/', True),
+    ]
+
+
+async def slow_client(port, requests, authorization, options, deadline, latencies, errors):
+    rng = random.Random()
+    reader = writer = None
+    # Clients don't all start at once
+    await asyncio.sleep(rng.uniform(0, options['think']))
+    while time.perf_counter() < deadline:
+        path, authenticated = rng.choice(requests)
+        head = f'GET {path} HTTP/1.1\r\nHost: localhost\r\n'
+        if authenticated and authorization:
+            head += f'Authorization: {authorization}\r\n'
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(head.encode())
+            await writer.drain()
+            await asyncio.sleep(options['trickle'])
+            writer.write(b'\r\n')
+            await writer.drain()
+            start = time.perf_counter()
+            status, keep_alive = await read_response(reader)
+        except (OSError, asyncio.IncompleteReadError, ValueError):
+            errors.append('connection')
+            writer = None
+            continue
+        latencies.append(time.perf_counter() - start)
+        if status != 200:
+            errors.append(status)
+        if not keep_alive:
+            writer.close()
+            writer = None
+        await asyncio.sleep(rng.uniform(0, 2 * options['think']))
+    if writer is not None:
+        writer.close()
+
+
+async def load(port, requests, authorization, options):
+    latencies, errors = [], []
+    deadline = time.perf_counter() + options['duration']
+    await asyncio.gather(*(
+        slow_client(port, requests, authorization, options, deadline, latencies, errors)
+        for _ in range(options['clients'])
+    ))
+    return latencies, errors
+
+
+class ThreadSampler(threading.Thread):
+    """Peak total thread count of a gunicorn master's workers, sampled from /proc"""
+
+    def __init__(self, master_pid, interval=0.05):
+        super().__init__(daemon=True)
+        self.master_pid = master_pid
+        self.interval = interval
+        self.peak = 0
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.peak = max(self.peak, sum(self.threads(pid) for pid in self.workers()))
+
+    def workers(self):
+        output = subprocess.run(['pgrep', '-P', str(self.master_pid)], capture_output=True, text=True).stdout
+        return output.split()
+
+    def threads(self, pid):
+        try:
+            with open(f'/proc/{pid}/status') as status:
+                for line in status:
+                    if line.startswith('Threads:'):
+                        return int(line.split()[1])
+        except OSError:
+            pass
+        return 0
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+class Command(BaseCommand):
+    help = 'Compare the sync and async read views under ASGI with many slow clients'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=500, help='Concurrent client connections')
+        parser.add_argument('--duration', type=float, default=15, help='Seconds of load per variant')
+        parser.add_argument('--think', type=float, default=1.0, help='Average seconds between a client\'s requests')
+        parser.add_argument('--trickle', type=float, default=0.2, help='Seconds between the two parts of each request')
+        parser.add_argument('--workers', type=int, help='Worker processes (default: gunicorn.conf.py)')
+        parser.add_argument('--path', action='append', dest='paths', help='Anonymous path to request (repeatable)')
+        parser.add_argument('--variant', choices=VARIANTS, action='append', dest='variants', help='Only this variant')
+
+    def handle(self, *args, **options):
+        if options['paths']:
+            requests = [(path, False) for path in options['paths']]
+        else:
+            requests = default_requests()
+        user = get_user_model().objects.filter(is_active=True).order_by('pk').first()
+        authorization = f'Bearer {AccessToken.for_user(user)}' if user else None
+        if authorization is None:
+            requests = [request for request in requests if not request[1]]
+
+        results = [
+            self.run_variant(variant, requests, authorization, options)
+            for variant in options['variants'] or VARIANTS
+        ]
+
+        self.stdout.write('')
+        self.stdout.write(
+            f'{"views":6} {"workers":>7} {"requests":>9} {"errors":>7} {"req/s":>9} '
+            f'{"p50 ms":>8} {"p90 ms":>8} {"p99 ms":>8} {"max ms":>8}  {"threads":>7}'
+        )
+        for row in results:
+            self.stdout.write(
+                f'{row["variant"]:6} {row["workers"]:>7} {row["requests"]:>9} {row["errors"]:>7} {row["rps"]:>9.1f} '
+                f'{row["p50"]:>8.1f} {row["p90"]:>8.1f} {row["p99"]:>8.1f} {row["max"]:>8.1f}  {row["threads"]:>7}'
+            )
+
+    def run_variant(self, variant, requests, authorization, options):
+        port = free_port()
+        env = {
+            **os.environ,
+            'SERVER_MODE': 'asgi',
+            'ASYNC_READ_VIEWS': str(variant == 'async'),
+            'PORT': str(port),
+            'GUNICORN_ACCESS_LOG': '',
+            'GUNICORN_LOG_LEVEL': 'warning',
+        }
+        if options['workers']:
+            env['WEB_CONCURRENCY'] = str(options['workers'])
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py'],
+            cwd=settings.BASE_DIR, env=env,
+        )
+        sampler = ThreadSampler(server.pid)
+        try:
+            self.wait_until_ready(server, port)
+            # Warm up imports, caches and database pools in every worker
+            asyncio.run(load(port, requests, authorization, {**options, 'clients': 16, 'duration': 1, 'think': 0, 'trickle': 0}))
+            workers = len(sampler.workers())
+            self.stdout.write(
+                f'{variant} views: {workers} workers, {options["clients"]} clients, {options["duration"]}s'
+            )
+            sampler.start()
+            latencies, errors = asyncio.run(load(port, requests, authorization, options))
+            sampler.stop()
+        finally:
+            server.terminate()
+            server.wait(timeout=60)
+
+        if not latencies:
+            raise CommandError(f'{variant}: no responses')
+        latencies_ms = sorted(latency * 1000 for latency in latencies)
+        percentiles = statistics.quantiles(latencies_ms, n=100) if len(latencies_ms) > 1 else latencies_ms * 99
+        return {
+            'variant': variant,
+            'workers': workers,
+            'requests': len(latencies),
+            'errors': len(errors),
+            'rps': len(latencies) / options['duration'],
+            'p50': percentiles[49],
+            'p90': percentiles[89],
+            'p99': percentiles[98],
+            'max': latencies_ms[-1],
+            'threads': sampler.peak,
+        }
+
+    def wait_until_ready(self, server, port, timeout=60):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError(f'gunicorn exited with {server.returncode}')
+            try:
+                urllib.request.urlopen(f'http://127.0.0.1:{port}/health/', timeout=1).read()
+                return
+            except OSError:
+                time.sleep(0.2)
+        raise CommandError('gunicorn did not start in time')
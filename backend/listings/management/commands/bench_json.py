@@ -0,0 +1,96 @@
+"""
+Benchmark JSON rendering and parsing: DRF's stdlib JSONRenderer/JSONParser against
+the orjson-backed FastJSONRenderer/FastJSONParser used by the API.
+
+Rendering is measured on real listing pages (the serializer output of the listing
+endpoint, card and full views); parsing on those pages and on a listing create body
+with base64 images, the largest request the app sends.
+
+    python manage.py bench_json
+    python manage.py bench_json --page-size 100 --image-mb 20 --repeat 10
+"""
+import base64
+import io
+import json
+import os
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from listings.models import Listing
+from listings.serializers import ListingCardSerializer, ListingSerializer
+from marketplace.parsers import FastJSONParser
+from marketplace.renderers import FastJSONRenderer, orjson
+
+
+class Command(BaseCommand):
+    help = 'Compare stdlib and orjson JSON render/parse throughput on listing payloads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page-size', type=int, default=20)
+        parser.add_argument('--image-mb', type=float, default=5, help='Total size of the base64 images in the create body')
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            self.stdout.write(self.style.WARNING('orjson is not installed: both sides use the stdlib'))
+
+        listings = list(
+            Listing.objects.filter(status='approved').select_related('seller').prefetch_related('images')
+            [:options['page_size']]
+        )
+        if not listings:
+            raise CommandError('No approved listings: seed some with bench_listing_serialization --seed')
+        pages = {
+            'card page': {'next': None, 'results': ListingCardSerializer(listings, many=True).data},
+            'full page': {'next': None, 'results': ListingSerializer(listings, many=True).data},
+        }
+
+        for name, data in pages.items():
+            expected = JSONRenderer().render(data)
+            if FastJSONRenderer().render(data) != expected:
+                raise CommandError(f'{name}: FastJSONRenderer output differs from JSONRenderer')
+            self.compare(
+                f'render {name}', len(expected), options['repeat'],
+                lambda: JSONRenderer().render(data),
+                lambda: FastJSONRenderer().render(data),
+            )
+
+        image = base64.b64encode(os.urandom(int(options['image_mb'] * 1024 * 1024 * 3 / 4 / 4))).decode()
+        bodies = {
+            'full page': JSONRenderer().render(pages['full page']),
+            'create body': json.dumps({
+                'title': 'Wooden study table', 'description': 'Barely used. ' * 20, 'price': '4500.00',
+                'category_id': 1, 'location': 'Pune',
+                'images': [f'data:image/jpeg;base64,{image}'] * 4,
+            }).encode(),
+        }
+        for name, body in bodies.items():
+            if FastJSONParser().parse(io.BytesIO(body)) != JSONParser().parse(io.BytesIO(body)):
+                raise CommandError(f'{name}: FastJSONParser result differs from JSONParser')
+            self.compare(
+                f'parse {name}', len(body), options['repeat'],
+                lambda: JSONParser().parse(io.BytesIO(body)),
+                lambda: FastJSONParser().parse(io.BytesIO(body)),
+            )
+
+    def compare(self, name, size, repeat, stdlib, fast):
+        stdlib_ms = statistics.median(self.time(stdlib, repeat))
+        fast_ms = statistics.median(self.time(fast, repeat))
+        megabytes = size / (1024 * 1024)
+        self.stdout.write(
+            f'{name:18} {size / 1024:10.1f} KB   stdlib {stdlib_ms:8.2f} ms ({megabytes / stdlib_ms * 1000:7.1f} MB/s)   '
+            f'orjson {fast_ms:8.2f} ms ({megabytes / fast_ms * 1000:7.1f} MB/s)   {stdlib_ms / fast_ms:5.1f}x'
+        )
+
+    def time(self, run, repeat):
+        run()  # warm up
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            run()
+            timings.append((time.perf_counter() - start) * 1000)
+        return timings
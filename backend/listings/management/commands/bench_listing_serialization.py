@@ -0,0 +1,163 @@
+"""
+Check the listing fast path against the DRF serializers and benchmark both.
+
+Every endpoint is requested twice, once through the serializers (LISTING_FAST_PATH
+off) and once through listings/fastpath.py. The serializer response is rendered with
+DRF's stdlib JSONRenderer, and the fast path response must match it byte for byte.
+Both are then timed.
+
+    python manage.py bench_listing_serialization --seed 2000
+    python manage.py bench_listing_serialization --repeat 50 --page-size 50
+    python manage.py bench_listing_serialization --cleanup
+"""
+import random
+import statistics
+import time
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from listings.models import Category, Favorite, Listing, ListingImage
+from listings.views import ListingViewSet
+
+User = get_user_model()
+
+BENCH_USERNAME = 'bench-serialization-seller'
+CITIES = ('Mumbai', 'Pune', 'Delhi', 'Bengaluru', 'Chennai', 'Kolkata')
+
+
+class Command(BaseCommand):
+    help = 'Verify the listing fast path output against the serializers and time both'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Insert this many synthetic listings (with images and favourites) first')
+        parser.add_argument('--page-size', type=int, default=20)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--cleanup', action='store_true', help='Delete the synthetic listings and exit')
+
+    def handle(self, *args, **options):
+        if options['cleanup']:
+            deleted, _ = User.objects.filter(username=BENCH_USERNAME).delete()
+            self.stdout.write(f'Deleted {deleted} rows')
+            return
+        if options['seed']:
+            self.seed(options['seed'])
+
+        user = User.objects.filter(username=BENCH_USERNAME).first()
+        listing = Listing.objects.filter(status='approved').order_by('-created_at').first()
+        if user is None or listing is None:
+            raise CommandError('Nothing to benchmark: run with --seed first')
+
+        page = {'page_size': options['page_size']}
+        cases = [
+            ('list', {'get': 'list'}, {}, page),
+            ('list full', {'get': 'list'}, {}, {**page, 'view': 'full'}),
+            ('list by price', {'get': 'list'}, {}, {**page, 'ordering': 'price', 'size': 'detail'}),
+            ('list near', {'get': 'list'}, {}, {**page, 'near': '19.07,72.88', 'radius_km': 200}),
+            ('favorites', {'get': 'favorites'}, {}, {}),
+            ('favorites full', {'get': 'favorites'}, {}, {'view': 'full'}),
+            ('similar', {'get': 'similar'}, {'pk': listing.pk}, {}),
+            ('similar full', {'get': 'similar'}, {'pk': listing.pk}, {'view': 'full'}),
+        ]
+
+        failures = []
+        for name, actions, kwargs, params in cases:
+            for viewer in (user, None):
+                if viewer is None and actions['get'] == 'favorites':
+                    continue
+                label = f'{name} ({"user" if viewer else "anonymous"})'
+                expected = self.render(actions, kwargs, params, viewer, fast=False, private_cache=True)
+                actual = self.render(actions, kwargs, params, viewer, fast=True, private_cache=True)
+                if actual != expected:
+                    failures.append(label)
+                    self.stdout.write(self.style.ERROR(f'{label}: output differs'))
+                    self.stdout.write(f'  serializers: {expected[:300]!r}')
+                    self.stdout.write(f'  fast path:   {actual[:300]!r}')
+        if failures:
+            raise CommandError(f'Fast path output differs for: {", ".join(failures)}')
+        self.stdout.write(self.style.SUCCESS('Fast path output matches the serializers byte for byte'))
+
+        # Timed as the seller, whose responses are never cached
+        for name, actions, kwargs, params in cases:
+            slow = self.time(lambda: self.render(actions, kwargs, params, user, fast=False), options['repeat'])
+            fast = self.time(lambda: self.render(actions, kwargs, params, user, fast=True), options['repeat'])
+            self.stdout.write(
+                f'{name:16} serializers {statistics.median(slow):8.2f} ms   '
+                f'fast path {statistics.median(fast):8.2f} ms   '
+                f'speedup {statistics.median(slow) / statistics.median(fast):5.1f}x'
+            )
+
+    def render(self, actions, kwargs, params, user, fast, private_cache=False):
+        overrides = {'LISTING_FAST_PATH': fast}
+        if private_cache:
+            # An empty cache for this request only, so anonymous responses are never
+            # served from the response cache
+            overrides['CACHES'] = {'default': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                'LOCATION': f'bench-{uuid.uuid4().hex}',
+            }}
+        with override_settings(**overrides):
+            request = APIRequestFactory().get('/api/listings/', params)
+            if user is not None:
+                force_authenticate(request, user=user)
+            response = ListingViewSet.as_view(actions)(request, **kwargs)
+            if response.status_code != 200:
+                raise CommandError(f'{actions["get"]} returned {response.status_code}: {response.data}')
+            if fast:
+                return response.render().content
+            # The serializer path as rendered before the fast path existed
+            return JSONRenderer().render(response.data)
+
+    def time(self, run, repeat):
+        run()  # warm caches
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            run()
+            timings.append((time.perf_counter() - start) * 1000)
+        return timings
+
+    def seed(self, count):
+        seller, _ = User.objects.get_or_create(username=BENCH_USERNAME, defaults={'email': 'bench@example.com'})
+        categories = list(Category.objects.all()) or [Category.objects.create(name='Bench', slug='bench')]
+        rng = random.Random(7)
+        listings = []
+        for i in range(count):
+            listing = Listing(
+                title=f'Bench listing {i} café' + ('\u2028' if i % 50 == 0 else ''),
+                description='Synthetic listing for serialization benchmarks. ' * 4,
+                price=f'{rng.randint(100, 200000)}.{rng.randint(0, 99):02d}',
+                category=rng.choice(categories),
+                location=rng.choice(CITIES),
+                seller=seller,
+                status='approved',
+                condition=rng.choice(Listing.CONDITION_CHOICES)[0],
+            )
+            # bulk_create skips the pre_save geocoding signal; fill in coordinates directly
+            listing.latitude = 19.0 + rng.random()
+            listing.longitude = 72.5 + rng.random()
+            listings.append(listing)
+        listings = Listing.objects.bulk_create(listings, batch_size=1000)
+
+        images = []
+        for listing in listings:
+            for position in range(3):
+                key = uuid.uuid4().hex * 2
+                images.append(ListingImage(
+                    listing=listing,
+                    image=f'/api/listings/images/{key[:2]}/{key[2:4]}/{key}.jpg',
+                    is_primary=position == 0,
+                    variants={'card': {'webp': f'/api/listings/images/{key[:2]}/{key[2:4]}/{key}-card.webp',
+                                       'width': 320, 'height': 240}} if position == 0 else {},
+                ))
+        ListingImage.objects.bulk_create(images, batch_size=1000)
+        Favorite.objects.bulk_create(
+            [Favorite(user=seller, listing=listing) for listing in rng.sample(listings, min(len(listings), 50))],
+            ignore_conflicts=True,
+        )
+        self.stdout.write(f'Seeded {len(listings)} listings, {len(images)} images')
@@ -0,0 +1,81 @@
+"""
+Compare MessagePack with JSON for what the mobile app downloads: listing pages
+(card and full views) and chat traffic (the per-message frames ChatConsumer sends).
+Reports payload size, raw and gzipped, and encode time.
+
+    python manage.py bench_msgpack
+    python manage.py bench_msgpack --page-size 50 --messages 2000
+"""
+import gzip
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from listings.models import Listing
+from listings.serializers import ListingCardSerializer, ListingSerializer
+from marketplace.renderers import FastJSONRenderer, msgpack_dumps
+
+
+class Command(BaseCommand):
+    help = 'Compare MessagePack and JSON payload sizes and encode times'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page-size', type=int, default=20)
+        parser.add_argument('--messages', type=int, default=1000, help='Chat messages to encode')
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        listings = list(
+            Listing.objects.filter(status='approved').select_related('seller').prefetch_related('images')
+            [:options['page_size']]
+        )
+        if not listings:
+            raise CommandError('No approved listings: seed some with bench_listing_serialization --seed')
+
+        renderer = FastJSONRenderer()
+        pages = {
+            'card page': {'next': None, 'results': ListingCardSerializer(listings, many=True).data},
+            'full page': {'next': None, 'results': ListingSerializer(listings, many=True).data},
+        }
+        for name, data in pages.items():
+            self.compare(name, options['repeat'], lambda: renderer.render(data), lambda: msgpack_dumps(data))
+
+        # One frame per message, as ChatConsumer.chat_message sends them
+        now = timezone.now()
+        messages = [
+            {
+                'id': 100000 + i,
+                'sender': {'id': 40 + i % 2, 'username': ('asha_k', 'rahul.m')[i % 2]},
+                'content': ('Is this still available?', 'Yes, you can pick it up tomorrow', 'Ok 👍')[i % 3],
+                'created_at': now.isoformat(),
+            }
+            for i in range(options['messages'])
+        ]
+        self.compare(
+            f'chat x{len(messages)}', options['repeat'],
+            lambda: b''.join(json.dumps(message).encode() for message in messages),
+            lambda: b''.join(msgpack_dumps(message) for message in messages),
+        )
+
+    def compare(self, name, repeat, encode_json, encode_msgpack):
+        json_body, msgpack_body = encode_json(), encode_msgpack()
+        json_ms = statistics.median(self.time(encode_json, repeat))
+        msgpack_ms = statistics.median(self.time(encode_msgpack, repeat))
+        self.stdout.write(
+            f'{name:12} json {len(json_body) / 1024:8.1f} KB (gzip {len(gzip.compress(json_body)) / 1024:6.1f})'
+            f' {json_ms:7.2f} ms   msgpack {len(msgpack_body) / 1024:8.1f} KB'
+            f' (gzip {len(gzip.compress(msgpack_body)) / 1024:6.1f}) {msgpack_ms:7.2f} ms'
+            f'   size {len(msgpack_body) / len(json_body):5.0%}'
+        )
+
+    def time(self, run, repeat):
+        run()
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            run()
+            timings.append((time.perf_counter() - start) * 1000)
+        return timings
@@ -0,0 +1,119 @@
+"""
+Benchmark listing search: DRF SearchFilter (icontains) vs the tsvector search engine.
+
+    python manage.py bench_search --seed 1000000
+    python manage.py bench_search --terms "iphone" "red sofa" --repeat 20
+    python manage.py bench_search --cleanup
+"""
+import random
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from rest_framework import filters
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from listings.models import Category, Listing
+from listings.search import search_listings, supports_full_text_search
+
+User = get_user_model()
+
+BENCH_USERNAME = 'bench-search-seller'
+
+WORDS = (
+    'iphone samsung pixel laptop macbook sofa table chair bed wardrobe bicycle '
+    'scooter car bike guitar piano camera lens tv monitor keyboard mouse desk lamp '
+    'fridge washing machine microwave oven fan cooler heater shoes jacket watch '
+    'book novel stroller cot toy console controller headphones speaker tablet'
+).split()
+ADJECTIVES = 'red blue black white new used mint vintage wooden steel leather compact large'.split()
+CITIES = 'Mumbai Delhi Bengaluru Hyderabad Chennai Kolkata Pune Ahmedabad Jaipur Lucknow'.split()
+
+DEFAULT_TERMS = ['iphone', 'wooden table', 'leather sofa mumbai', 'gui']
+
+
+class Command(BaseCommand):
+    help = 'Compare SearchFilter icontains scans against the full-text search engine'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Insert this many synthetic listings before benchmarking')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--terms', nargs='+', default=DEFAULT_TERMS)
+        parser.add_argument('--repeat', type=int, default=10)
+        parser.add_argument('--cleanup', action='store_true',
+                            help='Delete the synthetic listings and exit')
+
+    def handle(self, *args, **options):
+        if options['cleanup']:
+            deleted, _ = User.objects.filter(username=BENCH_USERNAME).delete()
+            self.stdout.write(f'Deleted {deleted} rows')
+            return
+
+        if options['seed']:
+            self.seed(options['seed'], options['batch_size'])
+
+        queryset = Listing.objects.filter(status='approved')
+        if not supports_full_text_search(queryset):
+            self.stdout.write(self.style.WARNING(
+                'Full-text search needs PostgreSQL; only the SearchFilter baseline will run.'
+            ))
+
+        self.stdout.write(f'{queryset.count()} approved listings')
+        for term in options['terms']:
+            baseline = self.time_query(lambda: self.search_filter_page(queryset, term), options['repeat'])
+            self.report(term, 'SearchFilter', baseline)
+            if supports_full_text_search(queryset):
+                engine = self.time_query(
+                    lambda: list(search_listings(queryset, [term]).order_by('-search_rank', '-created_at')[:20]),
+                    options['repeat'],
+                )
+                self.report(term, 'tsvector', engine)
+                self.stdout.write(f'  speedup: {statistics.median(baseline) / statistics.median(engine):.1f}x')
+
+    def seed(self, count, batch_size):
+        seller, _ = User.objects.get_or_create(username=BENCH_USERNAME)
+        categories = list(Category.objects.all()) or [None]
+        rng = random.Random(42)
+        created = 0
+        while created < count:
+            size = min(batch_size, count - created)
+            Listing.objects.bulk_create([
+                Listing(
+                    title=' '.join(rng.sample(ADJECTIVES, 1) + rng.sample(WORDS, 2)).title(),
+                    description=' '.join(rng.choices(WORDS + ADJECTIVES, k=40)),
+                    price=rng.randint(100, 200000),
+                    category=rng.choice(categories),
+                    location=rng.choice(CITIES),
+                    seller=seller,
+                    status='approved',
+                )
+                for _ in range(size)
+            ])
+            created += size
+            self.stdout.write(f'Seeded {created}/{count}', ending='\r')
+        self.stdout.write('')
+
+    def search_filter_page(self, queryset, term):
+        """Run the query exactly as the previous SearchFilter configuration built it"""
+        view = type('BenchView', (), {'search_fields': ['title', 'description', 'location']})()
+        request = Request(APIRequestFactory().get('/api/listings/', {'search': term}))
+        return list(filters.SearchFilter().filter_queryset(request, queryset, view).order_by('-created_at')[:20])
+
+    def time_query(self, run, repeat):
+        run()  # warm caches
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            run()
+            timings.append((time.perf_counter() - start) * 1000)
+        return timings
+
+    def report(self, term, engine, timings):
+        timings = sorted(timings)
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        self.stdout.write(
+            f'{term!r:28} {engine:13} median {statistics.median(timings):8.2f} ms   p95 {p95:8.2f} ms'
+        )
@@ -0,0 +1,199 @@
+"""
+Load test the web server in both modes of gunicorn.conf.py: SERVER_MODE=asgi
+(uvicorn workers) and SERVER_MODE=wsgi (sync workers). Each mode is started as a
+real gunicorn on a free local port with the current settings and database, then
+loaded with the same number of concurrent keep-alive clients for the same time.
+The command reports requests per second and latency percentiles for each mode, and
+the status of a websocket handshake to /ws/chat/: 101 when it is served (the
+consumer needs the channel layer's Redis, without it the handshake fails with 500),
+404 when it isn't.
+
+    python manage.py bench_web_server
+    python manage.py bench_web_server --concurrency 200 --duration 20
+    python manage.py bench_web_server --workers 4 --path /api/listings/categories/
+
+The clients run in this process on the same machine, so they compete with the server
+for CPU. Compare modes with each other rather than reading the numbers as capacity.
+"""
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+DEFAULT_PATHS = ('/api/listings/?page_size=20', '/api/listings/categories/', '/health/')
+MODES = ('wsgi', 'asgi')
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+async def read_response(reader):
+    """Status code and whether the server keeps the connection open"""
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    status = int(lines[0].split()[1])
+    headers = {}
+    for line in lines[1:]:
+        if ':' in line:
+            name, value = line.split(':', 1)
+            headers[name.strip().lower()] = value.strip().lower()
+    if headers.get('transfer-encoding') == 'chunked':
+        while True:
+            size = int((await reader.readuntil(b'\r\n')).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    elif 'content-length' in headers:
+        await reader.readexactly(int(headers['content-length']))
+    else:
+        await reader.read()
+        return status, False
+    return status, headers.get('connection') != 'close'
+
+
+async def client(port, paths, deadline, offset, latencies, errors):
+    reader = writer = None
+    index = offset
+    while time.perf_counter() < deadline:
+        path = paths[index % len(paths)]
+        index += 1
+        start = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(f'GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n'.encode())
+            await writer.drain()
+            status, keep_alive = await read_response(reader)
+        except (OSError, asyncio.IncompleteReadError, ValueError):
+            errors.append('connection')
+            writer = None
+            continue
+        latencies.append(time.perf_counter() - start)
+        if status != 200:
+            errors.append(status)
+        if not keep_alive:
+            writer.close()
+            writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def load(port, paths, concurrency, duration):
+    latencies, errors = [], []
+    deadline = time.perf_counter() + duration
+    await asyncio.gather(*(
+        client(port, paths, deadline, offset, latencies, errors) for offset in range(concurrency)
+    ))
+    return latencies, errors
+
+
+async def websocket_status(port):
+    """Status of an anonymous websocket handshake to the chat route"""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(
+        b'GET /ws/chat/1/ HTTP/1.1\r\nHost: localhost\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n'
+        b'Sec-WebSocket-Key: dGhlIHNhbXBsZSBub25jZQ==\r\nSec-WebSocket-Version: 13\r\n\r\n'
+    )
+    await writer.drain()
+    line = await reader.readline()
+    writer.close()
+    return int(line.split()[1])
+
+
+class Command(BaseCommand):
+    help = 'Compare requests per second and latency of the ASGI and WSGI server modes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=100, help='Concurrent client connections')
+        parser.add_argument('--duration', type=float, default=10, help='Seconds of load per mode')
+        parser.add_argument('--workers', type=int, help='Workers per mode (default: gunicorn.conf.py for each mode)')
+        parser.add_argument('--path', action='append', dest='paths', help='Path to request (repeatable)')
+        parser.add_argument('--mode', choices=MODES, action='append', dest='modes', help='Only this mode')
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or list(DEFAULT_PATHS)
+        results = []
+        for mode in options['modes'] or MODES:
+            results.append(self.run_mode(mode, paths, options))
+
+        self.stdout.write('')
+        self.stdout.write(
+            f'{"mode":6} {"workers":>7} {"requests":>9} {"errors":>7} {"req/s":>9} '
+            f'{"p50 ms":>8} {"p90 ms":>8} {"p99 ms":>8} {"max ms":>8}  {"ws status":>9}'
+        )
+        for row in results:
+            self.stdout.write(
+                f'{row["mode"]:6} {row["workers"]:>7} {row["requests"]:>9} {row["errors"]:>7} {row["rps"]:>9.1f} '
+                f'{row["p50"]:>8.1f} {row["p90"]:>8.1f} {row["p99"]:>8.1f} {row["max"]:>8.1f}  {row["websocket"]:>9}'
+            )
+
+    def run_mode(self, mode, paths, options):
+        port = free_port()
+        env = {
+            **os.environ,
+            'SERVER_MODE': mode,
+            'PORT': str(port),
+            'GUNICORN_ACCESS_LOG': '',
+            'GUNICORN_LOG_LEVEL': 'warning',
+        }
+        if options['workers']:
+            env['WEB_CONCURRENCY'] = str(options['workers'])
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py'],
+            cwd=settings.BASE_DIR, env=env,
+        )
+        try:
+            self.wait_until_ready(server, port)
+            # Warm up imports, caches and database pools in every worker
+            asyncio.run(load(port, paths, 16, 1))
+            workers = int(env.get('WEB_CONCURRENCY') or self.worker_count(server))
+            self.stdout.write(f'{mode}: {workers} workers, {options["concurrency"]} clients, {options["duration"]}s')
+            latencies, errors = asyncio.run(load(port, paths, options['concurrency'], options['duration']))
+            websocket = asyncio.run(websocket_status(port))
+        finally:
+            server.terminate()
+            server.wait(timeout=60)
+
+        if not latencies:
+            raise CommandError(f'{mode}: no responses')
+        latencies_ms = sorted(latency * 1000 for latency in latencies)
+        percentiles = statistics.quantiles(latencies_ms, n=100) if len(latencies_ms) > 1 else latencies_ms * 99
+        return {
+            'mode': mode,
+            'workers': workers,
+            'requests': len(latencies),
+            'errors': len(errors),
+            'rps': len(latencies) / options['duration'],
+            'p50': percentiles[49],
+            'p90': percentiles[89],
+            'p99': percentiles[98],
+            'max': latencies_ms[-1],
+            'websocket': websocket,
+        }
+
+    def wait_until_ready(self, server, port, timeout=60):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError(f'gunicorn exited with {server.returncode}')
+            try:
+                urllib.request.urlopen(f'http://127.0.0.1:{port}/health/', timeout=1).read()
+                return
+            except OSError:
+                time.sleep(0.2)
+        raise CommandError('gunicorn did not start in time')
+
+    def worker_count(self, server):
+        # Children of the gunicorn master
+        output = subprocess.run(['pgrep', '-P', str(server.pid)], capture_output=True, text=True).stdout
+        return len(output.split())
@@ -0,0 +1,23 @@
+"""
+Queue variant generation for listing images that don't have variants yet,
+e.g. after `migrate_image_blobs` has moved old base64 rows into the blob store.
+"""
+from django.core.management.base import BaseCommand
+
+from listings.models import ListingImage
+from listings.tasks import generate_image_variants
+
+
+class Command(BaseCommand):
+    help = 'Queue thumbnail/WebP generation for images without variants'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        image_ids = ListingImage.objects.filter(variants={}).order_by('pk').values_list('id', flat=True)
+        queued = 0
+        for image_id in image_ids.iterator(chunk_size=options['batch_size']):
+            generate_image_variants.delay(image_id)
+            queued += 1
+        self.stdout.write(self.style.SUCCESS(f'Queued {queued} images'))
@@ -0,0 +1,232 @@
+"""
+Exercise the database connection pool (marketplace/db_pool) through the real WSGI
+and ASGI entrypoints, with more concurrent requests than the pool has connections.
+
+Needs PostgreSQL with pooling on (the default for a postgres DATABASE_URL) and a
+database no other process is connected to, since it counts the server's connections:
+
+    DATABASE_URL=postgres://localhost/marketplace python manage.py check_db_pool
+
+It checks that:
+- WSGI: 4 x max_size threads calling marketplace.wsgi.application never open more
+  than max_size server connections, and every connection is back in the pool after
+- ASGI: the same with concurrent requests to marketplace.asgi.application, plus
+  websocket-style database_sync_to_async calls each on their own thread
+- connections killed on the server are replaced on checkout instead of failing
+  requests
+- an exhausted pool fails a request with a 500 after the pool timeout
+"""
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import psycopg
+from asgiref.sync import ThreadSensitiveContext
+from channels.db import database_sync_to_async
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.client import RequestFactory
+
+from marketplace.db_pool import close_pool, pool_stats
+
+LISTINGS_PATH = '/api/listings/'
+CLIENT_CONNECTIONS_SQL = (
+    "SELECT count(*) FROM pg_stat_activity "
+    "WHERE datname = current_database() AND pid <> pg_backend_pid() AND backend_type = 'client backend'"
+)
+
+
+class ConnectionMonitor:
+    """Samples the server's connection count from a connection of its own"""
+
+    def __init__(self, connect_kwargs):
+        self.connection = psycopg.connect(**connect_kwargs, autocommit=True)
+        self.peak = 0
+        self.running = False
+
+    def count(self):
+        return self.connection.execute(CLIENT_CONNECTIONS_SQL).fetchone()[0]
+
+    def terminate_idle(self):
+        return self.connection.execute(
+            "SELECT count(pg_terminate_backend(pid)) FROM pg_stat_activity "
+            "WHERE datname = current_database() AND pid <> pg_backend_pid() AND state = 'idle'"
+        ).fetchone()[0]
+
+    def sample(self):
+        while self.running:
+            self.peak = max(self.peak, self.count())
+            time.sleep(0.005)
+
+    def __enter__(self):
+        self.peak = 0
+        self.running = True
+        self.thread = threading.Thread(target=self.sample, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.running = False
+        self.thread.join()
+
+
+def wsgi_get(path):
+    from marketplace.wsgi import application
+
+    # A fresh query string each time, so no response comes from the response cache
+    environ = RequestFactory()._base_environ(
+        PATH_INFO=path, QUERY_STRING=f'page_size=5&check={uuid.uuid4().hex}', REQUEST_METHOD='GET',
+    )
+    status = []
+    response = application(environ, lambda code, headers, exc_info=None: status.append(int(code.split()[0])))
+    b''.join(response)
+    # What a WSGI server does when it's done: fires request_finished
+    response.close()
+    return status[0]
+
+
+async def asgi_get(path):
+    from marketplace.asgi import application
+
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+        'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'root_path': '',
+        'query_string': f'page_size=5&check={uuid.uuid4().hex}'.encode(),
+        'headers': [(b'host', b'localhost')], 'client': ('127.0.0.1', 50000), 'server': ('localhost', 80),
+    }
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    await application(scope, receive, send)
+    return messages[0]['status']
+
+
+@database_sync_to_async
+def consumer_query():
+    # Holds its connection a little, like ChatConsumer.save_message
+    with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+        cursor.execute('SELECT pg_sleep(0.02)')
+
+
+async def consumer_call():
+    # Its own thread, as if every websocket consumer ran its database calls separately
+    async with ThreadSensitiveContext():
+        await consumer_query()
+
+
+class Command(BaseCommand):
+    help = 'Check that the database connection pool stays bounded under WSGI and ASGI'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Requests per scenario')
+
+    def handle(self, *args, **options):
+        connection = connections[DEFAULT_DB_ALIAS]
+        if connection.settings_dict['ENGINE'] != 'marketplace.db_pool':
+            raise CommandError('The default database is not pooled: use PostgreSQL with DATABASE_POOL=True')
+
+        # Start from an empty pool with fresh stats
+        connection.close()
+        close_pool(DEFAULT_DB_ALIAS)
+        pool = connection.pool
+        pool.open(wait=True)
+        max_size = pool.max_size
+        concurrency = max_size * 4
+        total = options['requests']
+        self.failures = []
+        self.stdout.write(f'Pool min_size={pool.min_size} max_size={max_size}; {concurrency} concurrent clients')
+
+        # Waiting for connections is the point here; the waits are reported below instead
+        for name in ('marketplace.db_pool', 'psycopg.pool'):
+            logging.getLogger(name).setLevel(logging.ERROR)
+        monitor = ConnectionMonitor(connection.get_connection_params())
+        try:
+            with monitor:
+                with ThreadPoolExecutor(concurrency) as executor:
+                    statuses = list(executor.map(lambda _: wsgi_get(LISTINGS_PATH), range(total)))
+            self.report('WSGI', statuses, monitor, max_size)
+
+            with monitor:
+                statuses = asyncio.run(self.asgi_load(total, concurrency))
+            self.report('ASGI', statuses, monitor, max_size)
+
+            with monitor:
+                asyncio.run(self.consumer_load(total, concurrency))
+            self.report('database_sync_to_async', [200] * total, monitor, max_size)
+
+            killed = monitor.terminate_idle()
+            lost_before = pool_stats()[DEFAULT_DB_ALIAS]['connections_lost']
+            statuses = [wsgi_get(LISTINGS_PATH) for _ in range(max_size)]
+            lost = pool_stats()[DEFAULT_DB_ALIAS]['connections_lost'] - lost_before
+            self.expect(
+                f'{killed} connections killed server-side: requests ok, {lost} replaced on checkout',
+                statuses == [200] * max_size and lost > 0,
+            )
+
+            self.check_exhaustion(pool)
+        finally:
+            monitor.connection.close()
+
+        self.stdout.write(str(pool_stats()[DEFAULT_DB_ALIAS]))
+        if self.failures:
+            raise CommandError(f'Pool checks failed: {", ".join(self.failures)}')
+        self.stdout.write(self.style.SUCCESS('Connection pool works as expected'))
+
+    async def asgi_load(self, total, concurrency):
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one():
+            async with semaphore:
+                return await asgi_get(LISTINGS_PATH)
+        return await asyncio.gather(*(one() for _ in range(total)))
+
+    async def consumer_load(self, total, concurrency):
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one():
+            async with semaphore:
+                await consumer_call()
+        await asyncio.gather(*(one() for _ in range(total)))
+
+    def check_exhaustion(self, pool):
+        held = [pool.getconn() for _ in range(pool.max_size)]
+        timeout, pool.timeout = pool.timeout, 0.3
+        request_logger = logging.getLogger('django.request')
+        level = request_logger.level
+        # The expected 500 would log a traceback
+        request_logger.setLevel(logging.CRITICAL)
+        try:
+            start = time.perf_counter()
+            status = wsgi_get(LISTINGS_PATH)
+            elapsed = time.perf_counter() - start
+        finally:
+            request_logger.setLevel(level)
+            pool.timeout = timeout
+            for connection in held:
+                pool.putconn(connection)
+        self.expect(f'exhausted pool: request failed with {status} after {elapsed:.2f}s', status == 500)
+
+    def report(self, name, statuses, monitor, max_size):
+        stats = pool_stats()[DEFAULT_DB_ALIAS]
+        ok = sum(status == 200 for status in statuses)
+        self.expect(f'{name}: {ok}/{len(statuses)} requests ok', ok == len(statuses))
+        self.expect(
+            f'{name}: peak {monitor.peak} server connections (max_size {max_size}), '
+            f'wait avg {stats["wait_ms_avg"]}ms max {stats["wait_ms_max"]}ms',
+            0 < monitor.peak <= max_size,
+        )
+        self.expect(f'{name}: all connections back in the pool', stats['in_use'] == 0)
+
+    def expect(self, name, ok):
+        label = self.style.SUCCESS('ok') if ok else self.style.ERROR('FAILED')
+        self.stdout.write(f'{name:90} {label}')
+        if not ok:
+            self.failures.append(name)
@@ -0,0 +1,125 @@
+"""
+Check where requests' queries go with read replicas configured
+(marketplace/db_router.py). Nothing is written: the write is an invalid POST that is
+rejected but still pins the client to the primary. Clients are the first active user
+signed in with a token each, since anonymous responses are cached from the primary.
+
+With two local SQLite databases:
+
+    cp db.sqlite3 replica.sqlite3
+    DATABASE_REPLICA_URLS=sqlite:///replica.sqlite3 python manage.py check_replica_routing
+
+or two PostgreSQL databases (or a real streaming replica):
+
+    DATABASE_URL=postgres://localhost/marketplace \\
+    DATABASE_REPLICA_URLS=postgres://localhost/marketplace_replica,postgres://localhost/marketplace_replica2 \\
+    python manage.py check_replica_routing
+"""
+import time
+import uuid
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import Client
+from django.test.utils import override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from marketplace.db_router import get_replica_pool
+
+STICKY_SECONDS = 1
+
+
+class Command(BaseCommand):
+    help = 'Verify that safe requests read from replicas and writers stick to the primary'
+
+    def handle(self, *args, **options):
+        replicas = list(settings.DATABASE_REPLICAS)
+        if not replicas:
+            raise CommandError('No replicas configured: set DATABASE_REPLICA_URLS')
+        self.user = get_user_model().objects.filter(is_active=True).order_by('pk').first()
+        if self.user is None:
+            raise CommandError('No active user to sign in as')
+        self.tokens = {}
+
+        self.queries = []
+        wrappers = [connections[alias].execute_wrapper(self.recorder(alias)) for alias in [DEFAULT_DB_ALIAS, *replicas]]
+        overrides = {
+            'ALLOWED_HOSTS': ['*'],
+            'DATABASE_REPLICA_STICKY_SECONDS': STICKY_SECONDS,
+            # A private cache: no cached responses hiding queries, no stale sticky keys
+            'CACHES': {'default': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                'LOCATION': f'replica-check-{uuid.uuid4().hex}',
+            }},
+        }
+        failures = []
+        with override_settings(**overrides):
+            for wrapper in wrappers:
+                wrapper.__enter__()
+            try:
+                self.run_checks(replicas, failures)
+            finally:
+                for wrapper in reversed(wrappers):
+                    wrapper.__exit__(None, None, None)
+
+        if failures:
+            raise CommandError(f'Routing checks failed: {", ".join(failures)}')
+        self.stdout.write(self.style.SUCCESS('Replica routing works as expected'))
+
+    def recorder(self, alias):
+        def record(execute, sql, params, many, context):
+            self.queries.append(alias)
+            return execute(sql, params, many, context)
+        return record
+
+    def request(self, method, path, client):
+        # A fresh query string each time, so no response comes from the response cache
+        path = f'{path}&check={uuid.uuid4().hex}' if method == 'get' else path
+        if client not in self.tokens:
+            self.tokens[client] = str(AccessToken.for_user(self.user))
+        self.queries = []
+        response = getattr(Client(HTTP_AUTHORIZATION=f'Bearer {self.tokens[client]}'), method)(path)
+        return response.status_code, sorted(set(self.queries))
+
+    def expect(self, failures, name, aliases, expected):
+        ok = bool(aliases) and set(aliases) <= set(expected)
+        label = self.style.SUCCESS('ok') if ok else self.style.ERROR('FAILED')
+        self.stdout.write(f'{name:48} {", ".join(aliases) or "(no queries)":24} {label}')
+        if not ok:
+            failures.append(name)
+
+    def run_checks(self, replicas, failures):
+        pool = get_replica_pool()
+        pool.ejected_until.clear()
+        listings = '/api/listings/?page_size=1'
+
+        used = set()
+        for attempt in range(len(replicas)):
+            _, aliases = self.request('get', listings, 'client-1')
+            used.update(aliases)
+            self.expect(failures, f'GET #{attempt + 1} reads a replica', aliases, replicas)
+        if len(replicas) > 1:
+            self.expect(failures, 'GETs rotate over the replicas', sorted(used), replicas)
+            if len(used) < len(replicas):
+                failures.append('round-robin')
+
+        status, aliases = self.request('post', '/api/listings/', 'client-2')
+        self.stdout.write(f'{"POST (rejected with " + str(status) + ")":48} {", ".join(aliases) or "(no queries)"}')
+        _, aliases = self.request('get', listings, 'client-2')
+        self.expect(failures, 'GET right after a write reads the primary', aliases, [DEFAULT_DB_ALIAS])
+        _, aliases = self.request('get', listings, 'client-3')
+        self.expect(failures, 'another client still reads a replica', aliases, replicas)
+        time.sleep(STICKY_SECONDS + 0.1)
+        _, aliases = self.request('get', listings, 'client-2')
+        self.expect(failures, 'the writer reads a replica after the window', aliases, replicas)
+
+        pool.eject(replicas[0], 'ejected by check_replica_routing')
+        _, aliases = self.request('get', listings, 'client-4')
+        self.expect(failures, f'{replicas[0]} ejected: reads skip it', aliases, replicas[1:] or [DEFAULT_DB_ALIAS])
+        for alias in replicas[1:]:
+            pool.eject(alias, 'ejected by check_replica_routing')
+        _, aliases = self.request('get', listings, 'client-4')
+        self.expect(failures, 'all replicas ejected: reads use the primary', aliases, [DEFAULT_DB_ALIAS])
+        pool.ejected_until.clear()
@@ -0,0 +1,94 @@
+"""
+EXPLAIN the listing feed query for the common filter combinations and check that
+each one is served by an index rather than a full table scan.
+
+    python manage.py explain_listing_filters
+    python manage.py explain_listing_filters --force-index --verbose
+
+On a small development table PostgreSQL rightly prefers sequential scans; pass
+--force-index (SET enable_seqscan = off) to check that a usable index exists.
+Exits with an error if any combination still scans the whole table. The same checks
+run in `manage.py test` on PostgreSQL (listings/tests.py).
+"""
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from listings.filters import ListingFilter
+from listings.models import Category, Listing
+
+PAGE_SIZE = 20
+
+
+def filter_cases():
+    """(name, filter params, ordering) for the filter combinations the app sends most"""
+    category_ids = list(Category.objects.order_by('pk').values_list('pk', flat=True)[:2]) or [1, 2]
+    week_ago = (timezone.now() - datetime.timedelta(days=7)).isoformat()
+    return [
+        ('newest', {}, ('-created_at', '-id')),
+        ('category', {'category': category_ids[0]}, ('-created_at', '-id')),
+        ('category__in', {'category__in': ','.join(map(str, category_ids))}, ('-created_at', '-id')),
+        ('condition__in', {'condition__in': 'new,like_new'}, ('-created_at', '-id')),
+        ('price range', {'price_min': 1000, 'price_max': 5000}, ('-created_at', '-id')),
+        ('category + price range', {'category': category_ids[0], 'price_max': 5000}, ('-created_at', '-id')),
+        ('created_after', {'created_after': week_ago}, ('-created_at', '-id')),
+        ('price range by price', {'price_min': 1000, 'price_max': 5000}, ('price', 'id')),
+    ]
+
+
+def explain_case(params, ordering):
+    """EXPLAIN output for the first feed page of these filters"""
+    filterset = ListingFilter(params, queryset=Listing.objects.filter(status='approved'))
+    if not filterset.is_valid():
+        raise ValueError(filterset.errors)
+    return filterset.qs.order_by(*ordering)[:PAGE_SIZE + 1].explain()
+
+
+def force_index_scans():
+    """Disable sequential scans for the rest of the transaction (PostgreSQL only)"""
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+
+
+def is_full_scan(plan):
+    table = Listing._meta.db_table
+    if connection.vendor == 'postgresql':
+        return f'Seq Scan on {table}' in plan
+    # SQLite: "SCAN listings_listing" without "USING ... INDEX"
+    return any(
+        line.strip().split(' ')[:2] == ['SCAN', table] and 'INDEX' not in line
+        for line in plan.splitlines()
+    )
+
+
+class Command(BaseCommand):
+    help = 'Check that the common listing filter combinations use index scans'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force-index', action='store_true',
+                            help='Disable sequential scans first (PostgreSQL only)')
+        parser.add_argument('--verbose', action='store_true', help='Print every plan')
+
+    def handle(self, *args, **options):
+        failures = []
+        with transaction.atomic():
+            if options['force_index']:
+                force_index_scans()
+            for name, params, ordering in filter_cases():
+                try:
+                    plan = explain_case(params, ordering)
+                except ValueError as e:
+                    raise CommandError(f'{name}: {e}')
+                full_scan = is_full_scan(plan)
+                if full_scan:
+                    failures.append(name)
+                label = self.style.ERROR('FULL SCAN') if full_scan else self.style.SUCCESS('index')
+                self.stdout.write(f'{name:28} {label}')
+                if options['verbose'] or full_scan:
+                    self.stdout.write('    ' + plan.replace('\n', '\n    '))
+
+        if failures:
+            raise CommandError(f'Full table scans for: {", ".join(failures)}')
@@ -0,0 +1,70 @@
+"""
+Geocode existing listings against the bundled gazetteer.
+
+Loads the gazetteer into the Place table, then resolves each distinct `location`
+string once and sets place/latitude/longitude on every listing with that string in a
+single UPDATE. Listings saved after this are geocoded by the pre_save signal.
+
+    python manage.py geocode_listings
+    python manage.py geocode_listings --all   # redo listings that already have a place
+"""
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from listings.geo import geocode, load_gazetteer
+from listings.models import Listing, Place
+from marketplace.cache import bump_version
+
+
+class Command(BaseCommand):
+    help = 'Resolve listing locations to gazetteer places and coordinates'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Also re-geocode listings that already have a place')
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        places = self.load_places(options['dry_run'])
+
+        listings = Listing.objects.all()
+        if not options['all']:
+            listings = listings.filter(place__isnull=True)
+        locations = listings.order_by().values('location').annotate(listings=Count('id'))
+
+        geocoded = unmatched = 0
+        unmatched_locations = []
+        for row in locations.iterator():
+            entry = geocode(row['location'])
+            if entry is None:
+                unmatched += row['listings']
+                unmatched_locations.append(row['location'])
+                continue
+            geocoded += row['listings']
+            if not options['dry_run']:
+                listings.filter(location=row['location']).update(
+                    place=places[entry['key']],
+                    latitude=entry['latitude'],
+                    longitude=entry['longitude'],
+                )
+
+        if geocoded and not options['dry_run']:
+            # update() skips the signals that retire cached listing responses
+            bump_version('listings')
+
+        for location in unmatched_locations[:20]:
+            self.stdout.write(f'  not in gazetteer: {location!r}')
+        self.stdout.write(self.style.SUCCESS(f'Geocoded {geocoded} listings, {unmatched} unmatched'))
+
+    def load_places(self, dry_run):
+        """Create any missing Place rows; returns `{key: Place}`"""
+        entries = {entry['key']: entry for entry in load_gazetteer().values()}
+        places = Place.objects.in_bulk(entries.keys(), field_name='key')
+        missing = [
+            Place(**{field: entry[field] for field in ('key', 'name', 'state', 'country', 'latitude', 'longitude')})
+            for key, entry in entries.items() if key not in places
+        ]
+        if missing and not dry_run:
+            Place.objects.bulk_create(missing, ignore_conflicts=True)
+            places = Place.objects.in_bulk(entries.keys(), field_name='key')
+        self.stdout.write(f'{len(places)} places, {len(missing)} new')
+        return places
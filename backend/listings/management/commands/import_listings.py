@@ -0,0 +1,64 @@
+"""
+Import listings for a seller from an NDJSON or CSV file, as POST /api/listings/import/
+does, without its per-request row limit.
+
+    python manage.py import_listings dealer42 stock.ndjson
+    python manage.py import_listings dealer42 stock.csv --chunk-size 1000
+    cat stock.ndjson | python manage.py import_listings dealer42 - --format ndjson
+
+CSV files need a header row with the listing fields (title, description, price,
+category_id, location, condition, images); multiple images go in one cell,
+separated by "|".
+"""
+import sys
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from listings.bulk_import import DEFAULT_CHUNK_SIZE, FORMAT_CSV, FORMAT_NDJSON, READERS, ListingImporter
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Bulk import listings from an NDJSON or CSV file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('seller', help='Username of the seller the listings belong to')
+        parser.add_argument('path', help='File to import, or - for stdin')
+        parser.add_argument('--format', choices=sorted(READERS), help='Defaults to csv for *.csv, else ndjson')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                            help='Rows per bulk_create transaction')
+        parser.add_argument('--max-errors', type=int, default=50, help='Errors to print')
+
+    def handle(self, *args, **options):
+        try:
+            seller = User.objects.get(username=options['seller'])
+        except User.DoesNotExist:
+            raise CommandError(f'No user named {options["seller"]!r}')
+
+        path = options['path']
+        import_format = options['format'] or (FORMAT_CSV if path.lower().endswith('.csv') else FORMAT_NDJSON)
+        importer = ListingImporter(seller, chunk_size=options['chunk_size'])
+
+        start = time.perf_counter()
+        if path == '-':
+            result = importer.run(sys.stdin, import_format)
+        else:
+            try:
+                with open(path, encoding='utf-8-sig', newline='') as lines:
+                    result = importer.run(lines, import_format)
+            except OSError as e:
+                raise CommandError(str(e))
+        elapsed = time.perf_counter() - start
+
+        for error in result.errors[:options['max_errors']]:
+            self.stdout.write(self.style.ERROR(f'row {error["row"]}: {error["errors"]}'))
+        if len(result.errors) > options['max_errors']:
+            self.stdout.write(f'... and {len(result.errors) - options["max_errors"]} more errors')
+        rate = len(result.created_ids) / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {len(result.created_ids)} listings, {len(result.errors)} rows failed '
+            f'({elapsed:.1f}s, {rate:.0f} rows/s)'
+        ))
@@ -0,0 +1,57 @@
+"""
+Move base64 data URIs stored in ListingImage.image into the blob store.
+
+Rows are streamed with iterator() and written back with bulk_update in batches,
+so the table is never loaded into memory. Migrated rows no longer start with
+"data:", so an interrupted run can simply be restarted; --start-id skips ahead.
+
+    python manage.py migrate_image_blobs --batch-size 200
+"""
+from django.core.management.base import BaseCommand
+
+from listings.models import ListingImage
+from listings.storage import store_image
+
+
+class Command(BaseCommand):
+    help = 'Move base64 listing images out of the database into the blob store'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200)
+        parser.add_argument('--start-id', type=int, default=0,
+                            help='Only migrate images with an id greater than this')
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        images = (
+            ListingImage.objects
+            .filter(image__startswith='data:', pk__gt=options['start_id'])
+            .order_by('pk')
+            .only('id', 'image')
+        )
+
+        migrated = failed = 0
+        batch = []
+        for image in images.iterator(chunk_size=batch_size):
+            try:
+                image.image = store_image(image.image)
+            except ValueError as e:
+                failed += 1
+                self.stderr.write(f'Image {image.id}: {e}')
+                continue
+            batch.append(image)
+            if len(batch) >= batch_size:
+                migrated += self.flush(batch, options['dry_run'])
+                batch = []
+        if batch:
+            migrated += self.flush(batch, options['dry_run'])
+
+        self.stdout.write(self.style.SUCCESS(f'Migrated {migrated} images, {failed} failed'))
+
+    def flush(self, batch, dry_run):
+        if not dry_run:
+            ListingImage.objects.bulk_update(batch, ['image'])
+        # Printed so an interrupted run can be resumed with --start-id
+        self.stdout.write(f'Migrated up to image id {batch[-1].id}')
+        return len(batch)
@@ -0,0 +1,93 @@
+"""
+Rebuild the precomputed similar-listings table from scratch.
+
+Listings are compared within their category. For each category the parent process
+builds the feature arrays once, hands them to a pool of worker processes, and each
+worker scores a chunk of listings against the whole category and returns its top-K.
+The category's neighbour lists are then replaced in one transaction, so the
+`similar` endpoint never sees a half-written category.
+"""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from listings import similarity
+from listings.models import Listing, SimilarListing
+
+# Set in each worker process by _init_worker
+_features = None
+_top_k = similarity.TOP_K
+
+
+def _init_worker(features, top_k):
+    global _features, _top_k
+    _features = features
+    _top_k = top_k
+
+
+def _score_chunk(bounds):
+    start, stop = bounds
+    return similarity.top_neighbors(similarity.subset(_features, slice(start, stop)), _features, _top_k)
+
+
+class Command(BaseCommand):
+    help = 'Recompute the similar-listings neighbour table for every approved listing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=os.cpu_count() or 1)
+        parser.add_argument('--top-k', type=int, default=similarity.TOP_K)
+        parser.add_argument(
+            '--candidates', type=int, default=None,
+            help='Only compare against the newest N listings of each category',
+        )
+        parser.add_argument('--chunk-size', type=int, default=500, help='Listings scored per worker task')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        # Lists of listings that are no longer shown
+        SimilarListing.objects.exclude(listing__status='approved').delete()
+
+        category_ids = (
+            Listing.objects.filter(status='approved', category__isnull=False)
+            .order_by('category_id').values_list('category_id', flat=True).distinct()
+        )
+        total = 0
+        for category_id in category_ids:
+            rows = similarity.candidate_rows(category_id, limit=options['candidates'])
+            neighbors = self.score_category(rows, options)
+            written = []
+            for row, listing_neighbors in zip(rows, neighbors):
+                written.extend(similarity.neighbor_rows(row[0], listing_neighbors))
+            with transaction.atomic():
+                SimilarListing.objects.filter(listing__category_id=category_id).delete()
+                SimilarListing.objects.bulk_create(written, batch_size=1000)
+            total += len(rows)
+            self.stdout.write(f'Category {category_id}: {len(rows)} listings, {len(written)} neighbours')
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt neighbours for {total} listings in {elapsed:.1f}s'))
+
+    def score_category(self, rows, options):
+        features = similarity.build_features(rows)
+        chunk_size = max(options['chunk_size'], 1)
+        bounds = [(start, min(start + chunk_size, len(rows))) for start in range(0, len(rows), chunk_size)]
+
+        if options['processes'] <= 1 or len(bounds) <= 1:
+            return [
+                neighbors
+                for start, stop in bounds
+                for neighbors in similarity.top_neighbors(
+                    similarity.subset(features, slice(start, stop)), features, options['top_k']
+                )
+            ]
+
+        # The features are sent to each worker once, not with every chunk
+        with ProcessPoolExecutor(
+            max_workers=min(options['processes'], len(bounds)),
+            initializer=_init_worker,
+            initargs=(features, options['top_k']),
+        ) as pool:
+            return [neighbors for chunk in pool.map(_score_chunk, bounds) for neighbors in chunk]
@@ -0,0 +1,27 @@
+"""
+Recompute the seller dashboard counters (favourites, chat rooms, unread messages) of
+every listing from the source tables. They are maintained on write (see
+listings/counters.py); run this after bulk deletes or raw SQL that bypassed the
+signals.
+
+    python manage.py recount_listing_counters
+    python manage.py recount_listing_counters --seller dealer42
+"""
+from django.core.management.base import BaseCommand
+
+from listings.counters import recount_listing_counters
+from listings.models import Listing
+
+
+class Command(BaseCommand):
+    help = 'Recompute the denormalized per-listing dashboard counters'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seller', help='Only the listings of this username')
+
+    def handle(self, *args, **options):
+        listings = Listing.objects.all()
+        if options['seller']:
+            listings = listings.filter(seller__username=options['seller'])
+        updated = recount_listing_counters(listings)
+        self.stdout.write(self.style.SUCCESS(f'Recounted {updated} listings'))
@@ -0,0 +1,68 @@
+# Generated by Django 4.2.7 on 2026-10-18 14:59
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+SEARCH_VECTOR_SQL = """
+    setweight(to_tsvector('english', coalesce({row}title, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce({row}location, '')), 'B') ||
+    setweight(to_tsvector('english', coalesce({row}description, '')), 'C')
+"""
+
+CREATE_SEARCH_SQL = [
+    f"""
+    CREATE OR REPLACE FUNCTION listings_listing_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector := {SEARCH_VECTOR_SQL.format(row='NEW.')};
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql;
+    """,
+    """
+    CREATE TRIGGER listings_listing_search_vector_trigger
+    BEFORE INSERT OR UPDATE ON listings_listing
+    FOR EACH ROW EXECUTE FUNCTION listings_listing_search_vector_update();
+    """,
+    f"UPDATE listings_listing SET search_vector = {SEARCH_VECTOR_SQL.format(row='')};",
+    """
+    CREATE INDEX listings_listing_search_vector_gin
+    ON listings_listing USING gin (search_vector);
+    """,
+]
+
+DROP_SEARCH_SQL = [
+    "DROP INDEX IF EXISTS listings_listing_search_vector_gin;",
+    "DROP TRIGGER IF EXISTS listings_listing_search_vector_trigger ON listings_listing;",
+    "DROP FUNCTION IF EXISTS listings_listing_search_vector_update();",
+]
+
+
+def _run_on_postgresql(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != "postgresql":
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("listings", "0004_listing_condition_listing_is_featured"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="listing",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.RunPython(
+            _run_on_postgresql(CREATE_SEARCH_SQL),
+            _run_on_postgresql(DROP_SEARCH_SQL),
+        ),
+    ]
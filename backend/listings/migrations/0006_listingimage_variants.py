@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 15:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("listings", "0005_listing_search_vector"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="listingimage",
+            name="variants",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
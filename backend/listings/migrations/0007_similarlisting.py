@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-18 15:07
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("listings", "0006_listingimage_variants"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SimilarListing",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("rank", models.PositiveSmallIntegerField()),
+                ("score", models.FloatField()),
+                ("listing", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="neighbors", to="listings.listing")),
+                ("neighbor", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="neighbor_of", to="listings.listing")),
+            ],
+            options={
+                "ordering": ["listing", "rank"],
+                "indexes": [models.Index(fields=["listing", "rank"], name="listings_si_listing_f4ef68_idx")],
+                "unique_together": {("listing", "neighbor")},
+            },
+        ),
+    ]
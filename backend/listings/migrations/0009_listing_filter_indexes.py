@@ -0,0 +1,37 @@
+# Generated by Django 4.2.7 on 2026-10-18 15:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("listings", "0008_listing_geo"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="listing",
+            name="listings_li_title_454eff_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="listing",
+            name="listings_li_price_d6caaa_idx",
+        ),
+        migrations.AddIndex(
+            model_name="listing",
+            index=models.Index(condition=models.Q(("status", "approved")), fields=["-created_at", "-id"], name="listing_approved_recent_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="listing",
+            index=models.Index(condition=models.Q(("status", "approved")), fields=["category", "-created_at", "-id"], name="listing_approved_cat_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="listing",
+            index=models.Index(condition=models.Q(("status", "approved")), fields=["condition", "-created_at", "-id"], name="listing_approved_cond_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="listing",
+            index=models.Index(condition=models.Q(("status", "approved")), fields=["price", "id"], name="listing_approved_price_idx"),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 4.2.7 on 2026-10-18 15:28
+
+from django.db import migrations, models
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def _count(queryset, listing_field):
+    counts = queryset.order_by().values(listing_field).annotate(n=Count("pk")).values("n")[:1]
+    return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+
+def backfill_counters(apps, schema_editor):
+    Listing = apps.get_model("listings", "Listing")
+    Favorite = apps.get_model("listings", "Favorite")
+    ChatRoom = apps.get_model("chat", "ChatRoom")
+    Message = apps.get_model("chat", "Message")
+    Listing.objects.update(
+        favorite_count=_count(Favorite.objects.filter(listing_id=OuterRef("pk")), "listing_id"),
+        chat_room_count=_count(ChatRoom.objects.filter(listing_id=OuterRef("pk")), "listing_id"),
+        unread_message_count=_count(
+            Message.objects.filter(chat_room__listing_id=OuterRef("pk"), is_read=False)
+            .exclude(sender_id=F("chat_room__seller_id")),
+            "chat_room__listing_id",
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("listings", "0010_listing_view_count"),
+        ("chat", "0002_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="listing",
+            name="chat_room_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="listing",
+            name="favorite_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="listing",
+            name="unread_message_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name="listing",
+            index=models.Index(fields=["seller", "-created_at", "-id"], name="listing_seller_recent_idx"),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
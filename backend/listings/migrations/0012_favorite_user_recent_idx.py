@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 15:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("listings", "0011_listing_dashboard_counters"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="favorite",
+            index=models.Index(fields=["user", "-created_at", "-id"], name="favorite_user_recent_idx"),
+        ),
+    ]
@@ -1,6 +1,7 @@
 from django.db import models
 from django.contrib.auth import get_user_model
 from django.conf import settings
+from django.contrib.postgres.search import SearchVectorField
 
 User = get_user_model()
 
@@ -17,6 +18,19 @@ class Category(models.Model):
         verbose_name_plural = 'Categories'
 
 
+class Place(models.Model):
+    """A gazetteer place that free-text listing locations are geocoded to; see listings/geo.py"""
+    key = models.CharField(max_length=255, unique=True)
+    name = models.CharField(max_length=255)
+    state = models.CharField(max_length=100, blank=True)
+    country = models.CharField(max_length=2, blank=True)
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+
+    def __str__(self):
+        return self.name
+
+
 class Listing(models.Model):
     STATUS_CHOICES = [
         ('pending', 'Pending'),
@@ -39,19 +53,55 @@ class Listing(models.Model):
     price = models.DecimalField(max_digits=10, decimal_places=2, db_index=True)
     category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, related_name='listings')
     location = models.CharField(max_length=255, db_index=True)
+    # Resolved from `location` on save (and by `manage.py geocode_listings`); null when
+    # the location isn't in the gazetteer
+    place = models.ForeignKey(Place, on_delete=models.SET_NULL, null=True, blank=True, related_name='listings')
+    latitude = models.FloatField(null=True, blank=True, editable=False)
+    longitude = models.FloatField(null=True, blank=True, editable=False)
     seller = models.ForeignKey(User, on_delete=models.CASCADE, related_name='listings')
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     condition = models.CharField(max_length=20, choices=CONDITION_CHOICES, default='good')
     is_featured = models.BooleanField(default=False, db_index=True)
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Detail views, deduplicated per viewer and flushed in batches from the buffer in
+    # listings/view_counts.py; shown to the seller only
+    view_count = models.PositiveIntegerField(default=0, editable=False)
+    # Seller dashboard counters, maintained on write; see listings/counters.py
+    favorite_count = models.PositiveIntegerField(default=0, editable=False)
+    chat_room_count = models.PositiveIntegerField(default=0, editable=False)
+    unread_message_count = models.PositiveIntegerField(default=0, editable=False)
+    # Weighted full-text document (title > location > description), maintained by a
+    # PostgreSQL trigger and GIN-indexed; see listings/search.py. Unused on SQLite.
+    search_vector = SearchVectorField(null=True, editable=False)
 
     class Meta:
         ordering = ['-created_at']
         indexes = [
-            models.Index(fields=['title', 'category']),
-            models.Index(fields=['price']),
             models.Index(fields=['location']),
+            # Public feeds are always status='approved' plus filters, newest first, paged
+            # on (created_at, id): partial indexes in that order serve them as range scans
+            models.Index(
+                fields=['-created_at', '-id'], name='listing_approved_recent_idx',
+                condition=models.Q(status='approved'),
+            ),
+            models.Index(
+                fields=['category', '-created_at', '-id'], name='listing_approved_cat_idx',
+                condition=models.Q(status='approved'),
+            ),
+            models.Index(
+                fields=['condition', '-created_at', '-id'], name='listing_approved_cond_idx',
+                condition=models.Q(status='approved'),
+            ),
+            # Price ranges, and ?ordering=price pages keyed on (price, id)
+            models.Index(
+                fields=['price', 'id'], name='listing_approved_price_idx',
+                condition=models.Q(status='approved'),
+            ),
+            # Bounding-box range scans for ?near= queries
+            models.Index(fields=['latitude', 'longitude'], name='listing_lat_lon_idx'),
+            # Seller dashboard (my_listings) pages, every status, newest first
+            models.Index(fields=['seller', '-created_at', '-id'], name='listing_seller_recent_idx'),
         ]
 
     def __str__(self):
@@ -60,9 +110,12 @@ class Listing(models.Model):
 
 class ListingImage(models.Model):
     listing = models.ForeignKey(Listing, on_delete=models.CASCADE, related_name='images')
-    # Use TextField to store base64 data URIs or URLs (works for development)
-    # For production with Cloudinary, you can change this to CloudinaryField
-    image = models.TextField()  # Store base64 data URIs, URLs, or Cloudinary URLs
+    # Image URL: a blob store URL for uploaded images (see listings/storage.py),
+    # or an external/Cloudinary URL. Older rows may still hold base64 data URIs
+    # until `manage.py migrate_image_blobs` has run.
+    image = models.TextField()
+    # Resized WebP/JPEG copies keyed by size, filled in by listings.tasks; see listings/images.py
+    variants = models.JSONField(default=dict, blank=True)
     is_primary = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
@@ -81,7 +134,29 @@ class Favorite(models.Model):
     class Meta:
         unique_together = ['user', 'listing']
         ordering = ['-created_at']
+        indexes = [
+            # The user's favourites page, keyed on (created_at, id)
+            models.Index(fields=['user', '-created_at', '-id'], name='favorite_user_recent_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.listing.title}"
 
+
+
+class SimilarListing(models.Model):
+    """Precomputed top-K similar listings, maintained by listings/similarity.py"""
+    listing = models.ForeignKey(Listing, on_delete=models.CASCADE, related_name='neighbors')
+    neighbor = models.ForeignKey(Listing, on_delete=models.CASCADE, related_name='neighbor_of')
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        ordering = ['listing', 'rank']
+        unique_together = ['listing', 'neighbor']
+        indexes = [
+            models.Index(fields=['listing', 'rank']),
+        ]
+
+    def __str__(self):
+        return f"{self.listing_id} ~ {self.neighbor_id} ({self.score:.3f})"
@@ -0,0 +1,111 @@
+"""
+In-process category registry.
+
+Categories are a dozen rows that almost never change, so each worker keeps them in
+memory: the category endpoint serves a precomputed body, writes validate
+`category_id` without a query, and listings are serialized with their category
+without joining the table.
+
+Workers stay in sync through the 'categories' version counter in the shared cache,
+which listings.signals bumps on every Category save/delete. A worker reloads when it
+sees the counter move, checking at most every VERSION_CHECK_INTERVAL seconds, and
+from the primary: a lagging replica would give it the rows from before the change.
+Async views call the a-prefixed methods, which check and reload off the event loop.
+"""
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+
+from marketplace.cache import aget_version, get_version
+from marketplace.db_router import primary_reads
+
+VERSION_CHECK_INTERVAL = 1.0
+
+
+class CategoryRegistry:
+    version_name = 'categories'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._checked_at = 0.0
+        self._categories = {}
+        self._serialized = {}
+        self._serialized_list = []
+
+    def _ensure_current(self):
+        now = time.monotonic()
+        if self._version is not None and now - self._checked_at < VERSION_CHECK_INTERVAL:
+            return
+        version = get_version(self.version_name)
+        self._checked_at = now
+        if version != self._version:
+            self._reload(version)
+
+    async def aensure_current(self):
+        now = time.monotonic()
+        if self._version is not None and now - self._checked_at < VERSION_CHECK_INTERVAL:
+            return
+        version = await aget_version(self.version_name)
+        self._checked_at = now
+        if version != self._version:
+            await sync_to_async(self._reload)(version)
+
+    def _reload(self, version):
+        with self._lock:
+            if version != self._version:
+                self._load(version)
+
+    def _load(self, version):
+        from .models import Category
+        from .serializers import CategorySerializer
+
+        with primary_reads():
+            categories = list(Category.objects.order_by('pk'))
+        serialized = [dict(data) for data in CategorySerializer(categories, many=True).data]
+        self._categories = {category.id: category for category in categories}
+        self._serialized = {data['id']: data for data in serialized}
+        self._serialized_list = serialized
+        # Recorded last, and read before loading: a change made while loading
+        # leaves the counter ahead of us, so the next check reloads again
+        self._version = version
+
+    def get(self, category_id):
+        """The Category with this id, or None"""
+        self._ensure_current()
+        try:
+            return self._categories.get(int(category_id))
+        except (TypeError, ValueError):
+            return None
+
+    def serialize(self, category_id):
+        """CategorySerializer output for this id, or None"""
+        if category_id is None:
+            return None
+        self._ensure_current()
+        return self._serialized.get(category_id)
+
+    def serialized_list(self):
+        """CategorySerializer(many=True) output for every category"""
+        self._ensure_current()
+        return self._serialized_list
+
+    async def aget(self, category_id):
+        await self.aensure_current()
+        return self.get(category_id)
+
+    async def aserialize(self, category_id):
+        await self.aensure_current()
+        return self.serialize(category_id)
+
+    async def aserialized_list(self):
+        await self.aensure_current()
+        return self.serialized_list()
+
+    def clear(self):
+        with self._lock:
+            self._version = None
+
+
+category_registry = CategoryRegistry()
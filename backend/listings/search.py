@@ -0,0 +1,85 @@
+"""
+Full-text search for listings.
+
+On PostgreSQL, listings carry a weighted ``search_vector`` column (title > location >
+description) kept up to date by a database trigger and indexed with GIN, so searches
+are ranked index lookups instead of ``ILIKE '%term%'`` scans. Other databases (SQLite
+in development) fall back to DRF's regular ``SearchFilter`` behaviour.
+"""
+import re
+
+from django.db import connections
+from django.db.models import F
+from rest_framework import filters
+
+SEARCH_CONFIG = 'english'
+
+# Weights are listed as D, C, B, A (PostgreSQL's ts_rank order)
+SEARCH_WEIGHTS = [0.1, 0.2, 0.4, 1.0]
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def build_tsquery(terms):
+    """
+    Build a raw tsquery string that ANDs every token and prefix-matches the last one,
+    so "iphone 1" matches "iPhone 13" while the user is still typing.
+    Returns None when the terms contain nothing searchable.
+    """
+    tokens = []
+    for term in terms:
+        tokens.extend(_TOKEN_RE.findall(term.lower()))
+    if not tokens:
+        return None
+    tokens[-1] = f'{tokens[-1]}:*'
+    return ' & '.join(tokens)
+
+
+def supports_full_text_search(queryset):
+    return connections[queryset.db].vendor == 'postgresql'
+
+
+def search_listings(queryset, terms):
+    """
+    Filter `queryset` down to listings matching `terms` and annotate each with
+    `search_rank`. Only valid on PostgreSQL; see `supports_full_text_search`.
+    """
+    from django.contrib.postgres.search import SearchQuery, SearchRank
+
+    raw_query = build_tsquery(terms)
+    if raw_query is None:
+        return queryset
+    query = SearchQuery(raw_query, search_type='raw', config=SEARCH_CONFIG)
+    return queryset.filter(search_vector=query).annotate(
+        search_rank=SearchRank(F('search_vector'), query, weights=SEARCH_WEIGHTS)
+    )
+
+
+class ListingSearchFilter(filters.SearchFilter):
+    """
+    Search backend for ListingViewSet: ranked tsvector search on PostgreSQL,
+    icontains over `search_fields` everywhere else.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        if not supports_full_text_search(queryset):
+            return super().filter_queryset(request, queryset, view)
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+        return search_listings(queryset, terms)
+
+
+class ListingOrderingFilter(filters.OrderingFilter):
+    """
+    OrderingFilter that sorts by distance for ?near= queries and by search relevance
+    when a ranked search is active, unless the client asked for an explicit ordering.
+    """
+
+    def get_ordering(self, request, queryset, view):
+        if not request.query_params.get(self.ordering_param):
+            if 'distance_km' in queryset.query.annotations:
+                return ['distance_km']
+            if 'search_rank' in queryset.query.annotations:
+                return ['-search_rank', '-created_at']
+        return super().get_ordering(request, queryset, view)
@@ -1,6 +1,10 @@
+from django.db import transaction
 from rest_framework import serializers
 from .models import Listing, ListingImage, Category, Favorite
-from users.serializers import UserSerializer
+from users.serializers import UserSerializer, UserSummarySerializer
+from .images import VARIANT_SIZES, variant_url
+from .registry import category_registry
+from .image_writes import sync_listing_images
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -9,16 +13,75 @@ class CategorySerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'slug')
 
 
+def image_url(image, request, size=None):
+    """
+    The URL to send for `image`: the variant picked by the `size` hint (query param,
+    else `size`), made absolute since blob store URLs are site-relative.
+    """
+    image_format = None
+    if request:
+        size = request.query_params.get('size', size)
+        image_format = request.query_params.get('image_format')
+    url = variant_url(image, size, image_format) if size in VARIANT_SIZES else image.image
+    if request and url.startswith('/'):
+        return request.build_absolute_uri(url)
+    return url
+
+
 class ListingImageSerializer(serializers.ModelSerializer):
     class Meta:
         model = ListingImage
         fields = ('id', 'image', 'is_primary')
 
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # Clients can ask for a resized variant, e.g. ?size=card&image_format=jpeg
+        data['image'] = image_url(instance, self.context.get('request'))
+        return data
+
+
+class FavoriteStateMixin:
+    """is_favorited for listing serializers without a query per listing"""
+
+    def get_is_favorited(self, obj):
+        request = self.context.get('request')
+        if not (request and request.user.is_authenticated):
+            return False
+        # ListingViewSet querysets carry an Exists() annotation, no extra query needed
+        annotated = getattr(obj, 'is_favorited', None)
+        if annotated is not None:
+            return annotated
+        return obj.id in self.get_favorite_ids(request.user)
+
+    def get_favorite_ids(self, user):
+        """
+        The user's favourite listing IDs, loaded once per request and shared through the
+        root serializer context by every nested listing serializer (favourites, chat rooms,
+        notifications), instead of one EXISTS query per listing.
+        """
+        favorite_ids = self.context.get('favorite_ids')
+        if favorite_ids is None:
+            favorite_ids = set(Favorite.objects.filter(user=user).values_list('listing_id', flat=True))
+            self.context['favorite_ids'] = favorite_ids
+        return favorite_ids
 
-class ListingSerializer(serializers.ModelSerializer):
+
+class DistanceMixin:
+    """Adds `distance_km` to listings annotated by a ?near= query (see listings/geo.py)"""
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        distance = getattr(instance, 'distance_km', None)
+        if distance is not None:
+            data['distance_km'] = round(distance, 1)
+        return data
+
+
+class ListingSerializer(DistanceMixin, FavoriteStateMixin, serializers.ModelSerializer):
     images = ListingImageSerializer(many=True, read_only=True)
     seller = UserSerializer(read_only=True)
-    category = CategorySerializer(read_only=True)
+    # Served from the in-process registry, so list queries don't join categories
+    category = serializers.SerializerMethodField()
     category_id = serializers.IntegerField(write_only=True, required=False)
     is_favorited = serializers.SerializerMethodField()
     # Add images_data field for write operations (update)
@@ -34,10 +97,10 @@ class ListingSerializer(serializers.ModelSerializer):
         model = Listing
         fields = (
             'id', 'title', 'description', 'price', 'category', 'category_id',
-            'location', 'seller', 'status', 'images', 'images_data', 'is_favorited',
+            'location', 'latitude', 'longitude', 'seller', 'status', 'images', 'images_data', 'is_favorited',
             'condition', 'is_featured', 'created_at', 'updated_at'
         )
-        read_only_fields = ('id', 'seller', 'status', 'created_at', 'updated_at')
+        read_only_fields = ('id', 'latitude', 'longitude', 'seller', 'status', 'created_at', 'updated_at')
         extra_kwargs = {
             'title': {'required': False},
             'description': {'required': False},
@@ -45,12 +108,6 @@ class ListingSerializer(serializers.ModelSerializer):
             'location': {'required': False},
         }
 
-    def get_is_favorited(self, obj):
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return Favorite.objects.filter(user=request.user, listing=obj).exists()
-        return False
-
     def validate(self, attrs):
         """Validate data before update"""
         # Ensure attrs is a dict (it should always be from DRF)
@@ -58,17 +115,13 @@ class ListingSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError({'non_field_errors': ['Invalid data format']})
         return attrs
 
+    def get_category(self, obj):
+        return category_registry.serialize(obj.category_id)
+
     def create(self, validated_data):
         category_id = validated_data.pop('category_id', None)
-        listing = Listing.objects.create(**validated_data)
-        if category_id:
-            try:
-                category = Category.objects.get(id=category_id)
-                listing.category = category
-                listing.save()
-            except Category.DoesNotExist:
-                pass
-        return listing
+        category = category_registry.get(category_id) if category_id else None
+        return Listing.objects.create(**validated_data, category=category)
 
     def update(self, instance, validated_data):
         # validated_data should always be a dict from DRF, but check just in case
@@ -122,50 +175,32 @@ class ListingSerializer(serializers.ModelSerializer):
         
         # Update category if provided
         if category_id:
-            try:
-                category = Category.objects.get(id=category_id)
-                instance.category = category
-            except Category.DoesNotExist:
+            category = category_registry.get(category_id)
+            if category is None:
                 raise serializers.ValidationError({'category_id': f'Invalid category ID: {category_id}'})
+            instance.category = category
         
-        # Save the instance
-        try:
-            instance.save()
-        except Exception as e:
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.error(f'Failed to save listing {instance.id}: {e}', exc_info=True)
-            # Get the actual error message
-            error_msg = str(e)
-            if 'not iterable' in error_msg:
-                error_msg = 'Invalid data format. Please check all fields are correct.'
-            raise serializers.ValidationError({'non_field_errors': [f'Failed to save listing: {error_msg}']})
-        
-        # Update images if provided
-        if images_data is not None:
+        # The listing and its images are saved together or not at all
+        with transaction.atomic():
             try:
-                # Delete existing images
-                instance.images.all().delete()
-                # Create new images if list is not empty
-                if isinstance(images_data, list) and len(images_data) > 0:
-                    for idx, image_url in enumerate(images_data):
-                        if image_url:
-                            try:
-                                ListingImage.objects.create(
-                                    listing=instance,
-                                    image=str(image_url),  # Ensure it's a string
-                                    is_primary=(idx == 0)
-                                )
-                            except Exception as e:
-                                import logging
-                                logger = logging.getLogger(__name__)
-                                logger.warning(f'Failed to create image {idx} for listing {instance.id}: {e}')
+                instance.save()
             except Exception as e:
                 import logging
                 logger = logging.getLogger(__name__)
-                logger.error(f'Failed to update images for listing {instance.id}: {e}', exc_info=True)
-                # Don't fail the whole update if images fail, just log it
-        
+                logger.error(f'Failed to save listing {instance.id}: {e}', exc_info=True)
+                # Get the actual error message
+                error_msg = str(e)
+                if 'not iterable' in error_msg:
+                    error_msg = 'Invalid data format. Please check all fields are correct.'
+                raise serializers.ValidationError({'non_field_errors': [f'Failed to save listing: {error_msg}']})
+
+            # Only images that were added, removed or changed primary are written
+            if images_data is not None:
+                try:
+                    sync_listing_images(instance, images_data)
+                except ValueError as e:
+                    raise serializers.ValidationError({'images_data': [str(e)]})
+
         return instance
 
 
@@ -199,9 +234,8 @@ class ListingCreateSerializer(serializers.ModelSerializer):
         
         # Validate category exists
         if category_id:
-            try:
-                category = Category.objects.get(id=category_id)
-            except Category.DoesNotExist:
+            category = category_registry.get(category_id)
+            if category is None:
                 raise serializers.ValidationError({'category_id': f'Invalid category ID: {category_id}'})
         else:
             raise serializers.ValidationError({'category_id': 'Category is required'})
@@ -231,31 +265,81 @@ class ListingCreateSerializer(serializers.ModelSerializer):
             validated_data['condition'] = 'good'
         
         # Auto-approve listings for development (in production, you might want admin approval)
-        listing = Listing.objects.create(**validated_data, category=category, status='approved')
-        
-        # Create image records
-        for idx, image_url in enumerate(images_data):
-            if image_url:  # Only create if image URL is not empty
-                try:
-                    # TextField can store base64 data URIs, URLs, or any string
-                    # Base64 format: data:image/jpeg;base64,/9j/4AAQ...
-                    # URL format: https://...
-                    # Store as-is (TextField accepts any string)
-                    ListingImage.objects.create(
-                        listing=listing,
-                        image=image_url,  # Can be base64, URL, or any string
-                        is_primary=(idx == 0)
-                    )
-                except Exception as e:
-                    # Log the full error to understand what's happening
-                    import logging
-                    logger = logging.getLogger(__name__)
-                    logger.error(f'Failed to create image {idx} for listing {listing.id}: {e}', exc_info=True)
-                    # Continue with other images even if one fails
-        
+        with transaction.atomic():
+            listing = Listing.objects.create(**validated_data, category=category, status='approved')
+            try:
+                # Base64 data URIs (data:image/jpeg;base64,/9j/4AAQ...) are moved into
+                # the blob store and replaced by the blob's URL; other URLs
+                # (https://...) are stored as-is
+                sync_listing_images(listing, images_data, existing=[])
+            except ValueError as e:
+                raise serializers.ValidationError({'images': [str(e)]})
+
         return listing
 
 
+class ListingCardSerializer(DistanceMixin, FavoriteStateMixin, serializers.ModelSerializer):
+    """
+    Compact listing for list screens (home feed, favourites, similar, my listings).
+    Expects querysets shaped by ListingViewSet.card_queryset: only the card columns,
+    the seller joined, and the primary image prefetched into `primary_images`.
+    """
+    seller = UserSummarySerializer(read_only=True)
+    thumbnail = serializers.SerializerMethodField()
+    is_favorited = serializers.SerializerMethodField()
+
+    # Columns loaded for a card, for use with QuerySet.only()
+    card_fields = (
+        'id', 'title', 'price', 'location', 'condition', 'is_featured', 'created_at',
+        'seller__id', 'seller__username',
+    )
+
+    class Meta:
+        model = Listing
+        fields = (
+            'id', 'title', 'price', 'location', 'condition', 'is_featured',
+            'thumbnail', 'seller', 'is_favorited', 'created_at'
+        )
+        read_only_fields = fields
+
+    def get_thumbnail(self, obj):
+        primary_images = getattr(obj, 'primary_images', None)
+        if primary_images is None:
+            primary_images = [image for image in obj.images.all() if image.is_primary]
+        if not primary_images:
+            return None
+        return image_url(primary_images[0], self.context.get('request'), size='card')
+
+
+# Seller-only columns: view count and the dashboard counters (listings/counters.py)
+SELLER_FIELDS = ('view_count', 'favorite_count', 'chat_room_count', 'unread_message_count')
+
+
+class SellerListingSerializer(ListingSerializer):
+    """ListingSerializer plus the counters only the seller sees (my listings)"""
+
+    class Meta(ListingSerializer.Meta):
+        fields = ListingSerializer.Meta.fields + SELLER_FIELDS
+
+
+class SellerListingCardSerializer(ListingCardSerializer):
+    """ListingCardSerializer plus the listing's status and seller-only counters (my listings)"""
+    card_fields = ListingCardSerializer.card_fields + ('status',) + SELLER_FIELDS
+
+    class Meta(ListingCardSerializer.Meta):
+        fields = ListingCardSerializer.Meta.fields + ('status',) + SELLER_FIELDS
+        read_only_fields = fields
+
+
+class FavoriteCardSerializer(serializers.ModelSerializer):
+    listing = ListingCardSerializer(read_only=True)
+
+    class Meta:
+        model = Favorite
+        fields = ('id', 'listing', 'created_at')
+        read_only_fields = ('id', 'created_at')
+
+
 class FavoriteSerializer(serializers.ModelSerializer):
     listing = ListingSerializer(read_only=True)
 
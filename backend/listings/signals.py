@@ -0,0 +1,75 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from marketplace.cache import bump_version
+from .geo import geocode, resolve_place
+from .counters import adjust_counter
+from .favorite_sync import record_change
+from .models import Category, Favorite, Listing, ListingImage
+from .registry import category_registry
+from .tasks import generate_image_variants, update_similar_listings
+
+
+@receiver(pre_save, sender=Listing)
+def geocode_listing(sender, instance, update_fields=None, **kwargs):
+    # Partial saves (status changes, counters) never touch the location
+    if update_fields is not None:
+        return
+    entry = geocode(instance.location)
+    if entry is None:
+        instance.place = None
+        instance.latitude = instance.longitude = None
+    elif instance.place_id is None or (instance.latitude, instance.longitude) != (entry['latitude'], entry['longitude']):
+        instance.place = resolve_place(instance.location)
+        instance.latitude, instance.longitude = entry['latitude'], entry['longitude']
+
+
+@receiver(post_save, sender=ListingImage)
+def enqueue_image_variants(sender, instance, created, **kwargs):
+    if created:
+        # Run after commit so the worker can see the row
+        transaction.on_commit(lambda: generate_image_variants.delay(instance.id))
+
+
+@receiver(post_save, sender=Listing)
+def enqueue_similar_listings(sender, instance, **kwargs):
+    transaction.on_commit(lambda: update_similar_listings.delay(instance.id))
+
+
+@receiver(post_save, sender=Favorite)
+def count_favorite(sender, instance, created, **kwargs):
+    if created:
+        adjust_counter(Listing.objects.filter(pk=instance.listing_id), 'favorite_count', 1)
+        transaction.on_commit(lambda: record_change(instance.user_id, instance.listing_id, True))
+
+
+@receiver(post_delete, sender=Favorite)
+def uncount_favorite(sender, instance, **kwargs):
+    adjust_counter(Listing.objects.filter(pk=instance.listing_id), 'favorite_count', -1)
+    transaction.on_commit(lambda: record_change(instance.user_id, instance.listing_id, False))
+
+
+@receiver([post_save, post_delete], sender=Listing)
+@receiver([post_save, post_delete], sender=ListingImage)
+@receiver([post_save, post_delete], sender=Category)
+def invalidate_listing_responses(sender, **kwargs):
+    """
+    Retire every cached anonymous listing response at once. Bumped after commit: a
+    request in between would cache the old rows under the new version.
+    """
+    transaction.on_commit(lambda: bump_version('listings'))
+
+
+@receiver([post_save, post_delete], sender=Category)
+def bump_category_version(sender, **kwargs):
+    """
+    Category ETags and every worker's category registry key on this version;
+    this worker's registry is reset right away rather than at its next check.
+    Both wait for the commit, or a reload in between would keep the old rows
+    under the new version.
+    """
+    def bump():
+        bump_version('categories')
+        category_registry.clear()
+
+    transaction.on_commit(bump)
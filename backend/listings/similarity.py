@@ -0,0 +1,213 @@
+"""
+Content-based similar listings.
+
+Each listing is described by a hashed bag of title/description word n-grams
+(NumPy, L2-normalised), its log price, condition and location. Similarity between
+two listings in the same category is a weighted mix of text cosine similarity,
+price closeness, condition distance and same-location. The top TOP_K neighbours of
+every listing are precomputed into SimilarListing so the `similar` endpoint is a
+single indexed read.
+
+Neighbour lists are refreshed incrementally by the `update_similar_listings` task
+when a listing is saved, and rebuilt in bulk by `manage.py rebuild_similar_listings`.
+"""
+import math
+import re
+import zlib
+
+import numpy as np
+from django.db import transaction
+
+from .models import Listing, SimilarListing
+
+TOP_K = 12
+HASH_DIM = 512
+# Listings compared against when refreshing one listing: the newest in its category
+CANDIDATE_LIMIT = 5000
+# Only this much of a description is vectorised
+DESCRIPTION_CHARS = 2000
+TITLE_WEIGHT = 2.0
+
+TEXT_WEIGHT = 0.65
+PRICE_WEIGHT = 0.2
+CONDITION_WEIGHT = 0.05
+LOCATION_WEIGHT = 0.1
+# Price similarity is exp(-|log(p1 / p2)| / PRICE_SCALE): 0.37 at a 2x difference
+PRICE_SCALE = math.log(2)
+
+CONDITION_RANK = {code: rank for rank, (code, _) in enumerate(Listing.CONDITION_CHOICES)}
+MAX_CONDITION_DISTANCE = max(len(Listing.CONDITION_CHOICES) - 1, 1)
+
+# Columns needed to build features, in the order of the rows passed around below
+FEATURE_COLUMNS = ('id', 'title', 'description', 'price', 'condition', 'location')
+
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def _ngrams(text):
+    words = _WORD_RE.findall(text.lower())
+    yield from words
+    for first, second in zip(words, words[1:]):
+        yield f'{first} {second}'
+
+
+def _add_hashed(vector, text, weight):
+    for gram in _ngrams(text):
+        # crc32 is stable across processes, unlike hash()
+        digest = zlib.crc32(gram.encode('utf-8'))
+        sign = 1.0 if digest & 0x80000000 else -1.0
+        vector[digest % HASH_DIM] += sign * weight
+
+
+def build_features(rows):
+    """Feature arrays for rows of FEATURE_COLUMNS values"""
+    count = len(rows)
+    text = np.zeros((count, HASH_DIM), dtype=np.float32)
+    log_price = np.zeros(count, dtype=np.float32)
+    condition = np.zeros(count, dtype=np.float32)
+    locations = []
+    for i, (_, title, description, price, condition_code, location) in enumerate(rows):
+        _add_hashed(text[i], title or '', TITLE_WEIGHT)
+        _add_hashed(text[i], (description or '')[:DESCRIPTION_CHARS], 1.0)
+        log_price[i] = math.log1p(max(float(price or 0), 0.0))
+        condition[i] = CONDITION_RANK.get(condition_code, CONDITION_RANK['good'])
+        locations.append((location or '').strip().lower())
+
+    norms = np.linalg.norm(text, axis=1, keepdims=True)
+    text /= np.where(norms == 0, 1, norms)
+    return {
+        'ids': np.array([row[0] for row in rows], dtype=np.int64),
+        'text': text,
+        'log_price': log_price,
+        'condition': condition,
+        # Stable integer codes, so locations compare across separately built feature sets
+        'location': np.array([zlib.crc32(name.encode('utf-8')) for name in locations], dtype=np.int64),
+    }
+
+
+def subset(features, rows):
+    """The features of `rows` (an index, slice or mask) only"""
+    return {name: values[rows] for name, values in features.items()}
+
+
+def score_matrix(query, candidates):
+    """(len(query), len(candidates)) combined similarity scores"""
+    text = query['text'] @ candidates['text'].T
+    price = np.exp(-np.abs(query['log_price'][:, None] - candidates['log_price'][None, :]) / PRICE_SCALE)
+    condition = 1.0 - np.abs(query['condition'][:, None] - candidates['condition'][None, :]) / MAX_CONDITION_DISTANCE
+    same_location = query['location'][:, None] == candidates['location'][None, :]
+    return (
+        TEXT_WEIGHT * text
+        + PRICE_WEIGHT * price
+        + CONDITION_WEIGHT * condition
+        + LOCATION_WEIGHT * same_location
+    )
+
+
+def top_neighbors(query, candidates, k=TOP_K):
+    """
+    For each query row, the k best `(neighbor_id, score)` pairs among the candidates,
+    best first, never including the listing itself.
+    """
+    scores = score_matrix(query, candidates)
+    scores[query['ids'][:, None] == candidates['ids'][None, :]] = -np.inf
+    k = min(k, scores.shape[1])
+    if k == 0:
+        return [[] for _ in range(scores.shape[0])]
+    best = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    results = []
+    for row, columns in enumerate(best):
+        columns = columns[np.argsort(-scores[row, columns])]
+        results.append([
+            (int(candidates['ids'][column]), float(scores[row, column]))
+            for column in columns if np.isfinite(scores[row, column])
+        ])
+    return results
+
+
+def neighbor_rows(listing_id, neighbors):
+    return [
+        SimilarListing(listing_id=listing_id, neighbor_id=neighbor_id, rank=rank, score=score)
+        for rank, (neighbor_id, score) in enumerate(neighbors)
+    ]
+
+
+def candidate_rows(category_id, limit=CANDIDATE_LIMIT):
+    return list(
+        Listing.objects.filter(status='approved', category_id=category_id)
+        .order_by('-created_at')
+        .values_list(*FEATURE_COLUMNS)[:limit]
+    )
+
+
+# Listings scored against their category's candidates at a time in
+# update_similar_listings_many, bounding the score matrix
+QUERY_BLOCK = 500
+
+
+def update_similar_listings(listing_id, k=TOP_K):
+    """
+    Recompute one listing's neighbour list and insert it into the lists of the
+    listings it is most similar to (similarity is symmetric, so those are the lists
+    it is most likely to belong in). Other lists catch up on the next batch rebuild.
+    """
+    update_similar_listings_many([listing_id], k)
+
+
+def update_similar_listings_many(listing_ids, k=TOP_K):
+    """
+    update_similar_listings for a batch (e.g. a bulk import), loading and
+    vectorising each category's candidates once rather than once per listing.
+    """
+    listings = list(Listing.objects.filter(pk__in=listing_ids).values('id', 'category_id', 'status'))
+    retired = [row['id'] for row in listings if row['status'] != 'approved' or row['category_id'] is None]
+    if retired:
+        SimilarListing.objects.filter(listing_id__in=retired).delete()
+        SimilarListing.objects.filter(neighbor_id__in=retired).delete()
+
+    by_category = {}
+    for row in listings:
+        if row['id'] not in retired:
+            by_category.setdefault(row['category_id'], []).append(row['id'])
+
+    lists = {}
+    for category_id, ids in by_category.items():
+        candidates = candidate_rows(category_id)
+        rows = list(Listing.objects.filter(pk__in=ids).values_list(*FEATURE_COLUMNS))
+        if not candidates:
+            lists.update((listing_id, []) for listing_id in ids)
+            continue
+        candidate_features = build_features(candidates)
+        for start in range(0, len(rows), QUERY_BLOCK):
+            block = rows[start:start + QUERY_BLOCK]
+            for row, neighbors in zip(block, top_neighbors(build_features(block), candidate_features, k)):
+                lists[row[0]] = neighbors
+
+    # Merge each listing into its neighbours' current lists. Neighbours that were
+    # themselves just recomputed already saw every listing in the batch.
+    existing = {}
+    neighbor_ids = {neighbor_id for neighbors in lists.values() for neighbor_id, _ in neighbors} - lists.keys()
+    for neighbor_of, neighbor_id, score in SimilarListing.objects.filter(
+        listing_id__in=neighbor_ids
+    ).values_list('listing_id', 'neighbor_id', 'score'):
+        existing.setdefault(neighbor_of, []).append((neighbor_id, score))
+
+    merged_lists = {}
+    for listing_id, neighbors in lists.items():
+        for neighbor_id, score in neighbors:
+            if neighbor_id in lists:
+                continue
+            current = [
+                entry for entry in merged_lists.get(neighbor_id, existing.get(neighbor_id, []))
+                if entry[0] != listing_id
+            ]
+            if len(current) >= k and score <= min(entry[1] for entry in current):
+                continue
+            merged_lists[neighbor_id] = sorted(current + [(listing_id, score)], key=lambda entry: -entry[1])[:k]
+
+    rows = []
+    for listing_id, neighbors in {**lists, **merged_lists}.items():
+        rows.extend(neighbor_rows(listing_id, neighbors))
+    with transaction.atomic():
+        SimilarListing.objects.filter(listing_id__in=[*lists, *merged_lists]).delete()
+        SimilarListing.objects.bulk_create(rows)
@@ -0,0 +1,235 @@
+"""
+Content-addressed blob storage for listing images.
+
+Uploaded images arrive as base64 data URIs. Instead of keeping those in
+``ListingImage.image``, the bytes are written to a blob store under a key derived
+from their SHA-256 hash (so re-uploading the same photo stores it once) and the row
+only keeps the blob's URL.
+
+The backend is configured with ``settings.BLOB_STORAGE``::
+
+    BLOB_STORAGE = {
+        'BACKEND': 'listings.storage.LocalBlobStore',
+        'OPTIONS': {'location': '/app/media/blobs'},
+    }
+"""
+import base64
+import binascii
+import hashlib
+import mimetypes
+import os
+import re
+import tempfile
+from functools import lru_cache
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.urls import reverse
+from django.utils.module_loading import import_string
+
+DATA_URI_RE = re.compile(r'^data:(?P<content_type>[\w.+-]+/[\w.+-]+)?(?:;[^,]*)?;base64,', re.IGNORECASE)
+BLOB_KEY_RE = re.compile(r'^[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.[a-z0-9]+$')
+
+EXTENSIONS = {
+    'image/jpeg': 'jpg',
+    'image/jpg': 'jpg',
+    'image/png': 'png',
+    'image/webp': 'webp',
+    'image/gif': 'gif',
+    'image/heic': 'heic',
+}
+
+
+def blob_key(data, extension):
+    """Sharded content-addressed key, e.g. `3f/a9/3fa9...e1.jpg`"""
+    digest = hashlib.sha256(data).hexdigest()
+    return f'{digest[:2]}/{digest[2:4]}/{digest}.{extension}'
+
+
+def is_data_uri(value):
+    return bool(value) and DATA_URI_RE.match(value) is not None
+
+
+def decode_data_uri(value):
+    """Return `(bytes, content_type)` for a base64 data URI, raising ValueError if malformed"""
+    match = DATA_URI_RE.match(value)
+    if match is None:
+        raise ValueError('Not a base64 data URI')
+    try:
+        data = base64.b64decode(value[match.end():], validate=False)
+    except (binascii.Error, ValueError) as e:
+        raise ValueError(f'Invalid base64 image data: {e}')
+    if not data:
+        raise ValueError('Empty image data')
+    return data, (match.group('content_type') or 'image/jpeg').lower()
+
+
+class BlobStore:
+    """Interface every blob backend implements"""
+
+    def write(self, key, data, content_type):
+        raise NotImplementedError
+
+    def exists(self, key):
+        raise NotImplementedError
+
+    def read(self, key):
+        raise NotImplementedError
+
+    def url(self, key):
+        raise NotImplementedError
+
+    def key_for_url(self, url):
+        """The key of a blob given its URL, or None if the URL isn't one of ours"""
+        raise NotImplementedError
+
+    def save(self, data, content_type='image/jpeg'):
+        """Store `data` under its content hash and return the key; duplicates are written once"""
+        key = blob_key(data, EXTENSIONS.get(content_type, 'bin'))
+        if not self.exists(key):
+            self.write(key, data, content_type)
+        return key
+
+
+class LocalBlobStore(BlobStore):
+    """
+    Stores blobs below MEDIA_ROOT. Files are served by `blob_view`, which hands them
+    off to nginx with X-Accel-Redirect when BLOB_ACCEL_REDIRECT is enabled.
+    """
+
+    def __init__(self, location=None):
+        self.location = str(location or os.path.join(settings.MEDIA_ROOT, 'blobs'))
+
+    def path(self, key):
+        if not BLOB_KEY_RE.match(key):
+            raise ValueError(f'Invalid blob key: {key}')
+        return os.path.join(self.location, key)
+
+    def write(self, key, data, content_type):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temporary file first so readers never see a partial blob
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def exists(self, key):
+        return os.path.exists(self.path(key))
+
+    def read(self, key):
+        with open(self.path(key), 'rb') as f:
+            return f.read()
+
+    def open(self, key):
+        return open(self.path(key), 'rb')
+
+    def url(self, key):
+        return reverse('listing-image-blob', kwargs={'key': key})
+
+    def key_for_url(self, url):
+        prefix = reverse('listing-image-blob', kwargs={'key': 'x'})[:-1]
+        if url and url.startswith(prefix):
+            key = url[len(prefix):]
+            if BLOB_KEY_RE.match(key):
+                return key
+        return None
+
+
+class S3BlobStore(BlobStore):
+    """
+    Stores blobs in an S3-compatible bucket (AWS, R2, MinIO, ...). Requires boto3.
+    `public_url` is the base URL the bucket's objects are served from.
+    """
+
+    def __init__(self, bucket, public_url, prefix='blobs/', endpoint_url=None, region_name=None):
+        try:
+            import boto3
+        except ImportError:
+            raise ImproperlyConfigured('S3BlobStore requires boto3 to be installed')
+        self.bucket = bucket
+        self.prefix = prefix
+        self.public_url = public_url.rstrip('/') + '/'
+        self.client = boto3.client('s3', endpoint_url=endpoint_url, region_name=region_name)
+
+    def object_name(self, key):
+        if not BLOB_KEY_RE.match(key):
+            raise ValueError(f'Invalid blob key: {key}')
+        return f'{self.prefix}{key}'
+
+    def write(self, key, data, content_type):
+        self.client.put_object(
+            Bucket=self.bucket,
+            Key=self.object_name(key),
+            Body=data,
+            ContentType=content_type,
+            CacheControl='public, max-age=31536000, immutable',
+        )
+
+    def exists(self, key):
+        from botocore.exceptions import ClientError
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self.object_name(key))
+        except ClientError:
+            return False
+        return True
+
+    def read(self, key):
+        return self.client.get_object(Bucket=self.bucket, Key=self.object_name(key))['Body'].read()
+
+    def url(self, key):
+        return f'{self.public_url}{self.object_name(key)}'
+
+    def key_for_url(self, url):
+        prefix = f'{self.public_url}{self.prefix}'
+        if url and url.startswith(prefix):
+            key = url[len(prefix):]
+            if BLOB_KEY_RE.match(key):
+                return key
+        return None
+
+
+@lru_cache(maxsize=None)
+def get_blob_store():
+    config = settings.BLOB_STORAGE
+    return import_string(config['BACKEND'])(**config.get('OPTIONS', {}))
+
+
+def store_image(value):
+    """
+    Move a base64 data URI into the blob store and return the blob's URL.
+    URLs and anything else that isn't a data URI are returned unchanged.
+    """
+    if not is_data_uri(value):
+        return value
+    data, content_type = decode_data_uri(value)
+    store = get_blob_store()
+    return store.url(store.save(data, content_type))
+
+
+def content_hash(value):
+    """
+    The SHA-256 hex digest of an image value's content where it is known without
+    fetching anything: base64 data URIs (decoded, raising ValueError if malformed) and
+    blob store URLs, relative or absolute, whose key is the digest. None otherwise.
+    """
+    if is_data_uri(value):
+        return hashlib.sha256(decode_data_uri(value)[0]).hexdigest()
+    store = get_blob_store()
+    key = store.key_for_url(value)
+    if key is None and value and '://' in value:
+        # build_absolute_uri() copies of local blob URLs, echoed back by clients
+        key = store.key_for_url(urlsplit(value).path)
+    if key is None:
+        return None
+    return key.rsplit('/', 1)[-1].split('.', 1)[0]
+
+
+def guess_content_type(key):
+    return mimetypes.guess_type(key)[0] or 'application/octet-stream'
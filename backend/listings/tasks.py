@@ -0,0 +1,39 @@
+from celery import shared_task
+from .models import ListingImage
+from .images import process_image
+from . import similarity, view_counts
+
+
+@shared_task(ignore_result=True)
+def generate_image_variants(image_id):
+    """Build thumbnail/WebP variants for a newly stored listing image"""
+    try:
+        image = ListingImage.objects.get(id=image_id)
+    except ListingImage.DoesNotExist:
+        return
+    process_image(image)
+
+
+@shared_task(ignore_result=True)
+def update_similar_listings(listing_id):
+    """Refresh the precomputed similar listings around an edited listing"""
+    similarity.update_similar_listings(listing_id)
+
+
+@shared_task(ignore_result=True)
+def generate_image_variants_batch(image_ids):
+    """generate_image_variants for images written by bulk_create (bulk import)"""
+    for image in ListingImage.objects.filter(id__in=image_ids):
+        process_image(image)
+
+
+@shared_task(ignore_result=True)
+def update_similar_listings_batch(listing_ids):
+    """update_similar_listings for listings written by bulk_create (bulk import)"""
+    similarity.update_similar_listings_many(listing_ids)
+
+
+@shared_task(ignore_result=True)
+def flush_view_counts():
+    """Apply buffered listing views to Listing.view_count (celery beat, see settings)"""
+    view_counts.flush_view_counts()
@@ -0,0 +1,194 @@
+from decimal import Decimal
+from unittest import skipUnless
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from marketplace.cache import get_version
+from users.models import User
+
+from .management.commands.explain_listing_filters import explain_case, filter_cases, force_index_scans, is_full_scan
+from .models import Category, Favorite, Listing, ListingImage
+from .registry import category_registry
+
+
+class ListingTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user('seller', 'seller@example.com', 'password')
+        cls.buyer = User.objects.create_user('buyer', 'buyer@example.com', 'password')
+        cls.category = Category.objects.create(name='Bikes', slug='bikes')
+        cls.listings = []
+        for number in range(12):
+            listing = Listing.objects.create(
+                title=f'Listing {number}', description='A listing', price=Decimal('100.00') + number,
+                category=cls.category, location='Mumbai', seller=cls.seller, status='approved',
+            )
+            ListingImage.objects.create(listing=listing, image=f'/media/{number}.jpg', is_primary=True)
+            ListingImage.objects.create(listing=listing, image=f'/media/{number}-2.jpg')
+            cls.listings.append(listing)
+        for listing in cls.listings[::2]:
+            Favorite.objects.create(user=cls.buyer, listing=listing)
+
+    def setUp(self):
+        # No response, version or registry state carried over between tests
+        cache.clear()
+        category_registry.clear()
+        self.client = APIClient()
+
+
+class ListingListQueryCountTests(ListingTestCase):
+    """The list endpoint's queries don't grow with the page size"""
+
+    def assert_list_queries(self, expected, query=''):
+        for page_size in (2, 10):
+            with self.subTest(page_size=page_size):
+                cache.clear()
+                category_registry.clear()
+                with self.assertNumQueries(expected):
+                    response = self.client.get(f'/api/listings/?page_size={page_size}{query}')
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.data['results']), page_size)
+
+    def test_anonymous(self):
+        self.assert_list_queries(2)
+
+    def test_anonymous_full(self):
+        # Plus the category registry loading
+        self.assert_list_queries(3, '&view=full')
+
+    def test_authenticated(self):
+        self.client.force_authenticate(self.buyer)
+        self.assert_list_queries(2)
+        response = self.client.get('/api/listings/?page_size=12')
+        favorited = {item['id'] for item in response.data['results'] if item['is_favorited']}
+        self.assertEqual(favorited, {listing.id for listing in self.listings[::2]})
+
+    @override_settings(LISTING_FAST_PATH=False)
+    def test_serializers_anonymous(self):
+        self.assert_list_queries(2)
+
+    @override_settings(LISTING_FAST_PATH=False)
+    def test_serializers_authenticated(self):
+        self.client.force_authenticate(self.buyer)
+        self.assert_list_queries(2)
+        self.assert_list_queries(3, '&view=full')
+
+
+class ResponseCacheTests(ListingTestCase):
+
+    def test_writes_invalidate_after_commit(self):
+        version = get_version('listings')
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                Listing.objects.filter(pk=self.listings[0].pk).update(title='Renamed')
+                self.listings[0].refresh_from_db()
+                self.listings[0].save()
+                # A request now would cache the pre-edit rows; they must stay under the old version
+                self.assertEqual(get_version('listings'), version)
+        self.assertGreater(get_version('listings'), version)
+
+    def test_edit_shows_in_the_next_anonymous_response(self):
+        listing = self.listings[-1]
+        self.assertEqual(self.client.get(f'/api/listings/{listing.pk}/').data['title'], listing.title)
+        listing.title = 'Renamed'
+        with self.captureOnCommitCallbacks(execute=True):
+            listing.save()
+        self.assertEqual(self.client.get(f'/api/listings/{listing.pk}/').data['title'], 'Renamed')
+
+    def test_cache_stats_is_for_staff(self):
+        self.assertEqual(self.client.get('/api/listings/cache_stats/').status_code, 401)
+        self.client.force_authenticate(self.buyer)
+        self.assertEqual(self.client.get('/api/listings/cache_stats/').status_code, 403)
+        self.client.force_authenticate(User.objects.create_user('staff', 'staff@example.com', 'password', is_staff=True))
+        self.assertEqual(self.client.get('/api/listings/cache_stats/').status_code, 200)
+
+    def test_category_writes_reload_the_registry_after_commit(self):
+        version = get_version('categories')
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                Category.objects.create(name='Cars', slug='cars')
+                self.assertEqual(get_version('categories'), version)
+        self.assertGreater(get_version('categories'), version)
+        names = {category['name'] for category in self.client.get('/api/listings/categories/').data}
+        self.assertIn('Cars', names)
+
+
+class ListingConditionalGetTests(ListingTestCase):
+
+    def test_favouriting_changes_the_representation(self):
+        listing = self.listings[0]
+        self.client.force_authenticate(self.buyer)
+        response = self.client.get(f'/api/listings/{listing.pk}/')
+        self.assertTrue(response.data['is_favorited'])
+        self.assertNotIn('Last-Modified', response)
+        etag = response['ETag']
+        self.assertEqual(self.client.get(f'/api/listings/{listing.pk}/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        Favorite.objects.filter(user=self.buyer, listing=listing).delete()
+        response = self.client.get(f'/api/listings/{listing.pk}/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.data['is_favorited'])
+        response = self.client.get(f'/api/listings/{listing.pk}/', HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT')
+        self.assertEqual(response.status_code, 200)
+
+
+
+@skipUnless(connection.vendor == 'postgresql', 'The listing indexes are PostgreSQL partial indexes')
+class ListingFilterIndexTests(ListingTestCase):
+    """
+    The common filter combinations can be served by an index. The test table is tiny,
+    so sequential scans are disabled: a full scan then means no usable index.
+    """
+
+    def test_common_filters_use_indexes(self):
+        force_index_scans()
+        for name, params, ordering in filter_cases():
+            with self.subTest(name):
+                plan = explain_case(params, ordering)
+                self.assertFalse(is_full_scan(plan), plan)
+
+
+class FastPathOutputTests(ListingTestCase):
+    """
+    listings/fastpath.py renders the same bytes as the serializers did before it,
+    rendered with DRF's stdlib JSONRenderer
+    """
+
+    def setUp(self):
+        super().setUp()
+        # Non-ASCII and the separators JSONRenderer escapes for JavaScript
+        Listing.objects.filter(pk=self.listings[-1].pk).update(title='Café\u2028bike')
+
+    def render(self, path, fast):
+        cache.clear()
+        category_registry.clear()
+        with override_settings(LISTING_FAST_PATH=fast):
+            response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        return response.content if fast else JSONRenderer().render(response.data)
+
+    def assert_same_output(self, *paths):
+        for path in paths:
+            with self.subTest(path):
+                self.assertEqual(self.render(path, fast=True), self.render(path, fast=False))
+
+    def test_anonymous(self):
+        similar = f'/api/listings/{self.listings[0].pk}/similar/'
+        self.assert_same_output(
+            '/api/listings/?page_size=5', '/api/listings/?page_size=5&view=full',
+            similar, f'{similar}?view=full',
+        )
+
+    def test_authenticated(self):
+        self.client.force_authenticate(self.buyer)
+        similar = f'/api/listings/{self.listings[0].pk}/similar/'
+        self.assert_same_output(
+            '/api/listings/?page_size=5', '/api/listings/?page_size=5&view=full',
+            '/api/listings/favorites/', '/api/listings/favorites/?view=full',
+            similar, f'{similar}?view=full',
+        )
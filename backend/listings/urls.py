@@ -1,13 +1,21 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import ListingViewSet, CategoryViewSet
+from marketplace.async_api import async_read_routes
+from .views import ListingViewSet, CategoryViewSet, blob_view
 
 router = DefaultRouter()
 router.register(r'categories', CategoryViewSet, basename='category')
 router.register(r'', ListingViewSet, basename='listing')
 
+routes = router.urls
+if settings.ASYNC_READ_VIEWS:
+    # GET/HEAD of these from async views; see marketplace/async_api.py
+    routes = async_read_routes(routes, {'category-list', 'category-detail', 'listing-list', 'listing-detail'})
+
 urlpatterns = [
-    path('', include(router.urls)),
+    path('images/<path:key>', blob_view, name='listing-image-blob'),
+    path('', include(routes)),
 ]
 
 
@@ -0,0 +1,162 @@
+"""
+Buffered listing view counters.
+
+A listing detail view records a view here instead of writing to the database. Views
+are deduplicated per viewer (user, or IP + user agent for anonymous visitors) per
+VIEW_COUNT_DEDUPE_WINDOW, and the seller's own views are ignored. Counted views
+accumulate in a buffer and are added to Listing.view_count by the
+`flush_view_counts` beat task every VIEW_COUNT_FLUSH_INTERVAL seconds, as a few
+batched UPDATEs rather than one write per view on hot rows.
+
+With Redis (VIEW_COUNT_REDIS_URL) the buffer is a hash shared by every worker: one
+round trip per view sets a dedupe key and HINCRBYs the listing's field. Without it
+(development, tests) the buffer lives in process memory and flushes itself on the
+interval, since there's no beat process sharing that memory.
+"""
+import hashlib
+import logging
+import threading
+import time
+from functools import lru_cache
+
+import redis
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from marketplace.proxies import client_address
+
+from .models import Listing
+
+logger = logging.getLogger(__name__)
+
+PENDING_KEY = 'listing-views:pending'
+# A flush renames the pending hash to this key first, so views recorded meanwhile
+# start a new hash; a key left over by a failed flush is applied by the next one
+FLUSHING_KEY = 'listing-views:flushing'
+SEEN_KEY_PREFIX = 'listing-views:seen'
+# Listings per UPDATE ... WHERE id IN (...)
+FLUSH_BATCH_SIZE = 1000
+REDIS_TIMEOUT = 0.5
+
+# Set the viewer's dedupe key and count the view only if the key was new
+RECORD_SCRIPT = """
+if redis.call('SET', KEYS[1], '1', 'NX', 'EX', ARGV[1]) then
+    return redis.call('HINCRBY', KEYS[2], ARGV[2], 1)
+end
+return 0
+"""
+
+
+def viewer_key(request):
+    """Who is viewing: the user, or a hash of IP and user agent for anonymous visitors"""
+    if request.user.is_authenticated:
+        return f'u{request.user.pk}'
+    address = client_address(request)
+    agent = request.META.get('HTTP_USER_AGENT', '')
+    return 'a' + hashlib.sha1(f'{address}|{agent}'.encode()).hexdigest()[:20]
+
+
+def apply_counts(counts):
+    """Add `{listing_id: views}` to Listing.view_count, one UPDATE per batch of equal increments"""
+    by_increment = {}
+    for listing_id, views in counts.items():
+        if views > 0:
+            by_increment.setdefault(views, []).append(listing_id)
+    updated = 0
+    with transaction.atomic():
+        for views, listing_ids in by_increment.items():
+            for start in range(0, len(listing_ids), FLUSH_BATCH_SIZE):
+                # update() leaves updated_at alone, so listing ETags don't churn
+                updated += Listing.objects.filter(pk__in=listing_ids[start:start + FLUSH_BATCH_SIZE]).update(
+                    view_count=F('view_count') + views
+                )
+    return updated
+
+
+class RedisViewBuffer:
+    def __init__(self, url, window):
+        # A slow or unreachable Redis must not hold up listing pages
+        self.client = redis.Redis.from_url(url, socket_timeout=REDIS_TIMEOUT, socket_connect_timeout=REDIS_TIMEOUT)
+        self.window = window
+        self.record_script = self.client.register_script(RECORD_SCRIPT)
+
+    def record(self, listing_id, viewer):
+        seen_key = f'{SEEN_KEY_PREFIX}:{listing_id}:{viewer}'
+        return bool(self.record_script(keys=[seen_key, PENDING_KEY], args=[self.window, listing_id]))
+
+    def pending(self):
+        return {int(key): int(value) for key, value in self.client.hgetall(PENDING_KEY).items()}
+
+    def flush(self):
+        if not self.client.exists(FLUSHING_KEY):
+            try:
+                self.client.rename(PENDING_KEY, FLUSHING_KEY)
+            except redis.ResponseError:
+                # No such key: nothing recorded since the last flush
+                return 0
+        counts = {int(key): int(value) for key, value in self.client.hgetall(FLUSHING_KEY).items()}
+        apply_counts(counts)
+        self.client.delete(FLUSHING_KEY)
+        return sum(counts.values())
+
+
+class MemoryViewBuffer:
+    def __init__(self, window, flush_interval=None):
+        self.window = window
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()
+        self.counts = {}
+        self.seen = {}
+        self.last_flush = time.monotonic()
+
+    def record(self, listing_id, viewer):
+        now = time.monotonic()
+        key = (listing_id, viewer)
+        with self.lock:
+            expires = self.seen.get(key)
+            if expires is not None and expires > now:
+                return False
+            self.seen[key] = now + self.window
+            self.counts[listing_id] = self.counts.get(listing_id, 0) + 1
+            due = self.flush_interval is not None and now - self.last_flush >= self.flush_interval
+        if due:
+            self.flush()
+        return True
+
+    def pending(self):
+        with self.lock:
+            return dict(self.counts)
+
+    def flush(self):
+        now = time.monotonic()
+        with self.lock:
+            counts, self.counts = self.counts, {}
+            self.seen = {key: expires for key, expires in self.seen.items() if expires > now}
+            self.last_flush = now
+        apply_counts(counts)
+        return sum(counts.values())
+
+
+@lru_cache(maxsize=None)
+def get_view_buffer():
+    window = settings.VIEW_COUNT_DEDUPE_WINDOW
+    if settings.VIEW_COUNT_REDIS_URL:
+        return RedisViewBuffer(settings.VIEW_COUNT_REDIS_URL, window)
+    return MemoryViewBuffer(window, flush_interval=settings.VIEW_COUNT_FLUSH_INTERVAL)
+
+
+def record_view(request, listing_id, seller_id):
+    """Count a detail view of a listing; never fails the request"""
+    if request.user.is_authenticated and request.user.pk == seller_id:
+        return False
+    try:
+        return get_view_buffer().record(listing_id, viewer_key(request))
+    except Exception:
+        logger.warning('Could not record a view of listing %s', listing_id, exc_info=True)
+        return False
+
+
+def flush_view_counts():
+    """Move buffered views into Listing.view_count; returns the number of views applied"""
+    return get_view_buffer().flush()
@@ -1,13 +1,39 @@
-from rest_framework import viewsets, status, filters
+from asgiref.sync import sync_to_async
+from rest_framework import viewsets, status
 from rest_framework.decorators import action
-from rest_framework.permissions import IsAuthenticatedOrReadOnly, IsAuthenticated, AllowAny
+from rest_framework.permissions import IsAuthenticatedOrReadOnly, IsAuthenticated, AllowAny, IsAdminUser
 from rest_framework.response import Response
-from django.db import models
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import Count, Exists, OuterRef, Prefetch, Sum
+from django.db.models.functions import Coalesce
+from django.core.exceptions import ValidationError
+from django.http import FileResponse, Http404, HttpResponse
+from django.views.decorators.http import require_http_methods
 from django_filters.rest_framework import DjangoFilterBackend
+from marketplace.async_api import call_or_defer
+from marketplace.cache import (
+    acached_response, aget_version, aresponse_cache_key, cache_stats, cached_response, get_version,
+    response_cache_key,
+)
+from marketplace.conditional import make_etag, not_modified_response, set_validators
+from marketplace.pagination import KeysetPagination
 from .models import Listing, Category, Favorite, ListingImage
+from .bulk_import import FORMAT_CSV, FORMAT_NDJSON, ListingImporter, format_for_content_type
+from .counters import COUNTER_FIELDS
+from .registry import category_registry
+from .facets import cached_facets
+from .fastpath import ListingRowBuilder, fast_path_enabled
+from .favorite_sync import favorite_ids_payload, favorites_version
+from .filters import ListingFilter
+from .geo import ListingGeoFilter
+from .search import ListingSearchFilter, ListingOrderingFilter
+from .storage import BLOB_KEY_RE, LocalBlobStore, get_blob_store, guess_content_type
+from .view_counts import record_view
 from .serializers import (
     ListingSerializer, CategorySerializer, FavoriteSerializer,
-    ListingCreateSerializer
+    ListingCreateSerializer, ListingCardSerializer, FavoriteCardSerializer,
+    SellerListingSerializer, SellerListingCardSerializer
 )
 
 
@@ -17,21 +43,277 @@ class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
     pagination_class = None  # Disable pagination for categories
     permission_classes = [AllowAny]  # Allow anyone to view categories
 
+    def list(self, request, *args, **kwargs):
+        # The 'categories' version changes whenever a Category is saved or deleted,
+        # so revalidation needs no database query at all
+        etag = make_etag(request, 'categories', get_version('categories'))
+        not_modified = not_modified_response(request, etag=etag)
+        if not_modified is not None:
+            return not_modified
+        # Precomputed body from the in-process registry
+        return set_validators(Response(category_registry.serialized_list()), etag=etag)
+
+    async def alist(self, request, *args, **kwargs):
+        """list() for the async route (marketplace/async_api.py)"""
+        etag = make_etag(request, 'categories', await aget_version('categories'))
+        not_modified = not_modified_response(request, etag=etag)
+        if not_modified is not None:
+            return not_modified
+        return set_validators(Response(await category_registry.aserialized_list()), etag=etag)
+
+    def retrieve(self, request, *args, **kwargs):
+        category = category_registry.get(kwargs.get('pk'))
+        if category is None:
+            raise Http404('Category not found')
+        return Response(category_registry.serialize(category.id))
+
+    async def aretrieve(self, request, *args, **kwargs):
+        category = await category_registry.aget(kwargs.get('pk'))
+        if category is None:
+            raise Http404('Category not found')
+        return Response(category_registry.serialize(category.id))
+
 
 class ListingViewSet(viewsets.ModelViewSet):
     # Base queryset - shows approved listings for public, but get_queryset() will override for authenticated users
-    queryset = Listing.objects.filter(status='approved').select_related('seller', 'category').prefetch_related('images')
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['category', 'location', 'status', 'condition', 'is_featured']
+    queryset = Listing.objects.filter(status='approved').select_related('seller').prefetch_related('images')
+    # ListingSearchFilter uses the ranked tsvector index on PostgreSQL and falls back
+    # to icontains over search_fields elsewhere; ListingGeoFilter handles ?near=lat,lon
+    filter_backends = [DjangoFilterBackend, ListingSearchFilter, ListingGeoFilter, ListingOrderingFilter]
+    filterset_class = ListingFilter
     search_fields = ['title', 'description', 'location']
     ordering_fields = ['price', 'created_at', '-price', '-created_at']
     ordering = ['-created_at']
+    # Cursor pages keyed on (ordering, id): no COUNT(*) and no deep OFFSET scans
+    pagination_class = KeysetPagination
+
+    # List-style endpoints return compact cards unless the client passes ?view=full
+    card_actions = ('list', 'favorites', 'similar', 'my_listings')
 
     def get_serializer_class(self):
         if self.action == 'create':
             return ListingCreateSerializer
+        if self.action == 'my_listings':
+            # The seller's own listings carry their view counts
+            return SellerListingCardSerializer if self.use_card_view() else SellerListingSerializer
+        if self.use_card_view():
+            return ListingCardSerializer
         return ListingSerializer
+
+    def use_card_view(self):
+        return self.action in self.card_actions and self.request.query_params.get('view') != 'full'
+
+    def card_queryset(self, queryset):
+        """Load only what the card serializer renders: card columns, seller, primary image"""
+        return queryset.select_related(None).select_related('seller').only(
+            *self.get_serializer_class().card_fields
+        ).prefetch_related(None).prefetch_related(self.primary_image_prefetch('images'))
+
+    def primary_image_prefetch(self, lookup):
+        return Prefetch(
+            lookup,
+            queryset=ListingImage.objects.filter(is_primary=True).only('id', 'listing', 'image', 'variants', 'is_primary'),
+            to_attr='primary_images',
+        )
     
+    # Anonymous list/retrieve responses are cached under this version counter, which
+    # listings.signals bumps whenever a Listing, ListingImage or Category changes
+    response_cache_namespace = 'listings'
+
+    def list(self, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return self.list_response(request, *args, **kwargs)
+        return cached_response(
+            self.response_cache_namespace,
+            response_cache_key(self.response_cache_namespace, request, 'list'),
+            lambda: self.list_response(request, *args, **kwargs),
+        )
+
+    async def alist(self, request, *args, **kwargs):
+        """list() for the async route (marketplace/async_api.py)"""
+        if request.user.is_authenticated:
+            return await self.alist_response(request, *args, **kwargs)
+        return await acached_response(
+            self.response_cache_namespace,
+            await aresponse_cache_key(self.response_cache_namespace, request, 'list'),
+            lambda: self.alist_response(request, *args, **kwargs),
+        )
+
+    def list_response(self, request, *args, **kwargs):
+        if fast_path_enabled():
+            response = self.fast_list(request)
+        else:
+            response = super().list(request, *args, **kwargs)
+        if self.wants_facets(request) and response.status_code == 200:
+            response.data['facets'] = self.get_facets()
+        return response
+
+    async def alist_response(self, request, *args, **kwargs):
+        if not fast_path_enabled():
+            # Serializers load related objects lazily, which the event loop can't do
+            return await sync_to_async(self.list_response)(request, *args, **kwargs)
+        response = await self.afast_list(request)
+        if self.wants_facets(request) and response.status_code == 200:
+            response.data['facets'] = await sync_to_async(self.get_facets)()
+        return response
+
+    def wants_facets(self, request):
+        # ?facets=true adds the filter sheet counts to the first page only
+        wants_facets = request.query_params.get('facets', '').lower() in ('1', 'true', 'yes')
+        return wants_facets and not request.query_params.get('cursor')
+
+    def fast_list(self, request):
+        """list() through the values() fast path; see listings/fastpath.py"""
+        builder = ListingRowBuilder(request, full=not self.use_card_view())
+        queryset = self.filter_queryset(self.get_queryset())
+        rows = queryset.select_related(None).prefetch_related(None).values(
+            *builder.columns(queryset.query.annotations)
+        )
+        page = self.paginate_queryset(rows)
+        if page is None:
+            return Response(builder.build(rows))
+        return self.get_paginated_response(builder.build(page))
+
+    async def afast_list(self, request):
+        builder = ListingRowBuilder(request, full=not self.use_card_view())
+        queryset = await call_or_defer(self.filter_queryset, self.get_queryset())
+        rows = queryset.select_related(None).prefetch_related(None).values(
+            *builder.columns(queryset.query.annotations)
+        )
+        page = await self.paginator.apaginate_queryset(rows, request, view=self)
+        return self.get_paginated_response(await builder.abuild(page))
+
+    def get_facets(self):
+        """Facet counts for the current filters, cached; see listings/facets.py"""
+        user = self.request.user
+        if not user.is_authenticated:
+            scope = 'anonymous'
+        elif user.is_staff:
+            scope = 'staff'
+        else:
+            scope = f'user:{user.pk}'
+        queryset = self.filter_queryset(self.filter_visible(Listing.objects.all()))
+        return cached_facets(self.request, scope, queryset)
+
+    @action(detail=False, methods=['get'])
+    def facets(self, request):
+        """Category / condition / price bucket counts for the listings matching the filters"""
+        return Response(self.get_facets())
+
+    def retrieve(self, request, *args, **kwargs):
+        # Revalidate with one indexed lookup before any of the heavy queryset work
+        etag = None
+        validators = self.get_listing_validators(kwargs.get(self.lookup_url_kwarg or self.lookup_field))
+        if validators is not None:
+            etag, listing_id, seller_id = validators
+            # Buffered and deduplicated per viewer; see listings/view_counts.py
+            record_view(request, listing_id, seller_id)
+            not_modified = not_modified_response(request, etag=etag)
+            if not_modified is not None:
+                return not_modified
+
+        if request.user.is_authenticated:
+            response = super().retrieve(request, *args, **kwargs)
+        else:
+            response = cached_response(
+                self.response_cache_namespace,
+                response_cache_key(self.response_cache_namespace, request, 'retrieve', kwargs.get('pk')),
+                lambda: super(ListingViewSet, self).retrieve(request, *args, **kwargs),
+            )
+        if validators is not None and response.status_code == 200:
+            set_validators(response, etag=etag)
+        return response
+
+    async def aretrieve(self, request, *args, **kwargs):
+        """retrieve() for the async route (marketplace/async_api.py)"""
+        etag = None
+        validators = await self.aget_listing_validators(kwargs.get(self.lookup_url_kwarg or self.lookup_field))
+        if validators is not None:
+            etag, listing_id, seller_id = validators
+            # The view buffer may be Redis, which isn't async
+            await sync_to_async(record_view)(request, listing_id, seller_id)
+            not_modified = not_modified_response(request, etag=etag)
+            if not_modified is not None:
+                return not_modified
+
+        if request.user.is_authenticated:
+            response = await self.aretrieve_response(request, *args, **kwargs)
+        else:
+            response = await acached_response(
+                self.response_cache_namespace,
+                await aresponse_cache_key(self.response_cache_namespace, request, 'retrieve', kwargs.get('pk')),
+                lambda: self.aretrieve_response(request, *args, **kwargs),
+            )
+        if validators is not None and response.status_code == 200:
+            set_validators(response, etag=etag)
+        return response
+
+    async def aretrieve_response(self, request, *args, **kwargs):
+        """
+        The ModelViewSet.retrieve() body: ListingSerializer output, built by the fast
+        path from one values() row, whose output is the same
+        """
+        if not fast_path_enabled():
+            return await sync_to_async(super().retrieve)(request, *args, **kwargs)
+        builder = ListingRowBuilder(request, full=True)
+        queryset = await call_or_defer(self.filter_queryset, self.get_queryset())
+        rows = queryset.select_related(None).prefetch_related(None).values(
+            *builder.columns(queryset.query.annotations)
+        )
+        # As get_object()
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            row = await rows.filter(**{self.lookup_field: kwargs[lookup_url_kwarg]}).afirst()
+        except (TypeError, ValueError, ValidationError):
+            row = None
+        if row is None:
+            raise Http404
+        return Response((await builder.abuild([row]))[0])
+
+    def get_listing_validators(self, pk):
+        """
+        (ETag, id, seller id) for a listing the user may see, or None if there's no
+        such listing. The ETag covers updated_at (bumped by every edit and image
+        change), the viewer's favourite state and the category version. No
+        Last-Modified: updated_at alone misses the last two, so If-Modified-Since
+        would answer 304 after a favourite or a category rename.
+        """
+        rows = self.listing_validator_rows(pk)
+        row = None if rows is None else rows.first()
+        if row is None:
+            return None
+        return self.listing_validators(row, get_version('categories'))
+
+    async def aget_listing_validators(self, pk):
+        rows = self.listing_validator_rows(pk)
+        row = None if rows is None else await rows.afirst()
+        if row is None:
+            return None
+        return self.listing_validators(row, await aget_version('categories'))
+
+    def listing_validator_rows(self, pk):
+        try:
+            pk = int(pk)
+        except (TypeError, ValueError):
+            return None
+        listings = self.filter_visible(Listing.objects.filter(pk=pk))
+        if self.request.user.is_authenticated:
+            return self.annotate_favorites(listings).values_list('id', 'updated_at', 'seller_id', 'is_favorited')
+        return listings.values_list('id', 'updated_at', 'seller_id')
+
+    def listing_validators(self, row, categories_version):
+        pk, updated_at, seller_id = row[:3]
+        etag = make_etag(
+            self.request, 'listing', pk, updated_at.isoformat(), *row[3:],
+            self.request.user.id, categories_version,
+        )
+        return etag, pk, seller_id
+
+    @action(detail=False, methods=['get'], permission_classes=[IsAdminUser])
+    def cache_stats(self, request):
+        """Hit/miss counters of the anonymous response cache"""
+        return Response(cache_stats(self.response_cache_namespace))
+
     def update(self, request, *args, **kwargs):
         """Override update to add better error handling and logging"""
         import logging
@@ -76,7 +358,8 @@ class ListingViewSet(viewsets.ModelViewSet):
             return [AllowAny()]
         elif self.action in ['create', 'update', 'partial_update', 'destroy']:
             return [IsAuthenticated()]
-        return [AllowAny()]
+        # Extra actions declare their own permission_classes
+        return super().get_permissions()
 
     def get_queryset(self):
         """
@@ -85,18 +368,35 @@ class ListingViewSet(viewsets.ModelViewSet):
         - Authenticated users: See approved listings + their own listings (even if pending)
         - Anonymous: See only approved listings
         """
+        # The search document is only used for filtering, never sent to clients
+        listings = Listing.objects.select_related('seller').prefetch_related('images').defer('search_vector')
+        listings = self.filter_visible(listings)
+        if self.request.user.is_authenticated:
+            listings = self.annotate_favorites(listings)
+        if self.action == 'list' and self.use_card_view():
+            listings = self.card_queryset(listings)
+        return listings
+
+    def filter_visible(self, queryset):
+        """Restrict `queryset` to the listings the requesting user may see"""
         if self.request.user.is_authenticated and self.request.user.is_staff:
             # Staff can see everything
-            return Listing.objects.all().select_related('seller', 'category').prefetch_related('images')
+            return queryset.all()
         elif self.request.user.is_authenticated:
             # Authenticated users see approved listings + their own listings
-            return Listing.objects.filter(
+            return queryset.filter(
                 models.Q(status='approved') | models.Q(seller=self.request.user)
-            ).select_related('seller', 'category').prefetch_related('images')
+            )
         else:
             # Anonymous users see only approved listings
-            return Listing.objects.filter(status='approved').select_related('seller', 'category').prefetch_related('images')
+            return queryset.filter(status='approved')
     
+    def annotate_favorites(self, queryset):
+        """Compute is_favorited in the listing query itself rather than once per row"""
+        return queryset.annotate(is_favorited=Exists(
+            Favorite.objects.filter(user=self.request.user, listing=OuterRef('pk'))
+        ))
+
     def perform_create(self, serializer):
         serializer.save(seller=self.request.user)
     
@@ -115,41 +415,181 @@ class ListingViewSet(viewsets.ModelViewSet):
 
     @action(detail=True, methods=['post', 'delete'], permission_classes=[IsAuthenticated])
     def favorite(self, request, pk=None):
+        """
+        POST favourites the listing, DELETE unfavourites it; both are idempotent. The
+        Favorite row and the listing's favorite_count change in one transaction (the
+        counter through the Favorite signals), and the new count is returned.
+        """
         listing = self.get_object()
-        favorite, created = Favorite.objects.get_or_create(user=request.user, listing=listing)
-        
+        with transaction.atomic():
+            if request.method == 'DELETE':
+                changed = Favorite.objects.filter(user=request.user, listing=listing).delete()[0] > 0
+            else:
+                changed = Favorite.objects.get_or_create(user=request.user, listing=listing)[1]
+            favorite_count = Listing.objects.filter(pk=listing.pk).values_list('favorite_count', flat=True).first()
+
         if request.method == 'DELETE':
-            favorite.delete()
-            return Response({'message': 'Removed from favorites'}, status=status.HTTP_200_OK)
-        
-        if not created:
-            return Response({'message': 'Already in favorites'}, status=status.HTTP_200_OK)
-        
-        return Response({'message': 'Added to favorites'}, status=status.HTTP_201_CREATED)
+            message, response_status = 'Removed from favorites' if changed else 'Not in favorites', status.HTTP_200_OK
+        elif changed:
+            message, response_status = 'Added to favorites', status.HTTP_201_CREATED
+        else:
+            message, response_status = 'Already in favorites', status.HTTP_200_OK
+        return Response({
+            'message': message,
+            'is_favorited': request.method != 'DELETE',
+            'favorite_count': favorite_count,
+        }, status=response_status)
+
+    @action(detail=False, methods=['post'], url_path='import', permission_classes=[IsAuthenticated])
+    def bulk_import(self, request):
+        """
+        Create many listings from an NDJSON (application/x-ndjson) or CSV (text/csv)
+        body, or a multipart upload in a `file` field. Invalid rows are reported by
+        line number and skipped; see listings/bulk_import.py.
+        """
+        upload = request.FILES.get('file') if request.content_type.startswith('multipart/') else None
+        if upload is not None:
+            import_format = format_for_content_type(upload.content_type) or (
+                FORMAT_CSV if upload.name.lower().endswith('.csv') else FORMAT_NDJSON
+            )
+            lines = upload
+        else:
+            import_format = format_for_content_type(request.content_type)
+            lines = request.stream
+        if import_format is None:
+            return Response(
+                {'error': 'Send application/x-ndjson or text/csv, or upload a file'},
+                status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            )
+        if lines is None:
+            return Response({'error': 'No rows to import'}, status=status.HTTP_400_BAD_REQUEST)
+
+        importer = ListingImporter(
+            request.user,
+            chunk_size=settings.LISTING_IMPORT_CHUNK_SIZE,
+            max_rows=settings.LISTING_IMPORT_MAX_ROWS,
+        )
+        result = importer.run(lines, import_format)
+        response_status = status.HTTP_201_CREATED if result.created_ids else status.HTTP_400_BAD_REQUEST
+        return Response(result.as_dict(max_errors=1000), status=response_status)
 
     @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
     def my_listings(self, request):
-        listings = Listing.objects.filter(seller=request.user)
-        serializer = self.get_serializer(listings, many=True)
-        return Response(serializer.data)
+        """
+        The seller dashboard: the user's own listings, newest first and cursor
+        paginated, each with its favourite, chat room, unread message and view
+        counters (maintained on write, see listings/counters.py). The first page also
+        carries a `totals` row. `?status=` narrows it to one status.
+        """
+        listings = self.annotate_favorites(Listing.objects.filter(seller=request.user))
+        if request.query_params.get('status'):
+            listings = listings.filter(status=request.query_params['status'])
+        if self.use_card_view():
+            listings = self.card_queryset(listings)
+        else:
+            listings = listings.select_related('seller').prefetch_related('images').defer('search_vector')
+        page = self.paginate_queryset(listings)
+        response = self.get_paginated_response(self.get_serializer(page, many=True).data)
+        if not request.query_params.get('cursor'):
+            response.data['totals'] = self.dashboard_totals(request.user)
+        return response
+
+    def dashboard_totals(self, user):
+        """One aggregate over the seller's listings, summing the denormalized counters"""
+        return Listing.objects.filter(seller=user).aggregate(
+            listings=Count('id'),
+            active_listings=Count('id', filter=models.Q(status='approved')),
+            **{field: Coalesce(Sum(field), 0) for field in COUNTER_FIELDS},
+        )
 
     @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
     def favorites(self, request):
-        favorites = Favorite.objects.filter(user=request.user).select_related('listing')
-        serializer = FavoriteSerializer(favorites, many=True)
-        return Response(serializer.data)
+        """The user's favourites with their listings, newest first and cursor paginated"""
+        if fast_path_enabled():
+            return self.fast_favorites(request)
+        favorites = Favorite.objects.filter(user=request.user)
+        if self.use_card_view():
+            favorites = favorites.select_related('listing__seller').only(
+                'id', 'created_at', *[f'listing__{field}' for field in ListingCardSerializer.card_fields]
+            ).prefetch_related(self.primary_image_prefetch('listing__images'))
+            serializer_class = FavoriteCardSerializer
+        else:
+            favorites = favorites.select_related('listing__seller').prefetch_related('listing__images')
+            serializer_class = FavoriteSerializer
+        page = self.paginate_queryset(favorites)
+        serializer = serializer_class(page, many=True, context=self.get_serializer_context())
+        return self.get_paginated_response(serializer.data)
+
+    def fast_favorites(self, request):
+        """FavoriteCardSerializer / FavoriteSerializer output through the fast path"""
+        builder = ListingRowBuilder(request, full=not self.use_card_view())
+        favorites = self.paginate_queryset(
+            Favorite.objects.filter(user=request.user).values('id', 'listing_id', 'created_at')
+        )
+        listing_ids = [favorite['listing_id'] for favorite in favorites]
+        rows = Listing.objects.filter(id__in=listing_ids).values(*builder.columns())
+        listings = {listing['id']: listing for listing in builder.build(rows, favorite_ids=set(listing_ids))}
+        return self.get_paginated_response([
+            {
+                'id': favorite['id'],
+                'listing': listings[favorite['listing_id']],
+                'created_at': builder.format_datetime(favorite['created_at']),
+            }
+            for favorite in favorites
+        ])
+
+    @action(detail=False, methods=['get'], url_path='favorites/ids', permission_classes=[IsAuthenticated])
+    def favorite_ids(self, request):
+        """
+        The IDs of the user's favourite listings, for filling in hearts client side.
+        Send the last `version` as `?since=` to get only what was added and removed;
+        see listings/favorite_sync.py.
+        """
+        try:
+            since = int(request.query_params['since'])
+        except (KeyError, ValueError):
+            since = None
+        version = favorites_version(request.user.id)
+        etag = make_etag(request, 'favorite-ids', request.user.id, version, since)
+        not_modified = not_modified_response(request, etag=etag)
+        if not_modified is not None:
+            return not_modified
+        return set_validators(Response(favorite_ids_payload(request.user.id, since)), etag=etag)
 
     @action(detail=True, methods=['get'], permission_classes=[AllowAny])
     def similar(self, request, pk=None):
-        """Get similar listings (same category, exclude current listing)"""
+        """Get similar listings (precomputed neighbours, else same category)"""
         listing = self.get_object()
-        similar = Listing.objects.filter(
-            category=listing.category,
+        # One indexed read of the neighbour table; see listings/similarity.py
+        neighbors = Listing.objects.filter(
+            neighbor_of__listing_id=listing.id,
+            status='approved'
+        ).order_by('neighbor_of__rank')
+        # Fallback while neighbours aren't computed yet (new listing, or before the first rebuild)
+        same_category = Listing.objects.filter(
+            category_id=listing.category_id,
             status='approved'
-        ).exclude(id=listing.id).select_related('seller', 'category').prefetch_related('images')[:6]
+        ).exclude(id=listing.id)
+        if fast_path_enabled():
+            builder = ListingRowBuilder(request, full=not self.use_card_view())
+            similar = self.similar_rows(builder, neighbors) or self.similar_rows(builder, same_category)
+            return Response(builder.build(similar))
+        similar = list(self.similar_queryset(neighbors)[:6])
+        if not similar:
+            similar = list(self.similar_queryset(same_category)[:6])
         serializer = self.get_serializer(similar, many=True)
         return Response(serializer.data)
 
+    def similar_queryset(self, queryset):
+        if self.use_card_view():
+            return self.card_queryset(queryset)
+        return queryset.select_related('seller').prefetch_related('images')
+
+    def similar_rows(self, builder, queryset):
+        if self.request.user.is_authenticated:
+            queryset = self.annotate_favorites(queryset)
+        return list(queryset.values(*builder.columns(queryset.query.annotations))[:6])
+
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
     def report(self, request, pk=None):
         """Report a listing for inappropriate content"""
@@ -162,3 +602,22 @@ class ListingViewSet(viewsets.ModelViewSet):
             'listing_id': listing.id
         }, status=status.HTTP_200_OK)
 
+
+@require_http_methods(["GET", "HEAD"])
+def blob_view(request, key):
+    """
+    Serve a listing image from the local blob store. Behind nginx (BLOB_ACCEL_REDIRECT)
+    the file is sent by nginx via X-Accel-Redirect; otherwise Django streams it.
+    """
+    store = get_blob_store()
+    if not BLOB_KEY_RE.match(key) or not isinstance(store, LocalBlobStore) or not store.exists(key):
+        raise Http404('Image not found')
+
+    if settings.BLOB_ACCEL_REDIRECT:
+        response = HttpResponse(content_type=guess_content_type(key))
+        response['X-Accel-Redirect'] = f'{settings.BLOB_ACCEL_REDIRECT_PREFIX}{key}'
+    else:
+        response = FileResponse(store.open(key), content_type=guess_content_type(key))
+    # Blobs are content-addressed, so a key's bytes never change
+    response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
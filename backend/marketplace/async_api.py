@@ -0,0 +1,139 @@
+"""
+Async views for the hottest read endpoints.
+
+Under ASGI Django runs a sync view in a thread, so each in-flight request holds a
+thread for its whole duration. `async_read_routes()` replaces chosen router-generated
+URL patterns with async views that keep the same regex, name and viewset: GET and
+HEAD are dispatched on the event loop to the viewset's async twin of the action
+(`alist` for `list`, `aretrieve` for `retrieve`, ...), which queries through Django's
+async ORM. Every other method, and actions without a twin, go to the viewset's
+usual sync view. Authentication, permissions, content negotiation and exception
+handling are DRF's own, called in the order APIView.dispatch() calls them, so
+responses and errors are the same as the sync view's.
+
+Opt-in with settings.ASYNC_READ_VIEWS, under ASGI only. On Django 4.2 each async ORM
+and cache call still runs its sync counterpart in the request's thread, and with the
+middleware chain on the event loop each of Django's middleware moves to that thread
+and back as well, so `manage.py bench_async_reads` measures these views slower than
+the sync ones. They pay off once those calls stop needing a thread.
+"""
+from asgiref.sync import sync_to_async
+from django.core.exceptions import SynchronousOnlyOperation
+from django.http import HttpResponse
+from django.urls import URLPattern
+from rest_framework import exceptions
+
+ASYNC_METHODS = ('get', 'head')
+
+
+async def call_or_defer(func, *args, **kwargs):
+    """
+    Call `func` on the event loop, or again in a thread if it turns out to query the
+    database. For code that is almost always pure, like building a filtered queryset,
+    which queries only to validate some parameters (?category= is a ModelChoiceFilter).
+    `func` must be safe to call twice.
+    """
+    try:
+        return func(*args, **kwargs)
+    except SynchronousOnlyOperation:
+        return await sync_to_async(func)(*args, **kwargs)
+
+
+async def authenticate(request):
+    """Request._authenticate(), awaiting authenticators' aauthenticate() where they have one"""
+    for authenticator in request.authenticators:
+        try:
+            if hasattr(authenticator, 'aauthenticate'):
+                user_auth_tuple = await authenticator.aauthenticate(request)
+            else:
+                user_auth_tuple = await sync_to_async(authenticator.authenticate)(request)
+        except exceptions.APIException:
+            request._not_authenticated()
+            raise
+        if user_auth_tuple is not None:
+            request._authenticator = authenticator
+            request.user, request.auth = user_auth_tuple
+            return
+    request._not_authenticated()
+
+
+async def initial(view, request, *args, **kwargs):
+    """APIView.initial()"""
+    view.format_kwarg = view.get_format_suffix(**kwargs)
+    request.accepted_renderer, request.accepted_media_type = view.perform_content_negotiation(request)
+    request.version, request.versioning_scheme = view.determine_version(request, *args, **kwargs)
+    await authenticate(request)
+    await call_or_defer(view.check_permissions, request)
+    await call_or_defer(view.check_throttles, request)
+
+
+def rendered(response):
+    """
+    A plain HttpResponse with the rendered body and headers of a DRF Response, so
+    Django doesn't move to a thread to render it
+    """
+    if not hasattr(response, 'render'):
+        return response
+    response.render()
+    plain = HttpResponse(response.content, status=response.status_code)
+    for header, value in response.items():
+        plain[header] = value
+    return plain
+
+
+def async_read_view(sync_view):
+    """Async view for the viewset, actions and initkwargs of a ViewSet.as_view() view"""
+    viewset, initkwargs = sync_view.cls, sync_view.initkwargs
+    actions = dict(sync_view.actions)
+    if 'get' in actions and 'head' not in actions:
+        actions['head'] = actions['get']
+    in_thread = sync_to_async(sync_view)
+
+    async def view(request, *args, **kwargs):
+        method = request.method.lower()
+        handler_name = f'a{actions[method]}' if method in ASYNC_METHODS and method in actions else None
+        if handler_name is None or not hasattr(viewset, handler_name):
+            return await in_thread(request, *args, **kwargs)
+
+        # As ViewSetMixin.as_view() and APIView.dispatch()
+        self = viewset(**initkwargs)
+        self.action_map = actions
+        for action_method, action in actions.items():
+            setattr(self, action_method, getattr(self, action))
+        self.args = args
+        self.kwargs = kwargs
+        django_request = request
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+        try:
+            await initial(self, request, *args, **kwargs)
+            if request.accepted_renderer.format == 'api':
+                # The browsable API renders forms whose fields query the database
+                return await in_thread(django_request, *args, **kwargs)
+            response = await getattr(self, handler_name)(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return rendered(self.response)
+
+    view.__name__ = view.__qualname__ = f'{viewset.__name__}_async'
+    view.__doc__ = viewset.__doc__
+    view.cls = viewset
+    view.initkwargs = initkwargs
+    view.actions = sync_view.actions
+    # As APIView.as_view(); csrf_exempt() itself only wraps sync views in Django 4.2
+    view.csrf_exempt = True
+    return view
+
+
+def async_read_routes(urlpatterns, names):
+    """
+    Router `urlpatterns` with the patterns named in `names` (e.g. 'listing-list')
+    served by async_read_view(), in the same order so no route shadows another
+    """
+    return [
+        URLPattern(pattern.pattern, async_read_view(pattern.callback), pattern.default_args, pattern.name)
+        if isinstance(pattern, URLPattern) and pattern.name in names else pattern
+        for pattern in urlpatterns
+    ]
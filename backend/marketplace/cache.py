@@ -0,0 +1,225 @@
+"""
+Shared-cache helpers: version counters and a stampede-protected response cache.
+
+A version counter is a single integer in the shared cache. Anything derived from a
+set of tables embeds the current version in its cache key, so bumping the counter
+on a write invalidates every derived entry at once without having to find them.
+
+Cached values are computed with the database reads on the primary: they're served to
+every client, and a replica that hasn't replayed the write behind a version bump yet
+would have them cached under the new version.
+
+The a-prefixed functions are the same for async views (marketplace/async_api.py).
+"""
+import asyncio
+import hashlib
+import time
+
+from django.core.cache import cache
+from rest_framework.response import Response
+
+from .db_router import primary_reads
+
+RESPONSE_CACHE_TIMEOUT = 300
+# How long a recomputing request may hold a key's lock, and how long others wait for it
+LOCK_TIMEOUT = 10
+LOCK_WAIT = 5
+LOCK_POLL_INTERVAL = 0.05
+
+
+def _version_key(name):
+    return f'version:{name}'
+
+
+def get_version(name):
+    version = cache.get(_version_key(name))
+    if version is None:
+        # Start from the clock rather than 1 so an evicted counter never
+        # comes back at a value that older entries were cached under
+        cache.add(_version_key(name), int(time.time() * 1000), timeout=None)
+        version = cache.get(_version_key(name))
+    return version
+
+
+async def aget_version(name):
+    version = await cache.aget(_version_key(name))
+    if version is None:
+        await cache.aadd(_version_key(name), int(time.time() * 1000), timeout=None)
+        version = await cache.aget(_version_key(name))
+    return version
+
+
+def bump_version(name):
+    try:
+        return cache.incr(_version_key(name))
+    except ValueError:
+        version = int(time.time() * 1000)
+        cache.set(_version_key(name), version, timeout=None)
+        return version
+
+
+def normalize_query_params(query_params):
+    """Order-insensitive form of the query string, ignoring empty values"""
+    items = []
+    for key in sorted(query_params.keys()):
+        values = sorted(value for value in query_params.getlist(key) if value != '')
+        if values:
+            items.append(f'{key}={",".join(values)}')
+    return '&'.join(items)
+
+
+def response_cache_key(namespace, request, *parts):
+    return _response_cache_key(get_version(namespace), namespace, request, parts)
+
+
+async def aresponse_cache_key(namespace, request, *parts):
+    return _response_cache_key(await aget_version(namespace), namespace, request, parts)
+
+
+def _response_cache_key(version, namespace, request, parts):
+    raw = '|'.join([
+        str(version),
+        request.get_host(),
+        request.path,
+        normalize_query_params(request.query_params),
+        *map(str, parts),
+    ])
+    return f'response:{namespace}:{hashlib.sha256(raw.encode()).hexdigest()}'
+
+
+def _count(namespace, outcome):
+    key = f'response-cache:{namespace}:{outcome}'
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+async def _acount(namespace, outcome):
+    key = f'response-cache:{namespace}:{outcome}'
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        if not await cache.aadd(key, 1, timeout=None):
+            await cache.aincr(key)
+
+
+def cache_stats(namespace):
+    hits = cache.get(f'response-cache:{namespace}:hits', 0)
+    misses = cache.get(f'response-cache:{namespace}:misses', 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(hits / total, 4) if total else None,
+        'version': get_version(namespace),
+    }
+
+
+def _wait_for(key):
+    """Poll for a value another request is computing; None if it doesn't arrive in time"""
+    deadline = time.monotonic() + LOCK_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(LOCK_POLL_INTERVAL)
+        data = cache.get(key)
+        if data is not None:
+            return data
+    return None
+
+
+async def _await_for(key):
+    """_wait_for() without blocking the event loop"""
+    deadline = time.monotonic() + LOCK_WAIT
+    while time.monotonic() < deadline:
+        await asyncio.sleep(LOCK_POLL_INTERVAL)
+        data = await cache.aget(key)
+        if data is not None:
+            return data
+    return None
+
+
+def cached_response(namespace, key, compute, timeout=RESPONSE_CACHE_TIMEOUT):
+    """
+    Return a Response with cached data for `key`, or build it with `compute()`.
+
+    On a miss only one caller recomputes (it holds `<key>:lock`); concurrent callers
+    wait for its result for up to LOCK_WAIT seconds instead of all hitting the
+    database. Only 200 responses are cached.
+    """
+    data = cache.get(key)
+    if data is not None:
+        _count(namespace, 'hits')
+        return Response(data)
+
+    lock_key = f'{key}:lock'
+    if not cache.add(lock_key, 1, timeout=LOCK_TIMEOUT):
+        data = _wait_for(key)
+        if data is not None:
+            _count(namespace, 'hits')
+            return Response(data)
+        lock_key = None  # the other request is taking too long, compute without the lock
+
+    _count(namespace, 'misses')
+    try:
+        with primary_reads():
+            response = compute()
+        if response.status_code == 200:
+            cache.set(key, response.data, timeout)
+        return response
+    finally:
+        if lock_key:
+            cache.delete(lock_key)
+
+
+async def acached_response(namespace, key, compute, timeout=RESPONSE_CACHE_TIMEOUT):
+    """cached_response() for async views: `compute()` is a coroutine function"""
+    data = await cache.aget(key)
+    if data is not None:
+        await _acount(namespace, 'hits')
+        return Response(data)
+
+    lock_key = f'{key}:lock'
+    if not await cache.aadd(lock_key, 1, timeout=LOCK_TIMEOUT):
+        data = await _await_for(key)
+        if data is not None:
+            await _acount(namespace, 'hits')
+            return Response(data)
+        lock_key = None
+
+    await _acount(namespace, 'misses')
+    try:
+        with primary_reads():
+            response = await compute()
+        if response.status_code == 200:
+            await cache.aset(key, response.data, timeout)
+        return response
+    finally:
+        if lock_key:
+            await cache.adelete(lock_key)
+
+
+def cached_value(namespace, key, compute, timeout=RESPONSE_CACHE_TIMEOUT):
+    """cached_response() for plain data: `compute()` returns any picklable value but None"""
+    data = cache.get(key)
+    if data is not None:
+        _count(namespace, 'hits')
+        return data
+
+    lock_key = f'{key}:lock'
+    if not cache.add(lock_key, 1, timeout=LOCK_TIMEOUT):
+        data = _wait_for(key)
+        if data is not None:
+            _count(namespace, 'hits')
+            return data
+        lock_key = None
+
+    _count(namespace, 'misses')
+    try:
+        with primary_reads():
+            data = compute()
+        cache.set(key, data, timeout)
+        return data
+    finally:
+        if lock_key:
+            cache.delete(lock_key)
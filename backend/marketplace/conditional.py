@@ -0,0 +1,56 @@
+"""
+Conditional GET helpers for DRF views.
+
+Views compute an ETag / Last-Modified pair from cheap metadata (an `updated_at`
+column, a version counter) before doing any serialization, and return
+304 Not Modified straight away when the client's copy is current. Pass
+`last_modified` only when that date moves with everything in the ETag: a client
+may send just If-Modified-Since, and would get a 304 for a changed body.
+"""
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from .cache import normalize_query_params
+
+
+def make_etag(request, *parts):
+    """
+    Build a quoted ETag from `parts` plus the request's query parameters and
+    negotiated media type, which change the representation (?view=full, ?size=card,
+    JSON or MessagePack, ...).
+    """
+    raw = '|'.join([
+        *map(str, parts),
+        normalize_query_params(request.query_params),
+        getattr(request, 'accepted_media_type', None) or '',
+    ])
+    return quote_etag(hashlib.md5(raw.encode()).hexdigest())
+
+
+def not_modified_response(request, etag=None, last_modified=None):
+    """
+    Return a 304 response if the request's If-None-Match / If-Modified-Since match
+    the given validators, else None. `last_modified` is a datetime.
+    """
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    response = get_conditional_response(request._request, etag=etag, last_modified=timestamp)
+    if response is not None:
+        _set_validators(response, etag, timestamp)
+    return response
+
+
+def set_validators(response, etag=None, last_modified=None):
+    _set_validators(response, etag, int(last_modified.timestamp()) if last_modified else None)
+    return response
+
+
+def _set_validators(response, etag, timestamp):
+    if etag:
+        response['ETag'] = etag
+    if timestamp is not None:
+        response['Last-Modified'] = http_date(timestamp)
+    # Clients may keep the copy but must revalidate it; bodies differ per user and format
+    response['Cache-Control'] = 'private, no-cache'
+    patch_vary_headers(response, ['Authorization', 'Accept'])
@@ -0,0 +1,161 @@
+"""
+Pooled PostgreSQL connections (psycopg 3 + psycopg_pool).
+
+ENGINE 'marketplace.db_pool' is Django's PostgreSQL backend with connections
+borrowed from a bounded psycopg_pool.ConnectionPool instead of opened per thread.
+Each process has one pool per database alias, created on first use, so forked
+gunicorn and celery workers never share sockets. Django "closes" a connection at the
+end of every request, and channels' database_sync_to_async after every call, which
+here just returns it to the pool: the number of server connections a process holds
+is at most the pool's max_size however many threads or websocket consumers it
+runs. A thread that finds the pool exhausted waits up to `timeout` seconds and then
+fails with OperationalError.
+
+Pool options come from OPTIONS['pool'] (settings.DATABASE_POOL_*): min_size,
+max_size, timeout, max_idle, max_lifetime. Connections are checked before they are
+handed out, so ones dropped by the server or a proxy are replaced rather than
+failing a request.
+
+`pool_stats()` reports this process's pools (also to staff at /health/db-pool/) and
+`manage.py check_db_pool` exercises a pool through the WSGI and ASGI handlers.
+"""
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# (alias, pid) -> ConnectionPool
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class PoolUsage:
+    """How long this process waited for pooled connections, and held them"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.checkouts = 0
+        self.wait_ms_total = 0.0
+        self.wait_ms_max = 0.0
+        self.slow_checkouts = 0
+        self.returns = 0
+        self.used_ms_total = 0.0
+
+    def record_checkout(self, alias, wait_ms):
+        slow = wait_ms >= settings.DATABASE_POOL_SLOW_CHECKOUT_MS
+        with self.lock:
+            self.checkouts += 1
+            self.wait_ms_total += wait_ms
+            self.wait_ms_max = max(self.wait_ms_max, wait_ms)
+            self.slow_checkouts += slow
+        if slow:
+            logger.warning('Waited %.0fms for a %s database connection', wait_ms, alias)
+
+    def record_return(self, used_ms):
+        with self.lock:
+            self.returns += 1
+            self.used_ms_total += used_ms
+
+
+def get_pool(alias, connect_kwargs, options, configure=None):
+    """This process's pool for `alias`, created (but not opened) on first use"""
+    key = (alias, os.getpid())
+    pool = _pools.get(key)
+    if pool is not None:
+        return pool
+
+    from psycopg_pool import ConnectionPool
+
+    with _pools_lock:
+        # A forked child inherits its parent's pools, whose threads and sockets it can't use
+        for stale in [stale for stale in _pools if stale[1] != key[1]]:
+            del _pools[stale]
+        if key not in _pools:
+            pool = ConnectionPool(
+                kwargs={**connect_kwargs, 'autocommit': True},
+                name=alias,
+                open=False,
+                configure=configure,
+                **options,
+            )
+            pool.usage = PoolUsage()
+            _pools[key] = pool
+    return _pools[key]
+
+
+def checkout(pool):
+    """Borrow a working connection from `pool`"""
+    pool.open()
+    start = time.perf_counter()
+    # Checked here rather than with the pool's `check`, which backs off for a second
+    # or more after each dead connection: after a database restart every pooled
+    # connection is dead, and the first request would time out going through them
+    for attempt in range(pool.max_size + 1):
+        connection = pool.getconn()
+        try:
+            pool.check_connection(connection)
+        except Exception:
+            # Discarded and replaced in the background
+            pool.putconn(connection)
+            if attempt == pool.max_size:
+                raise
+        else:
+            break
+    now = time.perf_counter()
+    pool.usage.record_checkout(pool.name, (now - start) * 1000)
+    connection.checked_out_at = now
+    return connection
+
+
+def checkin(connection):
+    """Give a connection from checkout() back to its pool"""
+    pool = connection._pool
+    pool.usage.record_return((time.perf_counter() - connection.checked_out_at) * 1000)
+    pool.putconn(connection)
+
+
+def close_pool(alias):
+    pool = _pools.pop((alias, os.getpid()), None)
+    if pool is not None:
+        pool.close()
+
+
+def pool_stats():
+    """`{alias: {...}}` for this process's pools: size, usage and checkout wait times"""
+    stats = {}
+    pid = os.getpid()
+    for (alias, owner), pool in list(_pools.items()):
+        if owner != pid:
+            continue
+        counters = pool.get_stats()
+        usage = pool.usage
+        with usage.lock:
+            count, wait_total, wait_max, slow = usage.checkouts, usage.wait_ms_total, usage.wait_ms_max, usage.slow_checkouts
+            returns, used_total = usage.returns, usage.used_ms_total
+        size = counters.get('pool_size', 0)
+        available = counters.get('pool_available', 0)
+        stats[alias] = {
+            'pid': pid,
+            'min_size': pool.min_size,
+            'max_size': pool.max_size,
+            'size': size,
+            'available': available,
+            'in_use': size - available,
+            'waiting': counters.get('requests_waiting', 0),
+            'checkouts': count,
+            'wait_ms_avg': round(wait_total / count, 2) if count else 0,
+            'wait_ms_max': round(wait_max, 2),
+            'slow_checkouts': slow,
+            'timeouts': counters.get('requests_errors', 0),
+            # How long a request or task held its connection
+            'usage_ms_avg': round(used_total / returns, 2) if returns else 0,
+            'connections_opened': counters.get('connections_num', 0),
+            'connections_failed': counters.get('connections_errors', 0),
+            # Found broken on checkout, or returned broken
+            'connections_lost': counters.get('returns_bad', 0),
+        }
+    return stats
@@ -0,0 +1,74 @@
+"""Django's PostgreSQL backend with connections from a per-process pool (see __init__)"""
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.base.base import NO_DB_ALIAS
+from django.db.backends.postgresql import base, creation
+from django.utils.asyncio import async_unsafe
+
+from . import checkin, checkout, close_pool, get_pool
+
+if not base.is_psycopg3:
+    raise ImproperlyConfigured('marketplace.db_pool needs psycopg 3: pip install "psycopg[binary]" psycopg-pool')
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+    # Pooled connections stay open after Django closes them, which would keep the
+    # test database from being dropped, or the pool on the database it replaced
+
+    def _create_test_db(self, verbosity, autoclobber, keepdb=False):
+        close_pool(self.connection.alias)
+        return super()._create_test_db(verbosity, autoclobber, keepdb)
+
+    def _destroy_test_db(self, test_database_name, verbosity):
+        close_pool(self.connection.alias)
+        return super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    creation_class = DatabaseCreation
+
+    @property
+    def pool(self):
+        options = self.settings_dict['OPTIONS'].get('pool')
+        # The "no database" connection Django uses to create databases isn't pooled
+        if not options or self.alias == NO_DB_ALIAS:
+            return None
+        if self.settings_dict['CONN_MAX_AGE'] != 0:
+            raise ImproperlyConfigured(f'Database {self.alias!r} is pooled: set CONN_MAX_AGE to 0')
+        return get_pool(
+            self.alias,
+            self.get_connection_params(),
+            {} if options is True else options,
+            configure=self.configure_connection,
+        )
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop('pool', None)
+        return params
+
+    def configure_connection(self, connection):
+        """Runs once per new pooled connection"""
+        isolation_level = self.settings_dict['OPTIONS'].get('isolation_level')
+        if isolation_level is not None:
+            connection.isolation_level = base.IsolationLevel(isolation_level)
+
+    @async_unsafe
+    def get_new_connection(self, conn_params):
+        pool = self.pool
+        if pool is None:
+            return super().get_new_connection(conn_params)
+        isolation_level = self.settings_dict['OPTIONS'].get('isolation_level')
+        self.isolation_level = (
+            base.IsolationLevel.READ_COMMITTED if isolation_level is None else base.IsolationLevel(isolation_level)
+        )
+        return checkout(pool)
+
+    def _close(self):
+        pool = getattr(self.connection, '_pool', None)
+        if pool is None:
+            return super()._close()
+        with self.wrap_database_errors:
+            # The pool rolls back anything left open and discards broken connections
+            checkin(self.connection)
+        # Even inside an atomic block: the connection may already be someone else's
+        self.connection = None
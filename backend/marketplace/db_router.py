@@ -0,0 +1,251 @@
+"""
+Read-replica routing.
+
+Replicas are configured with DATABASE_REPLICA_URLS and appear in DATABASES as
+`replica_0`, `replica_1`, .... ReplicaRoutingMiddleware lets a request read from them
+when it uses a safe method (GET, HEAD, OPTIONS), which covers every read-only
+viewset action, and the client hasn't written anything in the last
+DATABASE_REPLICA_STICKY_SECONDS. Everything else reads from the primary:
+unsafe requests, anything outside a request (Celery tasks, management commands), and
+the rest of a request once it has written or while it is inside a transaction.
+
+Reads inside `primary_reads()` go to the primary whatever the request: that's for
+results shared with other clients (response and facet cache fills, the category
+registry), which a lagging replica would fill with rows from before a write, cached
+under the version that write bumped.
+
+ReplicaRouter picks a replica per request, round-robin. Before handing out a replica it checks it
+at most every DATABASE_REPLICA_HEALTH_INTERVAL seconds (a ping, plus replication lag
+on PostgreSQL); a replica that fails or lags more than
+DATABASE_REPLICA_MAX_LAG_SECONDS is ejected for DATABASE_REPLICA_EJECT_SECONDS and
+its reads go to the next one, or to the primary when none is healthy.
+
+`manage.py check_replica_routing` shows where requests' queries go.
+"""
+import contextlib
+import contextvars
+import hashlib
+import itertools
+import logging
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+from .proxies import client_address
+
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+STICKY_KEY_PREFIX = 'db-sticky'
+
+
+class RoutingState:
+    """What the current request may read from"""
+
+    def __init__(self, use_replicas):
+        self.use_replicas = use_replicas
+        self.wrote = False
+        # Chosen on the first read, so all of a request's reads see one snapshot
+        self.replica = None
+
+
+_state = contextvars.ContextVar('db_routing_state', default=None)
+_primary_reads = contextvars.ContextVar('db_primary_reads', default=False)
+
+
+@contextlib.contextmanager
+def primary_reads():
+    """Send the block's reads to the primary, also across awaits in async code"""
+    token = _primary_reads.set(True)
+    try:
+        yield
+    finally:
+        _primary_reads.reset(token)
+
+
+def replica_aliases():
+    return getattr(settings, 'DATABASE_REPLICAS', ())
+
+
+class ReplicaPool:
+    """Round-robin over the configured replicas, skipping ejected ones"""
+
+    def __init__(self, aliases):
+        self.aliases = list(aliases)
+        self.cycle = itertools.cycle(self.aliases)
+        self.lock = threading.Lock()
+        self.ejected_until = {}
+        self.checked_at = {}
+
+    def next_healthy(self):
+        for _ in range(len(self.aliases)):
+            with self.lock:
+                alias = next(self.cycle)
+            if self.is_healthy(alias):
+                return alias
+        return None
+
+    def is_healthy(self, alias):
+        now = time.monotonic()
+        if self.ejected_until.get(alias, 0) > now:
+            return False
+        if now - self.checked_at.get(alias, float('-inf')) < settings.DATABASE_REPLICA_HEALTH_INTERVAL:
+            return True
+        self.checked_at[alias] = now
+        try:
+            lag = replication_lag(alias)
+        except DatabaseError as e:
+            self.eject(alias, f'unreachable: {e}')
+            return False
+        if lag is not None and lag > settings.DATABASE_REPLICA_MAX_LAG_SECONDS:
+            self.eject(alias, f'{lag:.1f}s behind the primary')
+            return False
+        return True
+
+    def eject(self, alias, reason):
+        logger.warning('Ejecting database replica %s for %ss: %s', alias, settings.DATABASE_REPLICA_EJECT_SECONDS, reason)
+        self.ejected_until[alias] = time.monotonic() + settings.DATABASE_REPLICA_EJECT_SECONDS
+        # Drop the broken connection so the next check reconnects
+        try:
+            connections[alias].close()
+        except DatabaseError:
+            pass
+
+
+def replication_lag(alias):
+    """Seconds since the last replayed transaction on a PostgreSQL standby; pings other backends"""
+    connection = connections[alias]
+    with connection.cursor() as cursor:
+        if connection.vendor != 'postgresql':
+            cursor.execute('SELECT 1')
+            return None
+        cursor.execute(
+            'SELECT CASE WHEN pg_is_in_recovery() '
+            'THEN EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END'
+        )
+        lag = cursor.fetchone()[0]
+    return None if lag is None else float(lag)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_replica_pool():
+    global _pool
+    aliases = tuple(replica_aliases())
+    if _pool is None or tuple(_pool.aliases) != aliases:
+        with _pool_lock:
+            if _pool is None or tuple(_pool.aliases) != aliases:
+                _pool = ReplicaPool(aliases)
+    return _pool
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or not state.use_replicas or state.wrote or not replica_aliases():
+            return DEFAULT_DB_ALIAS
+        if _primary_reads.get():
+            return DEFAULT_DB_ALIAS
+        # Reads inside a transaction must see its writes
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        if state.replica is None:
+            state.replica = get_replica_pool().next_healthy() or DEFAULT_DB_ALIAS
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get the schema through replication
+        return db not in replica_aliases()
+
+
+def sticky_key(request):
+    """Identifies a client across requests: its credentials, session or address"""
+    identity = (
+        request.META.get('HTTP_AUTHORIZATION')
+        or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+        or client_address(request)
+    )
+    return f'{STICKY_KEY_PREFIX}:{hashlib.sha256(identity.encode()).hexdigest()[:32]}'
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Lets safe requests read from replicas, and pins a client to the primary for
+    DATABASE_REPLICA_STICKY_SECONDS after it writes (read-your-writes).
+
+    Sync only, which under ASGI keeps Django's whole middleware chain in one thread
+    per request: async-capable, each of Django's own middleware would move to a
+    thread and back on its own.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not replica_aliases():
+            return self.get_response(request)
+
+        key = sticky_key(request)
+        use_replicas = request.method in SAFE_METHODS and not cache.get(key)
+        state = RoutingState(use_replicas)
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        if state.wrote or request.method not in SAFE_METHODS:
+            cache.set(key, 1, timeout=settings.DATABASE_REPLICA_STICKY_SECONDS)
+        return response
+
+
+class AsyncReplicaRoutingMiddleware(ReplicaRoutingMiddleware):
+    """
+    ReplicaRoutingMiddleware that also runs on the event loop, so requests reach
+    async views (settings.ASYNC_READ_VIEWS) without leaving it
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if not replica_aliases():
+            return await self.get_response(request)
+
+        key = sticky_key(request)
+        use_replicas = request.method in SAFE_METHODS and not await cache.aget(key)
+        state = RoutingState(use_replicas)
+        token = _state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _state.reset(token)
+        if state.wrote or request.method not in SAFE_METHODS:
+            await cache.aset(key, 1, timeout=settings.DATABASE_REPLICA_STICKY_SECONDS)
+        return response
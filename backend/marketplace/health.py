@@ -4,6 +4,11 @@ Simple health check endpoint that doesn't require database
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+
+from marketplace.db_pool import pool_stats
 
 @csrf_exempt
 @require_http_methods(["GET", "HEAD"])
@@ -11,3 +16,9 @@ def health_check(request):
     """Simple health check that returns 200 OK - no database required"""
     return JsonResponse({"status": "ok", "service": "marketplace-api"})
 
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def db_pool_stats(request):
+    """Connection pool usage of the worker process that served this request (staff only)"""
+    return Response({"pools": pool_stats()})
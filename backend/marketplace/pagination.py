@@ -0,0 +1,202 @@
+"""
+Keyset (cursor) pagination for the feeds the mobile app scrolls through.
+
+Pages are fetched with ``WHERE (created_at, id) < (last_created_at, last_id)``-style
+predicates on the active ordering instead of OFFSET, so every page costs the same
+index range scan, and no ``COUNT(*)`` is run unless a client asks for a total.
+"""
+import base64
+import binascii
+import datetime
+import decimal
+import json
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+# Below this many estimated rows the planner estimate is too rough to be useful
+# and an exact COUNT(*) is cheap anyway
+EXACT_COUNT_THRESHOLD = 1000
+
+
+def approximate_count(queryset):
+    """
+    Estimate the number of rows in `queryset` from PostgreSQL planner statistics
+    instead of running COUNT(*). Falls back to an exact count on other databases
+    and for small results.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    estimate = int(plan[0]['Plan']['Plan Rows'])
+    if estimate < EXACT_COUNT_THRESHOLD:
+        return queryset.count()
+    return estimate
+
+
+def _encode_value(value):
+    # Keep full microsecond precision, DjangoJSONEncoder truncates to milliseconds
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    return value
+
+
+class KeysetPagination(BasePagination):
+    """
+    Forward-only cursor pagination keyed on the queryset's ordering plus a unique
+    `id` tiebreaker, e.g. `(-created_at, -id)` or `(price, id)` for `?ordering=price`.
+
+    Pass `?with_count=true` to get an (approximate) total. Requests that still send
+    `?page=N` are served by PageNumberPagination for older app builds.
+    """
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    count_query_param = 'with_count'
+    ordering = ('-created_at', '-id')
+    legacy_pagination_class = PageNumberPagination
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.use_legacy_paginator(request):
+            return self.legacy_paginator.paginate_queryset(queryset, request, view)
+        queryset = self.order_queryset(queryset, request)
+        self.count = approximate_count(queryset) if self.wants_count(request) else None
+        return self.set_page(list(self.page_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """paginate_queryset() for async views: the page is fetched through the async ORM"""
+        if self.use_legacy_paginator(request):
+            return await sync_to_async(self.legacy_paginator.paginate_queryset)(queryset, request, view)
+        queryset = self.order_queryset(queryset, request)
+        self.count = await sync_to_async(approximate_count)(queryset) if self.wants_count(request) else None
+        return self.set_page([row async for row in self.page_queryset(queryset, request).aiterator()])
+
+    def use_legacy_paginator(self, request):
+        self.legacy_paginator = None
+        if request.query_params.get(self.legacy_pagination_class.page_query_param):
+            self.legacy_paginator = self.legacy_pagination_class()
+        return self.legacy_paginator is not None
+
+    def order_queryset(self, queryset, request):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.key_fields = self.get_key_fields(queryset)
+        return queryset.order_by(*self.key_fields)
+
+    def page_queryset(self, queryset, request):
+        """The rows of the requested page plus one, which tells whether there is a next page"""
+        position = self.decode_cursor(request)
+        if position is not None:
+            queryset = queryset.filter(self.get_position_filter(position))
+        return queryset[:self.page_size + 1]
+
+    def set_page(self, rows):
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        return self.page
+
+    def get_paginated_response(self, data):
+        if self.legacy_paginator is not None:
+            return self.legacy_paginator.get_paginated_response(data)
+        response = OrderedDict([('next', self.get_next_link())])
+        if self.count is not None:
+            response['count'] = self.count
+        response['results'] = data
+        return Response(response)
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def wants_count(self, request):
+        return request.query_params.get(self.count_query_param, '').lower() in ('1', 'true', 'yes')
+
+    def get_key_fields(self, queryset):
+        """
+        The ordering the page is keyed on: the queryset's explicit ordering (as set by
+        OrderingFilter), else the model default, else `self.ordering`, always ending
+        in a unique `id` column so rows with equal sort values never get skipped.
+        """
+        fields = list(queryset.query.order_by) or list(queryset.model._meta.ordering) or list(self.ordering)
+        for field in fields:
+            if not isinstance(field, str):
+                raise TypeError('KeysetPagination only supports orderings by field name')
+        if not any(field.lstrip('-') in ('id', 'pk') for field in fields):
+            fields.append('-id' if fields[-1].startswith('-') else 'id')
+        return fields
+
+    def get_position_filter(self, position):
+        """
+        Lexicographic "after this row" predicate over the key fields:
+        (a < x) OR (a = x AND b < y) OR ..., with > for ascending fields.
+        """
+        predicate = Q()
+        equal_prefix = Q()
+        for field, value in zip(self.key_fields, position):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            predicate |= equal_prefix & Q(**{f'{name}__{lookup}': value})
+            equal_prefix &= Q(**{name: value})
+        return predicate
+
+    def get_row_value(self, row, field):
+        value = row
+        for part in field.lstrip('-').split('__'):
+            value = value[part] if isinstance(value, dict) else getattr(value, part)
+        return value
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+        except (TypeError, ValueError, UnicodeError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+        # A cursor taken under a different ordering can't be applied to this one
+        if not isinstance(payload, dict) or payload.get('k') != self.key_fields:
+            raise NotFound(self.invalid_cursor_message)
+        position = payload.get('v')
+        if not isinstance(position, list) or len(position) != len(self.key_fields):
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def encode_cursor(self, row):
+        payload = {
+            'k': self.key_fields,
+            'v': [_encode_value(self.get_row_value(row, field)) for field in self.key_fields],
+        }
+        encoded = base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode('utf-8'))
+        return replace_query_param(
+            remove_query_param(self.base_url, self.count_query_param),
+            self.cursor_query_param,
+            encoded.decode('ascii'),
+        )
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(self.page[-1])
@@ -0,0 +1,49 @@
+"""
+Request parsers for the API.
+
+FastJSONParser parses request bodies with orjson when it is installed, which matters
+most for listing create/update requests carrying base64 images of several MB. It
+accepts and rejects the same documents as DRF's JSONParser (NaN/Infinity are errors,
+as JSONParser does in strict mode); anything orjson refuses is re-parsed with the
+stdlib so errors and edge cases (integers beyond 64 bits) behave exactly as before.
+
+MessagePackParser accepts `Content-Type: application/msgpack` bodies from the mobile
+app; prices may be sent as numbers, which DecimalField accepts.
+"""
+import io
+
+import msgpack
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+class FastJSONParser(JSONParser):
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None:
+            return super().parse(stream, media_type, parser_context)
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        body = stream.read()
+        try:
+            if encoding.lower().replace('_', '-') in ('utf-8', 'utf8'):
+                return orjson.loads(body)
+            return orjson.loads(body.decode(encoding))
+        except (orjson.JSONDecodeError, UnicodeDecodeError, LookupError):
+            return super().parse(io.BytesIO(body), media_type, parser_context)
+
+
+class MessagePackParser(BaseParser):
+    media_type = 'application/msgpack'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except (msgpack.UnpackException, ValueError) as exc:
+            raise ParseError(f'MessagePack parse error - {exc}')
@@ -0,0 +1,21 @@
+"""
+Client addresses behind reverse proxies.
+
+Each proxy in front of the app appends the address it received the request from to
+X-Forwarded-For. Only the TRUSTED_PROXY_COUNT entries on the right were written by
+our own proxies; anything left of them is whatever the client sent.
+"""
+from django.conf import settings
+
+
+def client_address(request):
+    """
+    The address the outermost of TRUSTED_PROXY_COUNT proxies saw, or REMOTE_ADDR
+    without proxies (or when the header is shorter than the chain)
+    """
+    proxies = settings.TRUSTED_PROXY_COUNT
+    if proxies > 0:
+        forwarded = [entry.strip() for entry in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',')]
+        if len(forwarded) >= proxies and forwarded[-proxies]:
+            return forwarded[-proxies]
+    return request.META.get('REMOTE_ADDR', '')
@@ -0,0 +1,120 @@
+"""
+Response renderers for the API.
+
+FastJSONRenderer renders with orjson when it is installed and produces the same bytes
+as DRF's JSONRenderer: compact separators, raw UTF-8, U+2028/U+2029 escaped. Aware
+datetimes ("Z" for UTC), dates and UUIDs are encoded by orjson itself in the same
+format DRF's encoder uses; Decimals and other non-JSON types go through DRF's encoder
+(a bare Decimal becomes a number, as before). The only difference is cosmetic: floats
+in exponent notation come out as 1e20 rather than 1e+20. Anything orjson can't handle
+(indented output for the browsable API, integers beyond 64 bits) goes through the
+stdlib path, as does everything when orjson is missing. It is the default renderer
+for the whole API; see REST_FRAMEWORK in settings.
+
+MessagePackRenderer serves `Accept: application/msgpack` (or `?format=msgpack`) for
+the mobile app on slow links. Besides dropping JSON's punctuation it sends timestamps
+as integer epoch milliseconds; see `compact_for_msgpack`. Prices stay decimal strings,
+as in JSON: a float would be binary for a money field.
+"""
+import datetime
+import decimal
+import uuid
+
+import msgpack
+from django.utils.encoding import force_str
+from django.utils.functional import Promise
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+if orjson is not None:
+    # "Z" for UTC, as DRF's encoder writes it
+    ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+else:
+    ORJSON_OPTIONS = 0
+
+
+class FastJSONRenderer(JSONRenderer):
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.ensure_ascii or not self.compact or self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            rendered = orjson.dumps(data, default=self.encoder_class().default, option=ORJSON_OPTIONS)
+        except (orjson.JSONEncodeError, TypeError):
+            return super().render(data, accepted_media_type, renderer_context)
+        # orjson leaves these raw; JSONRenderer escapes them for JavaScript embedding
+        return rendered.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+MSGPACK_MEDIA_TYPE = 'application/msgpack'
+
+# Serializer output keys holding ISO 8601 timestamps
+MSGPACK_TIMESTAMP_SUFFIX = '_at'
+
+
+def _epoch_ms(value):
+    if value.tzinfo is None:
+        return value
+    return int(value.timestamp() * 1000)
+
+
+def compact_for_msgpack(data):
+    """
+    Copy of serializer output with ISO timestamps (`*_at` keys) as epoch
+    milliseconds. Other values are left alone.
+    """
+    if isinstance(data, dict):
+        compacted = {}
+        for key, value in data.items():
+            if isinstance(value, str):
+                if isinstance(key, str) and key.endswith(MSGPACK_TIMESTAMP_SUFFIX):
+                    try:
+                        value = _epoch_ms(datetime.datetime.fromisoformat(value))
+                    except ValueError:
+                        pass
+            elif isinstance(value, (dict, list, tuple)):
+                value = compact_for_msgpack(value)
+            compacted[key] = value
+        return compacted
+    if isinstance(data, (list, tuple)):
+        return [compact_for_msgpack(item) for item in data]
+    return data
+
+
+def _msgpack_default(obj):
+    if isinstance(obj, decimal.Decimal):
+        return str(obj)
+    if isinstance(obj, datetime.datetime):
+        return _epoch_ms(obj) if obj.tzinfo is not None else obj.isoformat()
+    if isinstance(obj, (datetime.date, datetime.time)):
+        return obj.isoformat()
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    if isinstance(obj, Promise):
+        return force_str(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f'Object of type {type(obj).__name__} is not MessagePack serializable')
+
+
+def msgpack_dumps(data):
+    """Compact MessagePack encoding of API data, shared with the chat websocket"""
+    return msgpack.packb(compact_for_msgpack(data), default=_msgpack_default, use_bin_type=True)
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = MSGPACK_MEDIA_TYPE
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack_dumps(data)
@@ -23,6 +23,11 @@ if os.getenv('ALLOWED_HOSTS'):
     ALLOWED_HOSTS.extend(os.getenv('ALLOWED_HOSTS').split(','))
 # Remove duplicates and empty strings
 ALLOWED_HOSTS = list(set([h for h in ALLOWED_HOSTS if h]))
+# Proxies in front of the app that append to X-Forwarded-For (1 behind Railway's or
+# nginx's). Anonymous clients are told apart by the address the outermost one saw, for
+# view counts and replica stickiness (marketplace/proxies.py); 0 uses REMOTE_ADDR,
+# since clients can write anything into the header themselves
+TRUSTED_PROXY_COUNT = int(os.getenv('TRUSTED_PROXY_COUNT') or 0)
 
 INSTALLED_APPS = [
     'django.contrib.admin',
@@ -51,6 +56,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # Read replica selection and read-your-writes stickiness (marketplace/db_router.py)
+    'marketplace.db_router.ReplicaRoutingMiddleware',
 ]
 
 ROOT_URLCONF = 'marketplace.urls'
@@ -110,6 +117,51 @@ else:
         }
     }
 
+# Read replicas - comma-separated database URLs. Safe-method requests read from them
+# round-robin, with unhealthy or lagging replicas ejected for a while; clients read
+# from the primary for a few seconds after they write. See marketplace/db_router.py.
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv('DATABASE_REPLICA_URLS', '').split(',') if url.strip()]
+DATABASE_REPLICAS = []
+for index, replica_url in enumerate(DATABASE_REPLICA_URLS):
+    replica = dj_database_url.parse(replica_url, conn_max_age=600)
+    if replica['ENGINE'].endswith('postgresql'):
+        replica.setdefault('OPTIONS', {})['connect_timeout'] = 5
+    # Test databases are never created for replicas; they read the test primary
+    replica['TEST'] = {'MIRROR': 'default'}
+    DATABASES[f'replica_{index}'] = replica
+    DATABASE_REPLICAS.append(f'replica_{index}')
+DATABASE_ROUTERS = ['marketplace.db_router.ReplicaRouter']
+DATABASE_REPLICA_STICKY_SECONDS = int(os.getenv('DATABASE_REPLICA_STICKY_SECONDS', 5))
+DATABASE_REPLICA_HEALTH_INTERVAL = int(os.getenv('DATABASE_REPLICA_HEALTH_INTERVAL', 5))
+DATABASE_REPLICA_MAX_LAG_SECONDS = float(os.getenv('DATABASE_REPLICA_MAX_LAG_SECONDS', 10))
+DATABASE_REPLICA_EJECT_SECONDS = int(os.getenv('DATABASE_REPLICA_EJECT_SECONDS', 30))
+
+# PostgreSQL connection pooling (psycopg 3 + psycopg_pool, see marketplace/db_pool):
+# each process borrows connections from one bounded pool per database, so it never
+# holds more than DATABASE_POOL_MAX_SIZE server connections however many threads,
+# ASGI requests or websocket consumers it runs. Budget max_connections as
+# processes x DATABASE_POOL_MAX_SIZE (+ replicas' own limits).
+DATABASE_POOL = os.getenv('DATABASE_POOL', 'True') == 'True'
+DATABASE_POOL_OPTIONS = {
+    'min_size': int(os.getenv('DATABASE_POOL_MIN_SIZE', 2)),
+    'max_size': int(os.getenv('DATABASE_POOL_MAX_SIZE', 10)),
+    # Seconds a request waits for a free connection before failing
+    'timeout': float(os.getenv('DATABASE_POOL_TIMEOUT', 10)),
+    # Seconds before idle connections above min_size are closed
+    'max_idle': float(os.getenv('DATABASE_POOL_MAX_IDLE', 300)),
+    # Seconds before a connection is replaced, whatever its use
+    'max_lifetime': float(os.getenv('DATABASE_POOL_MAX_LIFETIME', 1800)),
+}
+# Checkouts waiting at least this long are logged
+DATABASE_POOL_SLOW_CHECKOUT_MS = float(os.getenv('DATABASE_POOL_SLOW_CHECKOUT_MS', 100))
+if DATABASE_POOL:
+    for database in DATABASES.values():
+        if database['ENGINE'] == 'django.db.backends.postgresql':
+            database['ENGINE'] = 'marketplace.db_pool'
+            # Connections go back to the pool at the end of each request
+            database['CONN_MAX_AGE'] = 0
+            database.setdefault('OPTIONS', {})['pool'] = dict(DATABASE_POOL_OPTIONS)
+
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
     {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator'},
@@ -128,17 +180,51 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 MEDIA_URL = 'media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Listing image blobs - content-addressed storage, see listings/storage.py
+# Set BLOB_STORAGE_BACKEND=listings.storage.S3BlobStore to use an S3-compatible bucket
+BLOB_STORAGE_BACKEND = os.getenv('BLOB_STORAGE_BACKEND', 'listings.storage.LocalBlobStore')
+if BLOB_STORAGE_BACKEND.endswith('S3BlobStore'):
+    BLOB_STORAGE_OPTIONS = {
+        'bucket': os.getenv('BLOB_S3_BUCKET', ''),
+        'public_url': os.getenv('BLOB_S3_PUBLIC_URL', ''),
+        'endpoint_url': os.getenv('BLOB_S3_ENDPOINT_URL') or None,
+        'region_name': os.getenv('BLOB_S3_REGION') or None,
+    }
+else:
+    BLOB_STORAGE_OPTIONS = {'location': os.path.join(MEDIA_ROOT, 'blobs')}
+BLOB_STORAGE = {
+    'BACKEND': BLOB_STORAGE_BACKEND,
+    'OPTIONS': BLOB_STORAGE_OPTIONS,
+}
+# Behind nginx, let it send blob files (see the internal /media/blobs/ location in nginx.conf)
+BLOB_ACCEL_REDIRECT = os.getenv('BLOB_ACCEL_REDIRECT', 'False') == 'True'
+BLOB_ACCEL_REDIRECT_PREFIX = '/media/blobs/'
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'users.User'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # SimpleJWT's, with an async user lookup for the async views
+        'marketplace.authentication.JWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.AllowAny',  # Allow public access by default, override in views
     ),
+    # orjson-backed, byte-compatible with DRF's JSONRenderer/JSONParser, stdlib fallback;
+    # MessagePack when the app sends Accept / Content-Type: application/msgpack
+    'DEFAULT_RENDERER_CLASSES': (
+        'marketplace.renderers.FastJSONRenderer',
+        'marketplace.renderers.MessagePackRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'marketplace.parsers.FastJSONParser',
+        'marketplace.parsers.MessagePackParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
     'DEFAULT_FILTER_BACKENDS': [
@@ -208,6 +294,66 @@ else:
         },
     }
 
+# Shared cache (response cache, version counters) - Redis when available so all
+# workers see the same entries, per-process memory otherwise
+CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL') or REDIS_URL
+if not CACHE_REDIS_URL and os.getenv('REDIS_HOST'):
+    CACHE_REDIS_URL = f"redis://{os.getenv('REDIS_HOST')}:{os.getenv('REDIS_PORT', 6379)}/1"
+if CACHE_REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Celery - background jobs such as listing image variants (listings/tasks.py)
+CELERY_BROKER_URL = REDIS_URL or f"redis://{os.getenv('REDIS_HOST', 'localhost')}:{os.getenv('REDIS_PORT', 6379)}/0"
+# Without a broker (development, tests) run tasks inline in the calling process
+CELERY_TASK_ALWAYS_EAGER = os.getenv('CELERY_TASK_ALWAYS_EAGER', 'False' if REDIS_URL else 'True') == 'True'
+CELERY_TASK_IGNORE_RESULT = True
+# Image work is CPU bound: one prefork process per core, one job at a time each
+CELERY_WORKER_CONCURRENCY = int(os.getenv('CELERY_WORKER_CONCURRENCY') or os.cpu_count() or 1)
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+
+# Serve listing list/favourites/similar through the values() fast path
+# (listings/fastpath.py) instead of the DRF serializers
+LISTING_FAST_PATH = os.getenv('LISTING_FAST_PATH', 'True') == 'True'
+
+# Serve GET/HEAD of the listing, category and unread notification count endpoints
+# from async views (marketplace/async_api.py), with the middleware chain on the event
+# loop. ASGI only. Off by default: on Django 4.2 every async ORM and cache call, and
+# each of Django's middleware, still runs in a thread, and `manage.py
+# bench_async_reads` measured the async views slower than the sync ones
+ASYNC_READ_VIEWS = os.getenv('ASYNC_READ_VIEWS', 'False') == 'True'
+if ASYNC_READ_VIEWS:
+    MIDDLEWARE[MIDDLEWARE.index('marketplace.db_router.ReplicaRoutingMiddleware')] = (
+        'marketplace.db_router.AsyncReplicaRoutingMiddleware'
+    )
+
+# Bulk listing import (POST /api/listings/import/): rows per request and per
+# bulk_create transaction
+LISTING_IMPORT_MAX_ROWS = int(os.getenv('LISTING_IMPORT_MAX_ROWS', 10000))
+LISTING_IMPORT_CHUNK_SIZE = int(os.getenv('LISTING_IMPORT_CHUNK_SIZE', 500))
+
+# Listing view counters (listings/view_counts.py): buffered in Redis (in process
+# memory without it), deduplicated per viewer per window, flushed by celery beat
+VIEW_COUNT_REDIS_URL = os.getenv('VIEW_COUNT_REDIS_URL') or CACHE_REDIS_URL
+VIEW_COUNT_DEDUPE_WINDOW = int(os.getenv('VIEW_COUNT_DEDUPE_WINDOW', 30 * 60))
+VIEW_COUNT_FLUSH_INTERVAL = int(os.getenv('VIEW_COUNT_FLUSH_INTERVAL', 60))
+CELERY_BEAT_SCHEDULE = {
+    'flush-listing-view-counts': {
+        'task': 'listings.tasks.flush_view_counts',
+        'schedule': VIEW_COUNT_FLUSH_INTERVAL,
+    },
+}
+
 CLOUDINARY = {
     'cloud_name': os.getenv('CLOUDINARY_CLOUD_NAME', ''),
     'api_key': os.getenv('CLOUDINARY_API_KEY', ''),
@@ -0,0 +1,262 @@
+import asyncio
+import datetime
+import decimal
+import logging
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock, skipUnless
+
+import msgpack
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connection, transaction
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from listings.management.commands.check_db_pool import (
+    LISTINGS_PATH, ConnectionMonitor, asgi_get, consumer_call, wsgi_get,
+)
+from listings.models import Listing
+from listings.registry import category_registry
+from users.models import User
+
+from .db_pool import close_pool, pool_stats
+from .db_router import ReplicaRouter, get_replica_pool, sticky_key
+from .proxies import client_address
+from .renderers import msgpack_dumps
+
+STICKY_SECONDS = 1
+
+
+@skipUnless(
+    settings.DATABASE_REPLICAS,
+    'Needs two replicas, e.g. DATABASE_REPLICA_URLS=sqlite:///replica.sqlite3,sqlite:///replica2.sqlite3',
+)
+@override_settings(
+    ALLOWED_HOSTS=['*'],
+    DATABASE_REPLICA_STICKY_SECONDS=STICKY_SECONDS,
+    # A private cache: no cached responses skipping the queries, no stale sticky keys
+    CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'replica-routing-tests',
+    }},
+)
+class ReplicaRoutingTests(TransactionTestCase):
+    """
+    Where requests read from (marketplace/db_router.py). In tests the replicas mirror
+    the test primary, so the tests follow the router's choices. Not a TestCase: the
+    router keeps reads inside a transaction on the primary. Clients are signed in,
+    each with its own token, since anonymous responses are cached from the primary.
+    Run with:
+
+        DATABASE_REPLICA_URLS=sqlite:///replica.sqlite3,sqlite:///replica2.sqlite3 \\
+        python manage.py test marketplace
+    """
+    databases = '__all__'
+
+    def setUp(self):
+        self.replicas = list(settings.DATABASE_REPLICAS)
+        self.pool = get_replica_pool()
+        self.pool.ejected_until.clear()
+        self.addCleanup(self.pool.ejected_until.clear)
+        self.user = User.objects.create_user('reader', 'reader@example.com', 'password')
+        self.tokens = {}
+
+    def reads(self, method, path, client=None):
+        """The databases a request from `client` (anonymous when None) read from"""
+        aliases = []
+        db_for_read = ReplicaRouter.db_for_read
+
+        def record(router, model, **hints):
+            alias = db_for_read(router, model, **hints)
+            aliases.append(alias)
+            return alias
+
+        if method == 'get':
+            # A fresh query string each time, so no response comes from the response cache
+            path = f'{path}&check={uuid.uuid4().hex}'
+        headers = {}
+        if client is not None:
+            if client not in self.tokens:
+                self.tokens[client] = str(AccessToken.for_user(self.user))
+            headers['HTTP_AUTHORIZATION'] = f'Bearer {self.tokens[client]}'
+        with mock.patch.object(ReplicaRouter, 'db_for_read', record):
+            getattr(self.client, method)(path, **headers)
+        return set(aliases)
+
+    def read_listings(self, client):
+        return self.reads('get', '/api/listings/?page_size=1', client)
+
+    def test_safe_requests_read_one_replica(self):
+        aliases = self.read_listings('client-1')
+        self.assertEqual(len(aliases), 1)
+        self.assertLessEqual(aliases, set(self.replicas))
+
+    def test_requests_rotate_over_the_replicas(self):
+        used = set()
+        for _ in self.replicas:
+            used |= self.read_listings('client-1')
+        self.assertEqual(used, set(self.replicas))
+
+    def test_writer_reads_the_primary_until_the_window_ends(self):
+        # Rejected as invalid, but the client still counts as a writer
+        self.reads('post', '/api/listings/', 'client-2')
+        self.assertEqual(self.read_listings('client-2'), {DEFAULT_DB_ALIAS})
+        self.assertLessEqual(self.read_listings('client-3'), set(self.replicas))
+        time.sleep(STICKY_SECONDS + 0.1)
+        self.assertLessEqual(self.read_listings('client-2'), set(self.replicas))
+
+    def test_ejected_replicas_are_skipped(self):
+        self.pool.eject(self.replicas[0], 'ejected by a test')
+        self.assertEqual(self.read_listings('client-4'), set(self.replicas[1:]) or {DEFAULT_DB_ALIAS})
+        for alias in self.replicas[1:]:
+            self.pool.eject(alias, 'ejected by a test')
+        self.assertEqual(self.read_listings('client-4'), {DEFAULT_DB_ALIAS})
+
+    def test_shared_caches_fill_from_the_primary(self):
+        # A lagging replica would store rows from before the last write under its new version
+        self.assertEqual(self.reads('get', '/api/listings/?page_size=1'), {DEFAULT_DB_ALIAS})
+        self.assertEqual(self.reads('get', '/api/listings/?page_size=1&facets=true'), {DEFAULT_DB_ALIAS})
+        category_registry.clear()
+        self.assertEqual(self.reads('get', '/api/listings/categories/?'), {DEFAULT_DB_ALIAS})
+        # Signed-in reads aren't shared, and stay on the replicas
+        self.assertLessEqual(self.read_listings('client-5'), set(self.replicas))
+
+    def test_reads_outside_requests_use_the_primary(self):
+        self.assertEqual(Listing.objects.all().db, DEFAULT_DB_ALIAS)
+
+    def test_reads_in_a_transaction_use_the_primary(self):
+        router = ReplicaRouter()
+        with mock.patch('marketplace.db_router._state') as state:
+            state.get.return_value = mock.Mock(use_replicas=True, wrote=False, replica=None)
+            self.assertIn(router.db_for_read(Listing), self.replicas)
+            state.get.return_value.replica = None
+            with transaction.atomic():
+                self.assertEqual(router.db_for_read(Listing), DEFAULT_DB_ALIAS)
+
+
+class MessagePackTests(SimpleTestCase):
+
+    def test_prices_stay_decimal_strings(self):
+        data = [{'price': '100.00'}, {'price': '99.99'}, {'price_min': decimal.Decimal('5.50')}]
+        self.assertEqual(
+            msgpack.unpackb(msgpack_dumps(data), raw=False),
+            [{'price': '100.00'}, {'price': '99.99'}, {'price_min': '5.50'}],
+        )
+
+    def test_timestamps_are_epoch_milliseconds(self):
+        created_at = datetime.datetime(2024, 1, 2, 3, 4, 5, 678000, tzinfo=datetime.timezone.utc)
+        data = {'created_at': created_at.isoformat(), 'updated_at': created_at}
+        expected = int(created_at.timestamp() * 1000)
+        self.assertEqual(
+            msgpack.unpackb(msgpack_dumps(data), raw=False),
+            {'created_at': expected, 'updated_at': expected},
+        )
+
+
+class ClientAddressTests(SimpleTestCase):
+
+    def request(self, forwarded):
+        return RequestFactory().get('/', REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR=forwarded)
+
+    def address(self, forwarded):
+        return client_address(self.request(forwarded))
+
+    @override_settings(TRUSTED_PROXY_COUNT=0)
+    def test_forwarded_for_is_ignored_without_proxies(self):
+        self.assertEqual(self.address('203.0.113.7'), '10.0.0.1')
+
+    @override_settings(TRUSTED_PROXY_COUNT=1)
+    def test_client_supplied_entries_are_skipped(self):
+        self.assertEqual(self.address('203.0.113.7'), '203.0.113.7')
+        self.assertEqual(self.address('198.51.100.1, 203.0.113.7'), '203.0.113.7')
+
+    @override_settings(TRUSTED_PROXY_COUNT=2)
+    def test_missing_entries_fall_back_to_the_peer(self):
+        self.assertEqual(self.address('198.51.100.1, 203.0.113.7'), '198.51.100.1')
+        self.assertEqual(self.address('203.0.113.7'), '10.0.0.1')
+
+    @override_settings(TRUSTED_PROXY_COUNT=1)
+    def test_sticky_key_uses_the_trusted_address(self):
+        # A writer can't shake off its primary pin by rewriting the header
+        self.assertEqual(
+            sticky_key(self.request('203.0.113.7')),
+            sticky_key(self.request('198.51.100.1, 203.0.113.7')),
+        )
+        self.assertNotEqual(sticky_key(self.request('203.0.113.7')), sticky_key(self.request('203.0.113.8')))
+
+
+class HealthTests(TestCase):
+
+    def test_db_pool_stats_are_for_staff(self):
+        client = APIClient()
+        self.assertEqual(client.get('/health/db-pool/').status_code, 401)
+        client.force_authenticate(User.objects.create_user('member', 'member@example.com', 'password'))
+        self.assertEqual(client.get('/health/db-pool/').status_code, 403)
+        client.force_authenticate(User.objects.create_user('staff', 'staff@example.com', 'password', is_staff=True))
+        self.assertEqual(client.get('/health/db-pool/').status_code, 200)
+
+
+@skipUnless(
+    connection.settings_dict['ENGINE'] == 'marketplace.db_pool',
+    'Needs pooled PostgreSQL, e.g. DATABASE_URL=postgres://localhost/marketplace',
+)
+class ConnectionPoolTests(TransactionTestCase):
+    """
+    marketplace/db_pool through the real WSGI and ASGI handlers, with three times more
+    concurrent requests than the pool has connections. `manage.py check_db_pool`
+    runs the same against a development database, plus server-side kills and an
+    exhausted pool.
+    """
+
+    def setUp(self):
+        # An empty pool on the test database, with fresh stats
+        connection.close()
+        close_pool(DEFAULT_DB_ALIAS)
+        self.pool = connection.pool
+        self.pool.open(wait=True)
+        self.addCleanup(close_pool, DEFAULT_DB_ALIAS)
+        self.concurrency = self.pool.max_size * 3
+        self.total = self.concurrency * 2
+        self.monitor = ConnectionMonitor(connection.get_connection_params())
+        self.addCleanup(self.monitor.connection.close)
+        # Slow checkouts are the point here
+        for name in ('marketplace.db_pool', 'psycopg.pool'):
+            logger = logging.getLogger(name)
+            self.addCleanup(logger.setLevel, logger.level)
+            logger.setLevel(logging.ERROR)
+
+    def assert_bounded(self, statuses):
+        self.assertEqual(statuses, [200] * self.total)
+        self.assertGreater(self.monitor.peak, 0)
+        self.assertLessEqual(self.monitor.peak, self.pool.max_size)
+        self.assertEqual(pool_stats()[DEFAULT_DB_ALIAS]['in_use'], 0)
+
+    def test_wsgi(self):
+        with self.monitor:
+            with ThreadPoolExecutor(self.concurrency) as executor:
+                statuses = list(executor.map(lambda _: wsgi_get(LISTINGS_PATH), range(self.total)))
+        self.assert_bounded(statuses)
+
+    def test_asgi(self):
+        async def load():
+            semaphore = asyncio.Semaphore(self.concurrency)
+
+            async def one():
+                async with semaphore:
+                    return await asgi_get(LISTINGS_PATH)
+            return await asyncio.gather(*(one() for _ in range(self.total)))
+
+        with self.monitor:
+            statuses = asyncio.run(load())
+        self.assert_bounded(statuses)
+
+    def test_consumer_calls(self):
+        async def load():
+            # Each on its own thread, as websocket consumers' database_sync_to_async calls
+            await asyncio.gather(*(consumer_call() for _ in range(self.total)))
+
+        with self.monitor:
+            asyncio.run(load())
+        self.assert_bounded([200] * self.total)
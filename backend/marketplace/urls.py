@@ -2,11 +2,12 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
-from marketplace.health import health_check
+from marketplace.health import db_pool_stats, health_check
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('health/', health_check, name='health'),
+    path('health/db-pool/', db_pool_stats, name='health-db-pool'),
     path('api/auth/', include('users.urls')),
     path('api/listings/', include('listings.urls')),
     path('api/chat/', include('chat.urls')),
@@ -0,0 +1,22 @@
+"""
+Gunicorn worker for the ASGI application (gunicorn.conf.py, SERVER_MODE=asgi).
+
+uvicorn's worker runs one event loop per process serving both the HTTP API and the
+chat websockets. Gunicorn's `keepalive` becomes uvicorn's keep-alive timeout.
+"""
+import os
+
+from uvicorn.workers import UvicornWorker as BaseUvicornWorker
+
+
+class UvicornWorker(BaseUvicornWorker):
+    CONFIG_KWARGS = {
+        # uvloop and httptools when installed (uvicorn[standard])
+        'loop': 'auto',
+        'http': 'auto',
+        # Neither Django nor channels implement the lifespan protocol
+        'lifespan': 'off',
+        # Pings keep idle chat sockets open through proxies and drop dead clients
+        'ws_ping_interval': float(os.getenv('WEBSOCKET_PING_INTERVAL', 20)),
+        'ws_ping_timeout': float(os.getenv('WEBSOCKET_PING_TIMEOUT', 20)),
+    }
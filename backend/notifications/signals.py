@@ -10,7 +10,7 @@ from django.conf import settings
 
 @receiver(post_save, sender=Listing)
 def notify_listing_status_change(sender, instance, created, **kwargs):
-    if not created and 'status' in kwargs.get('update_fields', []):
+    if not created and 'status' in (kwargs.get('update_fields') or []):
         if instance.status == 'approved':
             Notification.objects.create(
                 user=instance.seller,
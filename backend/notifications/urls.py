@@ -1,12 +1,18 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
+from marketplace.async_api import async_read_routes
 from .views import NotificationViewSet
 
 router = DefaultRouter()
 router.register(r'', NotificationViewSet, basename='notification')
 
+routes = router.urls
+if settings.ASYNC_READ_VIEWS:
+    routes = async_read_routes(routes, {'notification-unread-count'})
+
 urlpatterns = [
-    path('', include(router.urls)),
+    path('', include(routes)),
 ]
 
 
@@ -2,6 +2,7 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from marketplace.pagination import KeysetPagination
 from .models import Notification
 from .serializers import NotificationSerializer
 
@@ -9,6 +10,7 @@ from .serializers import NotificationSerializer
 class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = NotificationSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         return Notification.objects.filter(user=self.request.user).select_related('listing')
@@ -30,4 +32,9 @@ class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
         count = Notification.objects.filter(user=request.user, is_read=False).count()
         return Response({'count': count}, status=status.HTTP_200_OK)
 
+    async def aunread_count(self, request):
+        """unread_count() for the async route (marketplace/async_api.py)"""
+        count = await Notification.objects.filter(user=request.user, is_read=False).acount()
+        return Response({'count': count}, status=status.HTTP_200_OK)
+
 
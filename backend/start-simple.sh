@@ -14,12 +14,4 @@ echo "Attempting migrations..."
 python manage.py migrate --noinput 2>&1 || echo "Migrations skipped or failed, continuing..."
 
 echo "Starting Gunicorn server..."
-exec gunicorn \
-    --bind 0.0.0.0:$PORT \
-    --workers 2 \
-    --timeout 120 \
-    --access-logfile - \
-    --error-logfile - \
-    --log-level info \
-    marketplace.wsgi:application
-
+exec gunicorn --config gunicorn.conf.py
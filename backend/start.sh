@@ -105,8 +105,7 @@ echo "==========================================" >&2
 echo "Starting Gunicorn server..." >&2
 echo "==========================================" >&2
 echo "Binding to: 0.0.0.0:${PORT:-8000}" >&2
-echo "Workers: 2" >&2
-echo "Timeout: 120" >&2
+echo "Mode: ${SERVER_MODE:-wsgi} (workers and timeouts in gunicorn.conf.py)" >&2
 echo "" >&2
 
 # Ensure PORT is set
@@ -117,14 +116,5 @@ fi
 
 # Use exec to replace shell process
 # Remove --preload flag as it can cause issues with Django initialization
-echo "Executing: gunicorn --bind 0.0.0.0:${PORT} --workers 2 --timeout 120 marketplace.wsgi:application" >&2
-exec gunicorn \
-    --bind 0.0.0.0:${PORT} \
-    --workers 2 \
-    --timeout 120 \
-    --access-logfile - \
-    --error-logfile - \
-    --log-level info \
-    --capture-output \
-    marketplace.wsgi:application
-
+echo "Executing: gunicorn --config gunicorn.conf.py" >&2
+exec gunicorn --config gunicorn.conf.py
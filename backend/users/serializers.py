@@ -29,6 +29,13 @@ class UserSerializer(serializers.ModelSerializer):
         read_only_fields = ('id', 'created_at')
 
 
+class UserSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = User
+        fields = ('id', 'username')
+        read_only_fields = fields
+
+
 class UserProfileSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
@@ -15,6 +15,10 @@ export const ListingCard: React.FC<ListingCardProps> = ({ listing, onPress, onFa
   
   // Handle image URI - base64 data URIs work everywhere
   const getImageUri = () => {
+    // List endpoints send a compact card with a ready-made thumbnail URL
+    if (listing.thumbnail) {
+      return listing.thumbnail;
+    }
     if (primaryImage?.image) {
       const imageUri = primaryImage.image;
       // Base64 data URIs work in both web and native
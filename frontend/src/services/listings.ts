@@ -19,6 +19,10 @@ export interface Listing {
   price: string;
   category: Category;
   location: string;
+  latitude?: number | null;
+  longitude?: number | null;
+  // Set when the request passed `near`
+  distance_km?: number;
   seller: {
     id: number;
     username: string;
@@ -28,11 +32,37 @@ export interface Listing {
   condition?: string;
   is_featured?: boolean;
   images: ListingImage[];
+  // Set on list endpoints, which return compact cards instead of `images`
+  thumbnail?: string | null;
+  // Only on the seller's own listings (getMyListings)
+  view_count?: number;
+  favorite_count?: number;
+  chat_room_count?: number;
+  unread_message_count?: number;
   is_favorited: boolean;
   created_at: string;
   updated_at: string;
 }
 
+export interface ListingFacets {
+  category: { id: number; name: string; slug: string; count: number }[];
+  condition: { value: string; label: string; count: number }[];
+  price: { min: number; max: number | null; count: number }[];
+}
+
+export type FavoriteIdsSync =
+  | { version: number; full: true; ids: number[] }
+  | { version: number; full: false; added: number[]; removed: number[] };
+
+export interface SellerDashboardTotals {
+  listings: number;
+  active_listings: number;
+  view_count: number;
+  favorite_count: number;
+  chat_room_count: number;
+  unread_message_count: number;
+}
+
 export interface ListingCreateData {
   title: string;
   description: string;
@@ -52,12 +82,26 @@ export const listingsService = {
     is_featured?: boolean;
     price__gte?: number;
     price__lte?: number;
+    price_min?: number;
+    price_max?: number;
+    // Comma-separated, e.g. "1,4,7" / "new,like_new"
+    category__in?: string;
+    condition__in?: string;
+    created_after?: string;
+    near?: string;
+    radius_km?: number;
+    facets?: boolean;
     page?: number;
-  }): Promise<{ results: Listing[]; count: number; next: string | null; previous: string | null }> {
+  }): Promise<{ results: Listing[]; count: number; next: string | null; previous: string | null; facets?: ListingFacets }> {
     const response = await apiClient.get('/listings/', { params });
     return response.data;
   },
 
+  async getFacets(params?: Record<string, string | number | boolean>): Promise<ListingFacets> {
+    const response = await apiClient.get('/listings/facets/', { params });
+    return response.data;
+  },
+
   async getListing(id: number): Promise<Listing> {
     const response = await apiClient.get(`/listings/${id}/`);
     return response.data;
@@ -90,13 +134,24 @@ export const listingsService = {
     }
   },
 
-  async getFavorites(): Promise<Listing[]> {
-    const response = await apiClient.get('/listings/favorites/');
-    return response.data.map((fav: any) => fav.listing);
+  async getFavorites(params?: { cursor?: string; view?: 'full' }): Promise<{ results: Listing[]; next: string | null }> {
+    const response = await apiClient.get('/listings/favorites/', { params });
+    return { results: response.data.results.map((fav: any) => fav.listing), next: response.data.next };
+  },
+
+  // Favourite listing IDs; pass the last `version` as `since` to get only the changes
+  async getFavoriteIds(since?: number): Promise<FavoriteIdsSync> {
+    const response = await apiClient.get('/listings/favorites/ids/', { params: since ? { since } : undefined });
+    return response.data;
   },
 
-  async getMyListings(): Promise<Listing[]> {
-    const response = await apiClient.get('/listings/my_listings/');
+  // Seller dashboard; `totals` is only on the first page (no cursor)
+  async getMyListings(params?: {
+    cursor?: string;
+    status?: string;
+    view?: 'full';
+  }): Promise<{ results: Listing[]; next: string | null; totals?: SellerDashboardTotals }> {
+    const response = await apiClient.get('/listings/my_listings/', { params });
     return response.data;
   },
 